@@ -17,18 +17,85 @@
 """
 小说阅读器主入口文件
 
-该文件是小说阅读器的主入口，负责启动HTTP服务器并处理请求。
+该文件是小说阅读器的主入口，负责启动HTTP服务器并处理请求；bench子命令运行基准测试。
 """
 
+import sys
+import json
+import argparse
+
 from src.main import start_server
 
 
+def parse_args(argv=None):
+    """
+    解析命令行参数，未指定的参数使用配置文件中的值
+
+    Args:
+        argv: 命令行参数列表，默认为sys.argv[1:]
+
+    Returns:
+        解析结果
+    """
+    parser = argparse.ArgumentParser(description="小说阅读器")
+    parser.add_argument("--mode", choices=["single", "threaded", "asyncio", "prefork"],
+                        help="服务模式，默认使用配置中的SERVER_MODE")
+    parser.add_argument("--workers", type=int, help="prefork模式的工作进程数，默认使用配置中的PREFORK_WORKERS")
+    parser.add_argument("--port", type=int, help="监听端口，默认使用配置中的PORT")
+
+    subparsers = parser.add_subparsers(dest="command")
+    bench = subparsers.add_parser("bench", help="运行基准测试并以JSON输出结果")
+    bench.add_argument("--chapters", type=int, default=2000, help="生成的小说的章节数")
+    bench.add_argument("--paragraphs", type=int, default=30, help="每章的段落数")
+    bench.add_argument("--encoding", default="gbk", help="生成的小说的文本编码")
+    bench.add_argument("--repeat", type=int, default=5, help="每个阶段计时的次数")
+    bench.add_argument("--requests", type=int, default=2000, help="端到端测试的请求总数")
+    bench.add_argument("--concurrency", type=int, default=8, help="端到端测试的并发连接数")
+    bench.add_argument("--mode", dest="bench_mode", choices=["single", "threaded", "asyncio"], default="threaded",
+                       help="端到端测试的服务模式")
+    bench.add_argument("--no-http", action="store_true", help="只测量解析和渲染，不启动服务器")
+    bench.add_argument("--output", help="结果写入的JSON文件，默认输出到标准输出")
+    bench.add_argument("--verbose", action="store_true", help="按配置记录日志和访问日志")
+    return parser.parse_args(argv)
+
+
+def run_bench(args):
+    """
+    运行基准测试并输出JSON结果
+
+    Args:
+        args: bench子命令的参数
+    """
+    from src.benchmark import run_benchmark
+    from src.logger import setup_logging
+
+    # 默认只记录警告和错误，不记录访问日志，以免日志的开销计入延迟
+    if args.verbose:
+        setup_logging()
+    else:
+        setup_logging("WARNING", access=False)
+    result = run_benchmark(
+        chapters=args.chapters, paragraphs=args.paragraphs, encoding=args.encoding, repeat=args.repeat,
+        requests=args.requests, concurrency=args.concurrency, mode=args.bench_mode, skip_http=args.no_http
+    )
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
 if __name__ == "__main__":
     """
     主函数，启动小说阅读器服务器
     """
+    args = parse_args()
+    if args.command == "bench":
+        run_bench(args)
+        sys.exit(0)
     try:
-        start_server()
+        start_server(mode=args.mode, port=args.port, workers=args.workers)
     except KeyboardInterrupt:
         print("服务器已手动关闭")
     except Exception as e:
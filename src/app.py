@@ -0,0 +1,935 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+请求路由模块
+
+该模块实现与传输方式无关的请求处理：根据请求生成响应对象，由各个服务器引擎负责
+读取请求和写出响应。静态文件、小说列表、章节内容和全文搜索的路由都在这里。
+"""
+
+import os
+import time
+import hashlib
+import logging
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.config import XS_DIR, STATIC_DIR, RENDER_CACHE_MAX_BYTES, PARSE_CACHE_MAX_BYTES, STATIC_MAX_AGE, \
+    STATIC_CACHE_MAX_BYTES, STATIC_CACHE_MAX_FILE_SIZE, TOC_PAGE_SIZE, TOC_MAX_PAGE_SIZE, SEARCH_ENABLED, \
+    SEARCH_MAX_RESULTS, METRICS_ENABLED
+from src.catalog import get_catalog
+from src.parsers.novel_loader import load_novel
+from src.parsers.novel_parser import ChapterIndex, ChapterReadError
+from src.generators.html_generator import render_page, render_search, render_status
+from src.generators import json_generator
+from src.generators.json_generator import JSON_CONTENT_TYPE, dump_json
+from src.utils.helpers import safe_join, validate_path, validate_novel_name, parse_byte_range
+from src.utils.cache import ByteLRUCache, FileCache
+from src.utils.compression import choose_encoding, compress, parse_accept_encoding
+from src.warmup import NovelWarmer
+from src.search import SearchIndexer, search
+from src.metrics import (
+    PROMETHEUS_CONTENT_TYPE, registry as metrics, observe_stage, stage_timer, render_prometheus, status_snapshot
+)
+
+
+# 小说解析结果缓存，按源文件身份缓存，容量按章节序列的近似字节数限制
+parse_cache = FileCache(load_novel, PARSE_CACHE_MAX_BYTES, lambda chapters: chapters.approximate_size())
+
+
+def extract_and_parse_novel(zip_path: str, identity: Optional[Tuple[int, int]] = None) -> ChapterIndex:
+    """
+    提取并解析小说内容，使用缓存提高性能
+
+    Args:
+        zip_path: 源文件路径
+        identity: 源文件身份(修改时间纳秒数, 文件大小)，为None时读取文件状态
+
+    Returns:
+        解析后的章节序列
+    """
+    return parse_cache.get(zip_path, identity)
+
+
+def watch_catalog(catalog):
+    """
+    小说目录变化时删除已移除或已变化的小说的解析结果，替换后的小说在下次请求时重新解析
+
+    Args:
+        catalog: 小说目录
+    """
+    def on_catalog_changed(entries):
+        current = {entry.path: (entry.mtime_ns, entry.size) for entry in catalog.entries()}
+        stale = [path for path, identity in parse_cache.identities() if current.get(path) != identity]
+        if stale:
+            logging.info("已删除%s本小说的解析缓存", parse_cache.invalidate(stale))
+
+    catalog.add_listener(on_catalog_changed)
+
+
+# 后台预热调度器，未启用预热时为None
+novel_warmer = None
+
+
+def _on_novel_warmed(zip_path: str, chapters):
+    """
+    后台预热完成后的回调，未启用章节存储时把结果放入解析缓存
+
+    Args:
+        zip_path: ZIP文件路径
+        chapters: 章节序列，结果已写入章节存储时为None
+    """
+    if chapters is not None:
+        parse_cache.put(zip_path, None, chapters)
+
+
+def start_warmer(catalog):
+    """
+    启动后台预热，预热整个小说库并在目录变化时预热新增和变化的小说
+
+    Args:
+        catalog: 小说目录
+
+    Returns:
+        预热调度器
+    """
+    global novel_warmer
+    warmer = NovelWarmer(_on_novel_warmed)
+    warmer.start()
+    warmer.schedule(catalog.entries())
+    catalog.add_listener(lambda entries: warmer.schedule(entries, changed=True))
+    novel_warmer = warmer
+    return warmer
+
+
+def start_search_indexer(catalog):
+    """
+    启动全文索引，为整个小说库建立索引并在目录变化时更新
+
+    Args:
+        catalog: 小说目录
+
+    Returns:
+        全文索引调度器
+    """
+    # 请求线程正在解析小说时暂停建立索引，避免与其争抢CPU和章节存储
+    indexer = SearchIndexer(busy=lambda: parse_cache.loading() > 0)
+    indexer.start()
+    indexer.purge(catalog.entries())
+    indexer.schedule(catalog.entries())
+
+    def on_catalog_changed(entries):
+        indexer.purge(catalog.entries())
+        indexer.schedule(entries)
+
+    catalog.add_listener(on_catalog_changed)
+    return indexer
+
+
+class Request:
+    """
+    服务器引擎解析出的HTTP请求
+    """
+
+    __slots__ = ("method", "path", "headers", "client_address")
+
+    def __init__(self, method: str, path: str, headers, client_address=None):
+        """
+        初始化请求
+
+        Args:
+            method: 请求方法
+            path: 请求路径，含查询参数
+            headers: 请求头，需支持不区分大小写的get方法（如http.client.HTTPMessage）
+            client_address: 客户端地址
+        """
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.client_address = client_address
+
+
+class Response:
+    """
+    路由生成的HTTP响应
+
+    响应体为内存中的字节，或者为文件的一个区间，由服务器引擎用sendfile发送。
+    """
+
+    __slots__ = ("status", "headers", "body", "file")
+
+    def __init__(self, status: int, headers: Optional[List[Tuple[str, str]]] = None, body=b"",
+                 file: Optional[Tuple[str, int, int]] = None):
+        """
+        初始化响应
+
+        Args:
+            status: HTTP状态码
+            headers: 响应头列表，已包含Content-Length
+            body: 响应体
+            file: 需要从文件发送的响应体，格式为(文件路径, 起始偏移, 长度)
+        """
+        self.status = status
+        self.headers = headers if headers is not None else []
+        self.body = body
+        self.file = file
+
+
+class RenderedPage:
+    """
+    已渲染并编码的页面及其缓存校验信息
+    """
+
+    __slots__ = ("body", "etag", "last_modified", "content_type", "_variants")
+
+    def __init__(self, body: bytes, last_modified: float, content_type: str = 'text/html; charset=utf-8'):
+        """
+        初始化页面
+
+        Args:
+            body: UTF-8编码的页面内容
+            last_modified: 页面数据源的最后修改时间戳
+            content_type: 内容类型
+        """
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+        self.last_modified = last_modified
+        self._variants = {}
+
+    @property
+    def size(self) -> int:
+        """
+        页面及其所有压缩版本的总字节数
+        """
+        return len(self.body) + sum(len(body) for body, _ in self._variants.values())
+
+    def variant(self, encoding: Optional[str]) -> Tuple[bytes, str, bool]:
+        """
+        获取指定内容编码的页面，压缩版本只在第一次需要时生成
+
+        Args:
+            encoding: 内容编码，None表示不压缩
+
+        Returns:
+            (页面内容, 该版本的ETag, 是否为本次新生成的版本)
+        """
+        if encoding is None:
+            return self.body, self.etag, False
+        cached = self._variants.get(encoding)
+        if cached is not None:
+            return cached[0], cached[1], False
+        # 不同内容编码的版本是不同的表示，使用不同的强ETag
+        variant = (compress(self.body, encoding), '{0}-{1}"'.format(self.etag[:-1], encoding))
+        self._variants[encoding] = variant
+        return variant[0], variant[1], True
+
+
+# 已渲染页面缓存，键为(数据源身份, 路由)
+render_cache = ByteLRUCache(RENDER_CACHE_MAX_BYTES)
+
+# 小静态文件缓存，键为(文件路径, 修改时间, 大小)
+static_cache = ByteLRUCache(STATIC_CACHE_MAX_BYTES)
+
+
+def _route(request: Request) -> Tuple[str, Callable[[Request], Response]]:
+    """
+    根据请求方法和路径选择处理函数
+
+    Args:
+        request: HTTP请求
+
+    Returns:
+        (路由类别, 处理函数)，路由类别用于按路由统计请求
+    """
+    if request.method != 'GET':
+        return "other", lambda request: error_response(501, "Not Implemented")
+
+    # 处理静态文件请求
+    if request.path.startswith('/static/'):
+        return "static", _handle_static_file
+
+    # 处理根路径请求
+    if request.path == "/":
+        return "root", _handle_root
+
+    # 处理全文搜索请求
+    if request.path == '/search' or request.path.startswith('/search?'):
+        return "search", _handle_search
+
+    # 处理指标和状态页面请求
+    if METRICS_ENABLED:
+        path = urlsplit(request.path).path
+        if path in ('/metrics', '/status'):
+            return path[1:], _handle_metrics
+
+    # 处理前端脚本使用的JSON接口
+    if request.path.startswith('/api/'):
+        return "api", _handle_api
+
+    # 处理小说和章节请求
+    return "novel", _handle_novel_request
+
+
+def handle_request(request: Request) -> Response:
+    """
+    处理请求并生成响应，同时按路由统计请求数和耗时
+
+    Args:
+        request: HTTP请求
+
+    Returns:
+        HTTP响应
+    """
+    route, handler = _route(request)
+    if METRICS_ENABLED:
+        metrics.request_started()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = handler(request)
+        status = response.status
+        return response
+
+    except Exception as e:
+        logging.error("请求处理时出错: %s", str(e))
+        return error_response(500, "Internal Server Error")
+
+    finally:
+        if METRICS_ENABLED:
+            metrics.request_finished(route, status, time.perf_counter() - start)
+
+
+def _handle_static_file(request: Request) -> Response:
+    """
+    处理静态文件请求
+    """
+    try:
+        # 获取静态文件路径，忽略用于区分版本的查询参数
+        static_file_path = urlsplit(request.path).path[len('/static/'):]
+
+        # 验证路径安全性
+        if not validate_path(static_file_path):
+            return error_response(403, "Forbidden")
+
+        # 构建完整文件路径
+        file_path = safe_join(STATIC_DIR, static_file_path)
+
+        if not file_path or not os.path.isfile(file_path):
+            return error_response(404, "Not Found")
+
+        # 确定文件MIME类型
+        content_type = get_content_type(file_path)
+
+        # 客户端接受gzip且存在不旧于原文件的预压缩版本时，直接发送预压缩文件
+        send_path = file_path
+        content_encoding = None
+        if parse_accept_encoding(request.headers.get('Accept-Encoding')).get('gzip', 0) > 0:
+            gz_path = file_path + '.gz'
+            try:
+                if os.stat(gz_path).st_mtime >= os.stat(file_path).st_mtime:
+                    send_path = gz_path
+                    content_encoding = 'gzip'
+            except OSError:
+                pass
+
+        response = _static_response(request, send_path, content_type, content_encoding)
+
+        logging.debug("成功返回静态文件: %s", request.path)
+        return response
+
+    except Exception as e:
+        logging.error("处理静态文件时出错: %s", str(e))
+        return error_response(500, "Internal Server Error")
+
+
+def _static_response(request: Request, file_path: str, content_type: str,
+                     content_encoding: Optional[str]) -> Response:
+    """
+    生成静态文件响应，支持条件请求和单个字节范围请求
+
+    小文件从内存缓存中发送，大文件由服务器引擎通过sendfile直接从文件发送到套接字，不经过Python复制。
+
+    Args:
+        request: HTTP请求
+        file_path: 要发送的文件路径
+        content_type: 内容类型
+        content_encoding: 内容编码，未压缩时为None
+
+    Returns:
+        HTTP响应
+    """
+    stat = os.stat(file_path)
+    size = stat.st_size
+    etag = '"{0:x}-{1:x}"'.format(stat.st_mtime_ns, size)
+
+    headers = [
+        ('Content-type', content_type),
+        ('ETag', etag),
+        ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+        ('Cache-Control', 'public, max-age={0}'.format(STATIC_MAX_AGE)),
+        ('Vary', 'Accept-Encoding'),
+        ('Accept-Ranges', 'bytes'),
+    ]
+    if content_encoding is not None:
+        headers.append(('Content-Encoding', content_encoding))
+
+    if is_not_modified(request.headers, etag, stat.st_mtime):
+        return Response(304, headers)
+
+    # If-Range与当前版本不一致时忽略Range，发送完整内容
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range.strip() in (etag, formatdate(stat.st_mtime, usegmt=True)):
+        try:
+            byte_range = parse_byte_range(request.headers.get('Range'), size)
+        except ValueError:
+            return Response(416, [('Content-Range', 'bytes */{0}'.format(size)), ('Content-Length', '0')])
+
+    if byte_range is None:
+        start, end = 0, size - 1
+        status = 200
+    else:
+        start, end = byte_range
+        status = 206
+        headers.insert(0, ('Content-Range', 'bytes {0}-{1}/{2}'.format(start, end, size)))
+    length = end - start + 1 if size else 0
+    headers.append(('Content-Length', str(length)))
+    if not length:
+        return Response(status, headers)
+
+    if size <= STATIC_CACHE_MAX_FILE_SIZE:
+        cache_key = (file_path, stat.st_mtime_ns, size)
+        data = static_cache.get(cache_key)
+        if data is None:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            static_cache.put(cache_key, data)
+        return Response(status, headers, memoryview(data)[start:end + 1])
+
+    return Response(status, headers, file=(file_path, start, length))
+
+
+def _handle_root(request: Request) -> Response:
+    """
+    处理根路径请求，返回小说列表
+    """
+    try:
+        # 小说列表随目录内容变化，以目录版本作为数据源身份
+        catalog = get_catalog()
+        response = _page_response(request, (XS_DIR, catalog.version, "/"), (catalog.dir_mtime_ns or 0) / 1e9,
+                                  render_page)
+        logging.debug("成功返回小说列表页面")
+        return response
+
+    except Exception as e:
+        logging.error("处理根路径时出错: %s", str(e))
+        return error_response(500, "Internal Server Error")
+
+
+class NovelLookupError(Exception):
+    """
+    查找小说失败，包含应当返回的HTTP状态码
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _open_novel(novel_name: str):
+    """
+    在小说目录中查找小说并读取源文件状态
+
+    Args:
+        novel_name: 小说名称
+
+    Returns:
+        (小说目录条目, 源文件状态)
+
+    Raises:
+        NovelLookupError: 名称无效或小说不存在
+    """
+    with stage_timer("catalog"):
+        return _find_novel(novel_name)
+
+
+def _find_novel(novel_name: str):
+    """
+    查找小说并读取源文件状态，参数和返回值与_open_novel相同
+    """
+    # 验证小说名称
+    if not validate_novel_name(novel_name):
+        raise NovelLookupError(400, "Invalid Novel Name")
+
+    # 在小说目录中精确查找，找不到时检查目录是否有新文件
+    catalog = get_catalog()
+    entry = catalog.get(novel_name)
+    if entry is None and catalog.refresh():
+        entry = catalog.get(novel_name)
+
+    if entry is None:
+        raise NovelLookupError(404, "Novel Not Found")
+
+    if novel_warmer is not None:
+        novel_warmer.touch(entry.path)
+    try:
+        stat = os.stat(entry.path)
+    except FileNotFoundError:
+        parse_cache.invalidate([entry.path])
+        catalog.refresh(force=True)
+        raise NovelLookupError(404, "Novel Not Found")
+    return entry, stat
+
+
+def _load_chapters(entry, stat=None) -> ChapterIndex:
+    """
+    提取并解析小说内容，同时更新小说目录中的章节数
+
+    Args:
+        entry: 小说目录条目
+        stat: 已读取的源文件状态，为None时由解析缓存读取
+
+    Returns:
+        章节序列
+    """
+    identity = (stat.st_mtime_ns, stat.st_size) if stat is not None else None
+    chapters = extract_and_parse_novel(entry.path, identity)
+    get_catalog().set_chapter_count(entry.name, len(chapters))
+    return chapters
+
+
+def _query_int(query, name: str, default: int, minimum: int, maximum: Optional[int] = None) -> int:
+    """
+    读取查询参数中的整数，无效时使用默认值，超出范围时取最近的有效值
+
+    Args:
+        query: parse_qs解析出的查询参数
+        name: 参数名称
+        default: 默认值
+        minimum: 最小值
+        maximum: 最大值，None表示不限制
+
+    Returns:
+        参数值
+    """
+    try:
+        value = int(query[name][0])
+    except (KeyError, ValueError):
+        return default
+    value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def _handle_novel_request(request: Request) -> Response:
+    """
+    处理小说和章节请求
+    """
+    try:
+        # 解析路径，查询参数只用于章节列表分页
+        split = urlsplit(request.path)
+        route = split.path
+        path_parts = unquote(route).strip('/').split('/')
+
+        if not path_parts or not path_parts[0]:
+            return _handle_root(request)
+
+        try:
+            entry, stat = _open_novel(path_parts[0])
+        except NovelLookupError as e:
+            return error_response(e.status, e.message)
+
+        is_toc = len(path_parts) == 1
+        if is_toc:
+            # "/小说名/"与"/小说名"都是章节列表，去掉末尾的斜杠后共用同一个缓存条目
+            route = route.rstrip('/')
+        cache_key = (entry.path, stat.st_mtime_ns, stat.st_size, unquote(route))
+        page_number, page_size = 1, TOC_PAGE_SIZE
+        if is_toc:
+            query = parse_qs(split.query)
+            page_number = _query_int(query, 'page', 1, 1)
+            page_size = _query_int(query, 'size', TOC_PAGE_SIZE, 1, TOC_MAX_PAGE_SIZE)
+            cache_key += (page_number, page_size)
+        page = _cached_page(cache_key)
+
+        if page is None:
+            # 提取并解析小说内容
+            chapters = _load_chapters(entry, stat)
+            if not chapters:
+                return error_response(404, "No Chapters Found")
+
+            # 章节列表页面和章节详情页面都由render_page根据路径生成
+            with stage_timer("render"):
+                page = RenderedPage(render_page(chapters, route, page_number, page_size), stat.st_mtime)
+            render_cache.put(cache_key, page, len(page.body))
+
+        response = _rendered_response(request, page, cache_key)
+        logging.debug("成功返回小说内容: %s", request.path)
+        return response
+
+    except ChapterReadError as e:
+        return error_response(e.status, e.message)
+    except Exception as e:
+        logging.error("处理小说请求时出错: %s", str(e))
+        return error_response(500, "Internal Server Error")
+
+
+def _handle_api(request: Request) -> Response:
+    """
+    处理JSON接口请求
+
+    接口包括：
+    /api/novels：小说列表
+    /api/<小说名>/chapters?offset=&limit=：按段返回章节索引
+    /api/<小说名>/chapters/<下标>：单个章节的内容，下标从0开始
+    /api/search?q=&limit=：全文搜索
+    """
+    try:
+        split = urlsplit(request.path)
+        path_parts = unquote(split.path).strip('/').split('/')
+
+        if path_parts == ['api', 'search']:
+            if not SEARCH_ENABLED:
+                return json_error_response(404, "Search Disabled")
+            query = parse_qs(split.query)
+            text = query.get('q', [''])[0].strip()
+            if not text:
+                return json_error_response(400, "Missing Query")
+            limit = _query_int(query, 'limit', SEARCH_MAX_RESULTS, 1, SEARCH_MAX_RESULTS)
+            result = _search(text, limit)
+            # 搜索结果随索引更新变化，不放入页面缓存，以生成时间作为最后修改时间
+            page = RenderedPage(json_generator.render_search_result(result), time.time(), JSON_CONTENT_TYPE)
+            return _rendered_response(request, page)
+
+        if path_parts == ['api', 'novels']:
+            catalog = get_catalog()
+            # 小说列表很小且包含随解析变化的章节数，不放入页面缓存
+            page = RenderedPage(json_generator.render_novel_list(catalog.entries()),
+                                (catalog.dir_mtime_ns or 0) / 1e9, JSON_CONTENT_TYPE)
+            return _rendered_response(request, page)
+
+        if len(path_parts) in (3, 4) and path_parts[2] == 'chapters':
+            try:
+                entry, stat = _open_novel(path_parts[1])
+            except NovelLookupError as e:
+                return json_error_response(e.status, e.message)
+            identity = (entry.path, stat.st_mtime_ns, stat.st_size)
+
+            if len(path_parts) == 3:
+                query = parse_qs(split.query)
+                offset = _query_int(query, 'offset', 0, 0)
+                limit = _query_int(query, 'limit', TOC_PAGE_SIZE, 1, TOC_MAX_PAGE_SIZE)
+                return _api_response(request, entry, stat, identity + ('/api/chapters', offset, limit),
+                                     lambda chapters: json_generator.render_chapter_index(
+                                         entry.name, chapters, offset, limit))
+
+            try:
+                index = int(path_parts[3])
+            except ValueError:
+                return json_error_response(400, "Invalid Chapter Index")
+
+            def render_chapter(chapters):
+                if not 0 <= index < len(chapters):
+                    return None
+                return json_generator.render_chapter(entry.name, chapters, index)
+
+            return _api_response(request, entry, stat, identity + ('/api/chapter', index), render_chapter)
+
+        return json_error_response(404, "Not Found")
+
+    except ChapterReadError as e:
+        return json_error_response(e.status, e.message)
+    except Exception as e:
+        logging.error("处理接口请求时出错: %s", str(e))
+        return json_error_response(500, "Internal Server Error")
+
+
+def _cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    获取各个缓存的统计信息
+
+    Returns:
+        缓存名称 -> 统计信息
+    """
+    return {
+        "render": render_cache.stats(),
+        "parse": parse_cache.stats(),
+        "static": static_cache.stats(),
+    }
+
+
+def _handle_metrics(request: Request) -> Response:
+    """
+    处理指标请求：/metrics返回Prometheus文本格式的指标，/status返回供人阅读的状态页面
+
+    指标随时变化，不放入页面缓存，以生成时间作为最后修改时间。
+    """
+    try:
+        if urlsplit(request.path).path == '/metrics':
+            page = RenderedPage(render_prometheus(_cache_stats()), time.time(), PROMETHEUS_CONTENT_TYPE)
+        else:
+            page = RenderedPage(render_status(status_snapshot(_cache_stats())), time.time())
+        return _rendered_response(request, page)
+
+    except Exception as e:
+        logging.error("处理指标请求时出错: %s", str(e))
+        return error_response(500, "Internal Server Error")
+
+
+def _search(query: str, limit: int = SEARCH_MAX_RESULTS):
+    """
+    在小说目录中的所有小说中搜索
+
+    Args:
+        query: 查询内容
+        limit: 最多返回的章节数
+
+    Returns:
+        搜索结果
+    """
+    return search(query, get_catalog().entries(), _load_chapters, limit)
+
+
+def _handle_search(request: Request) -> Response:
+    """
+    处理全文搜索页面请求，查询内容为空时只显示搜索框
+    """
+    try:
+        if not SEARCH_ENABLED:
+            return error_response(404, "Not Found")
+        text = parse_qs(urlsplit(request.path).query).get('q', [''])[0].strip()
+        result = _search(text) if text else None
+        page = RenderedPage(render_search(text, result), time.time())
+        response = _rendered_response(request, page)
+        logging.debug("成功返回搜索页面: %s", request.path)
+        return response
+
+    except Exception as e:
+        logging.error("处理搜索请求时出错: %s", str(e))
+        return error_response(500, "Internal Server Error")
+
+
+def _api_response(request: Request, entry, stat, cache_key, render) -> Response:
+    """
+    生成小说相关的JSON接口响应，与页面共用解析缓存和已渲染页面缓存
+
+    Args:
+        request: HTTP请求
+        entry: 小说目录条目
+        stat: 源文件状态
+        cache_key: 页面缓存键
+        render: 缓存未命中时以章节序列为参数生成JSON的函数，请求的章节不存在时返回None
+
+    Returns:
+        HTTP响应
+    """
+    page = _cached_page(cache_key)
+    if page is None:
+        chapters = _load_chapters(entry, stat)
+        with stage_timer("render"):
+            body = render(chapters)
+            if body is None:
+                return json_error_response(404, "Chapter Not Found")
+            page = RenderedPage(body, stat.st_mtime, JSON_CONTENT_TYPE)
+        render_cache.put(cache_key, page, len(page.body))
+    return _rendered_response(request, page, cache_key)
+
+
+def _page_response(request: Request, cache_key, last_modified: float, render) -> Response:
+    """
+    生成页面响应，优先使用已渲染页面缓存
+
+    Args:
+        request: HTTP请求
+        cache_key: 页面缓存键
+        last_modified: 页面数据源的最后修改时间戳
+        render: 缓存未命中时用于生成页面的无参函数，返回UTF-8编码的页面
+
+    Returns:
+        HTTP响应
+    """
+    page = _cached_page(cache_key)
+    if page is None:
+        with stage_timer("render"):
+            page = RenderedPage(render(), last_modified)
+        render_cache.put(cache_key, page, len(page.body))
+    return _rendered_response(request, page, cache_key)
+
+
+def _cached_page(cache_key) -> Optional[RenderedPage]:
+    """
+    在已渲染页面缓存中查找页面
+
+    Args:
+        cache_key: 页面缓存键
+
+    Returns:
+        已渲染页面，未缓存时返回None
+    """
+    with stage_timer("cache"):
+        return render_cache.get(cache_key)
+
+
+def _rendered_response(request: Request, page: RenderedPage, cache_key=None) -> Response:
+    """
+    生成已渲染页面的响应，按Accept-Encoding选择压缩版本，客户端缓存仍然有效时返回304
+
+    Args:
+        request: HTTP请求
+        page: 已渲染页面
+        cache_key: 页面缓存键，生成新的压缩版本后用于更新缓存占用的字节数
+
+    Returns:
+        HTTP响应
+    """
+    start = time.perf_counter()
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'), len(page.body))
+    body, etag, created = page.variant(encoding)
+    if created:
+        # 只统计实际压缩的耗时，已缓存的压缩版本不计入
+        observe_stage("encode", time.perf_counter() - start)
+        if cache_key is not None:
+            render_cache.put(cache_key, page, page.size)
+
+    headers = [
+        ('Content-type', page.content_type),
+        ('ETag', etag),
+        ('Last-Modified', formatdate(page.last_modified, usegmt=True)),
+        # 要求浏览器每次使用前重新验证，前进后退时只需一次304往返
+        ('Cache-Control', 'no-cache'),
+        ('Vary', 'Accept-Encoding'),
+    ]
+    if is_not_modified(request.headers, etag, page.last_modified):
+        return Response(304, headers)
+    if encoding is not None:
+        headers.append(('Content-Encoding', encoding))
+    headers.append(('Content-Length', str(len(body))))
+    return Response(200, headers, body)
+
+
+def is_not_modified(headers, etag: str, last_modified: float) -> bool:
+    """
+    根据条件请求头判断客户端缓存是否仍然有效
+
+    同时存在If-None-Match和If-Modified-Since时只使用前者。
+
+    Args:
+        headers: 请求头
+        etag: 当前内容的ETag
+        last_modified: 当前内容的最后修改时间戳
+
+    Returns:
+        客户端缓存有效时返回True
+    """
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        # If-None-Match使用弱比较
+        return any(tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == etag for tag in candidates)
+
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def error_response(status_code: int, message: str) -> Response:
+    """
+    生成错误响应
+
+    Args:
+        status_code: HTTP状态码
+        message: 错误消息
+
+    Returns:
+        HTTP响应
+    """
+    error_html = """
+    <!DOCTYPE html>
+    <html lang="zh-CN">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>{0} - {1}</title>
+        <link rel="stylesheet" href="/static/css/style.css">
+    </head>
+    <body>
+        <div class="container">
+            <h1>{0} - {1}</h1>
+            <p>抱歉，请求处理时发生错误。</p>
+            <a href="/">返回首页</a>
+        </div>
+    </body>
+    </html>
+    """.format(status_code, message).encode('utf-8')
+
+    return Response(status_code, [
+        ('Content-type', 'text/html; charset=utf-8'),
+        ('Content-Length', str(len(error_html))),
+    ], error_html)
+
+
+def json_error_response(status_code: int, message: str) -> Response:
+    """
+    生成JSON格式的错误响应
+
+    Args:
+        status_code: HTTP状态码
+        message: 错误消息
+
+    Returns:
+        HTTP响应
+    """
+    body = dump_json({"error": message})
+    return Response(status_code, [
+        ('Content-type', JSON_CONTENT_TYPE),
+        ('Content-Length', str(len(body))),
+    ], body)
+
+
+def get_content_type(file_path: str) -> str:
+    """
+    根据文件扩展名获取内容类型
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        内容类型字符串
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    content_types = {
+        '.css': 'text/css',
+        '.js': 'application/javascript',
+        '.html': 'text/html',
+        '.txt': 'text/plain',
+        '.png': 'image/png',
+        '.jpg': 'image/jpeg',
+        '.jpeg': 'image/jpeg',
+        '.gif': 'image/gif'
+    }
+
+    return content_types.get(ext, 'application/octet-stream')
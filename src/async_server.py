@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+asyncio服务器引擎模块
+
+单个事件循环负责所有连接的读写，空闲的长连接只占用一个协程而不占用线程；
+请求的路由、解析和渲染在线程池中执行，不阻塞事件循环。
+"""
+
+import io
+import time
+import socket
+import asyncio
+import logging
+import threading
+import http.client
+from http import HTTPStatus
+from email.utils import formatdate
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from src.config import (
+    PORT, MAX_WORKERS, REQUEST_QUEUE_SIZE, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS, ASYNC_MAX_CONNECTIONS
+)
+from src.app import Request, Response, handle_request, error_response
+from src.metrics import registry as metrics, stage_timer
+from src.logger import log_access
+
+# 请求行和请求头的最大字节数
+MAX_REQUEST_HEAD = 64 * 1024
+
+# 响应头中的服务器标识
+SERVER_VERSION = "NovelReader-asyncio"
+
+
+class AsyncNovelServer:
+    """
+    基于asyncio的HTTP/1.1服务器
+
+    提供与socketserver相同的serve_forever、shutdown和server_close接口，
+    创建时即绑定并监听端口。
+    """
+
+    # 超出连接数上限时返回的响应
+    _BUSY_RESPONSE = (
+        b"HTTP/1.0 503 Service Unavailable\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"Content-Length: 19\r\n"
+        b"Retry-After: 1\r\n"
+        b"Connection: close\r\n"
+        b"\r\n"
+        b"Service Unavailable"
+    )
+
+    def __init__(self, server_address, max_workers: int = MAX_WORKERS,
+                 max_connections: int = ASYNC_MAX_CONNECTIONS, queue_size: int = REQUEST_QUEUE_SIZE):
+        """
+        初始化服务器
+
+        Args:
+            server_address: 监听地址
+            max_workers: 执行请求处理的工作线程数
+            max_connections: 同时保持的最大连接数，超出时返回503
+            queue_size: 监听套接字的连接排队深度
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.bind(server_address)
+            self.socket.listen(queue_size)
+        except OSError:
+            self.socket.close()
+            raise
+        self.server_address = self.socket.getsockname()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="novel-async")
+        self._max_connections = max_connections
+        self._connections = {}
+        metrics.register_gauge("novel_connections_open", "Open client connections.", lambda: len(self._connections))
+        self._loop = None
+        self._stopping = None
+        self._shutdown_request = False
+        self._stopped = threading.Event()
+        self._stopped.set()
+
+    def serve_forever(self):
+        """
+        运行事件循环直到调用shutdown
+        """
+        self._stopped.clear()
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._loop = None
+            self._shutdown_request = False
+            self._stopped.set()
+
+    def shutdown(self):
+        """
+        停止serve_forever，可以在其他线程中调用
+        """
+        self._shutdown_request = True
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+            else:
+                self._stopped.wait()
+
+    def server_close(self):
+        """
+        关闭监听套接字并等待正在处理的请求完成
+        """
+        self.socket.close()
+        self._executor.shutdown(wait=True)
+
+    async def _serve(self):
+        """
+        接受连接直到收到停止信号，然后关闭所有连接
+        """
+        self._loop = asyncio.get_event_loop()
+        self._stopping = asyncio.Event()
+        if self._shutdown_request:
+            # 事件循环启动前已经请求停止
+            self._stopping.set()
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket, limit=MAX_REQUEST_HEAD)
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            # 关闭所有连接，正在处理的请求写完响应后结束，空闲连接立即结束
+            tasks = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            if tasks:
+                await asyncio.wait(tasks, timeout=KEEPALIVE_TIMEOUT)
+            await server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        处理一个连接上的所有请求，空闲超时或达到请求数上限后关闭
+
+        Args:
+            reader: 连接的读取流
+            writer: 连接的写入流
+        """
+        if len(self._connections) >= self._max_connections:
+            logging.warning("连接数已达上限，拒绝来自%s的连接", writer.get_extra_info('peername'))
+            writer.write(self._BUSY_RESPONSE)
+            writer.close()
+            return
+
+        self._connections[writer] = asyncio.current_task()
+        peername = writer.get_extra_info('peername') or ('-', 0)
+        try:
+            requests_left = KEEPALIVE_MAX_REQUESTS
+            keep_alive = True
+            while keep_alive and requests_left > 0:
+                requests_left -= 1
+                keep_alive = await self._handle_one_request(reader, writer, peername, requests_left > 0)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.error("连接处理时出错: %s", str(e))
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _handle_one_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                  peername, may_keep_alive: bool) -> bool:
+        """
+        读取并处理连接上的一个请求
+
+        Args:
+            reader: 连接的读取流
+            writer: 连接的写入流
+            peername: 客户端地址
+            may_keep_alive: 本连接是否还能继续处理请求
+
+        Returns:
+            连接需要保持时返回True
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.IncompleteReadError:
+            # 客户端关闭了连接
+            return False
+        except asyncio.LimitOverrunError:
+            await self._write_response(writer, error_response(431, "Request Header Fields Too Large"), False)
+            return False
+
+        started = time.perf_counter()
+        request_line, _, header_bytes = head.partition(b"\r\n")
+        request_line = request_line.decode('iso-8859-1')
+        parts = request_line.split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+            await self._write_response(writer, error_response(400, "Bad Request"), False)
+            self._log_request(peername, request_line, 400, started)
+            return False
+        method, path, version = parts
+
+        try:
+            headers = http.client.parse_headers(io.BytesIO(header_bytes))
+        except http.client.HTTPException:
+            await self._write_response(writer, error_response(400, "Bad Request"), False)
+            self._log_request(peername, request_line, 400, started)
+            return False
+
+        # 不支持分块编码的请求体；GET请求的请求体直接丢弃
+        if headers.get('Transfer-Encoding'):
+            await self._write_response(writer, error_response(501, "Not Implemented"), False)
+            self._log_request(peername, request_line, 501, started)
+            return False
+        try:
+            content_length = int(headers.get('Content-Length') or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or content_length > MAX_REQUEST_HEAD:
+            await self._write_response(writer, error_response(400, "Bad Request"), False)
+            self._log_request(peername, request_line, 400, started)
+            return False
+        if content_length:
+            await reader.readexactly(content_length)
+
+        connection = (headers.get('Connection') or '').lower()
+        if version == 'HTTP/1.0':
+            keep_alive = 'keep-alive' in connection
+        else:
+            keep_alive = 'close' not in connection
+        keep_alive = keep_alive and may_keep_alive
+
+        # 以//开头的路径会被当作协议相对地址，与http.server一样合并开头的斜杠
+        if path.startswith('//'):
+            path = '/' + path.lstrip('/')
+
+        request = Request(method, path, headers, peername)
+        response = await self._loop.run_in_executor(self._executor, handle_request, request)
+        seconds = time.perf_counter() - started
+        await self._write_response(writer, response, keep_alive, version == 'HTTP/1.0')
+        if response.file is not None:
+            size = response.file[2]
+        else:
+            size = len(response.body) if response.status != 304 else 0
+        self._log_request(peername, request_line, response.status, started, size, seconds)
+        return keep_alive
+
+    async def _write_response(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool,
+                              http10: bool = False):
+        """
+        写出响应，文件响应体通过sendfile发送
+
+        Args:
+            writer: 连接的写入流
+            response: HTTP响应
+            keep_alive: 响应后是否保持连接
+            http10: 客户端是否使用HTTP/1.0
+        """
+        with stage_timer("write"):
+            try:
+                phrase = HTTPStatus(response.status).phrase
+            except ValueError:
+                phrase = ''
+            lines = [
+                "HTTP/1.1 {0} {1}".format(response.status, phrase),
+                "Server: {0}".format(SERVER_VERSION),
+                "Date: {0}".format(formatdate(usegmt=True)),
+            ]
+            lines.extend("{0}: {1}".format(name, value) for name, value in response.headers)
+            if not keep_alive:
+                lines.append("Connection: close")
+            elif http10:
+                lines.append("Connection: keep-alive")
+            head = ("\r\n".join(lines) + "\r\n\r\n").encode('iso-8859-1')
+
+            if response.file is not None:
+                writer.write(head)
+                await writer.drain()
+                file_path, offset, count = response.file
+                with open(file_path, 'rb') as f:
+                    await self._loop.sendfile(writer.transport, f, offset, count)
+            elif response.status != 304 and response.body:
+                # 响应头和响应体一次写出，避免小响应被拆成两个TCP分段
+                writer.write(head + response.body)
+            else:
+                writer.write(head)
+            await writer.drain()
+
+    @staticmethod
+    def _log_request(peername, request_line: str, status: int, started: float, size: Optional[int] = None,
+                     seconds: Optional[float] = None):
+        """
+        记录结构化的访问日志
+
+        Args:
+            peername: 客户端地址
+            request_line: 请求行
+            status: 响应状态码
+            started: 读到请求的时间
+            size: 响应体字节数，未知时为None
+            seconds: 读到请求到开始写出响应的秒数，默认计算到现在
+        """
+        if seconds is None:
+            seconds = time.perf_counter() - started
+        log_access(peername[0], request_line, status, size, seconds)
+
+
+def create_async_server(server_address: Optional[tuple] = None) -> AsyncNovelServer:
+    """
+    创建asyncio服务器
+
+    Args:
+        server_address: 监听地址，默认为所有网卡的PORT端口
+
+    Returns:
+        asyncio服务器实例
+    """
+    if server_address is None:
+        server_address = ('', PORT)
+    logging.info("以asyncio模式启动: 工作线程%s个，最大连接%s个", MAX_WORKERS, ASYNC_MAX_CONNECTIONS)
+    return AsyncNovelServer(server_address)
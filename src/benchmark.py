@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+基准测试模块
+
+生成指定规模和编码的飞卢格式ZIP，分别测量解压、分章、渲染各阶段的耗时和内存峰值，
+并在本机启动服务器测量端到端的吞吐量和延迟分位数，结果以JSON输出，便于比较不同版本。
+
+测试使用临时目录中的小说库和章节存储，不会影响xs目录和已有的章节存储。
+"""
+
+import os
+import sys
+import time
+import logging
+import platform
+import tempfile
+import threading
+import tracemalloc
+import http.client
+import zipfile
+from statistics import mean, median
+from typing import Any, Callable, Dict, List
+from urllib.parse import quote
+
+from src import catalog as catalog_module
+from src.catalog import NovelCatalog
+from src.storage import chapter_store as chapter_store_module
+from src.storage.chapter_store import ChapterStore
+from src.parsers.zip_parser import extract_txt_from_zip, iter_txt_chunks_from_zip
+from src.parsers.novel_parser import build_chapter_index, novel_chapter_index, novel_chapterizer
+from src.generators.html_generator import render_page
+from src.server import create_server
+
+# 生成的小说的文件名，名称中的“飞卢小说网”使其按飞卢小说的格式解析
+BENCH_NOVEL_FILENAME = "基准测试-飞卢小说网.zip"
+
+# 飞卢小说章节标题行开头的空格
+_TITLE_INDENT = " " * 13
+
+
+def make_feilu_zip(path: str, chapters: int = 2000, paragraphs: int = 30, encoding: str = "gbk") -> int:
+    """
+    生成飞卢格式的小说ZIP
+
+    文本第一行为文件名，章节标题前有13个空格，段落以全角空格缩进，行尾为CRLF，与飞卢小说网下载的文件一致。
+
+    Args:
+        path: ZIP文件路径
+        chapters: 章节数
+        paragraphs: 每章的段落数
+        encoding: 文本编码
+
+    Returns:
+        文本编码后的字节数
+    """
+    lines = ["基准测试-飞卢小说网.txt - 飞卢小说网", " ", " "]
+    for i in range(1, chapters + 1):
+        lines.append("{0}第{1}章 测试章节{1}".format(_TITLE_INDENT, i))
+        for j in range(1, paragraphs + 1):
+            lines.append(" 　　这是第{0}章的第{1}段，他说：“今天的天气很好，我们一起出去走走吧。”".format(i, j))
+    data = "\r\n".join(lines).encode(encoding)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr("基准测试-飞卢小说网.txt", data)
+    return len(data)
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """
+    按最近秩法计算分位数
+
+    Args:
+        sorted_values: 已排序的数值
+        percent: 百分位，0到100
+
+    Returns:
+        分位数，没有数值时返回0
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(percent / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(func: Callable[[], Any], repeat: int = 5) -> Dict[str, Any]:
+    """
+    测量函数的耗时和内存峰值
+
+    先在tracemalloc跟踪下运行一次得到Python内存分配的峰值，再不带跟踪地运行repeat次计时，
+    以免跟踪的开销计入耗时。
+
+    Args:
+        func: 被测函数
+        repeat: 计时的次数
+
+    Returns:
+        包含最短、中位和平均秒数以及内存峰值字节数的字典
+    """
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min_seconds": min(timings),
+        "median_seconds": median(timings),
+        "mean_seconds": mean(timings),
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_stages(zip_path: str, repeat: int = 5) -> Dict[str, Dict[str, Any]]:
+    """
+    分别测量解析和渲染的各个阶段
+
+    Args:
+        zip_path: 飞卢格式的ZIP路径
+        repeat: 每个阶段计时的次数
+
+    Returns:
+        阶段名称 -> 测量结果
+    """
+    text = extract_txt_from_zip(zip_path)
+    index = novel_chapter_index(text)
+    novel_path = "/" + os.path.splitext(os.path.basename(zip_path))[0]
+    chapter_path = "{0}/{1}".format(novel_path, index.route_key(len(index) // 2))
+
+    stages = [
+        # 完整读取：解压并解码全文
+        ("extract", lambda: extract_txt_from_zip(zip_path)),
+        # 分章并拆分所有段落，返回章节字典列表
+        ("chapterize", lambda: novel_chapterizer(text)),
+        # 分章但只记录章节偏移，段落在渲染时拆分
+        ("chapter_index", lambda: novel_chapter_index(text)),
+        # 加载小说的实际路径：边解压边分章
+        ("stream_index", lambda: build_chapter_index(iter_txt_chunks_from_zip(zip_path))),
+        ("render_toc", lambda: render_page(index, novel_path)),
+        ("render_chapter", lambda: render_page(index, chapter_path)),
+    ]
+    results = {}
+    for name, func in stages:
+        results[name] = measure(func, repeat)
+        logging.debug("阶段%s耗时%.4f秒", name, results[name]["min_seconds"])
+    results["chapter_index"]["chapters"] = len(index)
+    return results
+
+
+def _use_library(directory: str, store_path: str):
+    """
+    让请求处理使用临时的小说目录和章节存储
+
+    Args:
+        directory: 小说目录
+        store_path: 章节存储的数据库路径
+    """
+    catalog = NovelCatalog(directory, poll_interval=0)
+    catalog.refresh(force=True)
+    catalog_module._catalog = catalog
+    chapter_store_module._store = ChapterStore(store_path)
+
+
+def _request(conn: http.client.HTTPConnection, path: str) -> int:
+    """
+    发送GET请求并读完响应
+
+    Returns:
+        响应状态码
+    """
+    conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def bench_http(novel_name: str, chapters: int, requests: int = 2000, concurrency: int = 8,
+               mode: str = "threaded") -> Dict[str, Any]:
+    """
+    在本机启动服务器，测量端到端的吞吐量和延迟
+
+    每个客户端线程使用一个长连接，依次请求各个章节页面；第一次打开章节列表的耗时包括解压、分章
+    和写入章节存储，单独记录。
+
+    Args:
+        novel_name: 小说名称
+        chapters: 小说的章节数
+        requests: 章节页面的请求总数
+        concurrency: 并发的客户端连接数
+        mode: 服务模式，"single"、"threaded"或"asyncio"
+
+    Returns:
+        测量结果
+    """
+    httpd = create_server(("127.0.0.1", 0), mode)
+    port = httpd.server_address[1]
+    server_thread = threading.Thread(target=httpd.serve_forever, name="bench-server", daemon=True)
+    server_thread.start()
+
+    base = "/" + quote(novel_name)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        try:
+            while True:
+                with lock:
+                    n = next(counter, None)
+                if n is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    status = _request(conn, "{0}/{1}".format(base, n % chapters + 1))
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    status = 0
+                local.append(time.perf_counter() - start)
+                if status != 200:
+                    with lock:
+                        errors[0] += 1
+        finally:
+            conn.close()
+            with lock:
+                latencies.extend(local)
+
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        try:
+            start = time.perf_counter()
+            status = _request(conn, base)
+            cold_toc = time.perf_counter() - start
+        finally:
+            conn.close()
+        if status != 200:
+            raise RuntimeError("打开章节列表失败，状态码{0}".format(status))
+
+        threads = [threading.Thread(target=client, name="bench-client-%d" % i) for i in range(max(1, concurrency))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        server_thread.join()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "cold_toc_seconds": cold_toc,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_seconds": {
+            "p50": _percentile(latencies, 50),
+            "p90": _percentile(latencies, 90),
+            "p99": _percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+            "mean": mean(latencies) if latencies else 0.0,
+        },
+    }
+
+
+def run_benchmark(chapters: int = 2000, paragraphs: int = 30, encoding: str = "gbk", repeat: int = 5,
+                  requests: int = 2000, concurrency: int = 8, mode: str = "threaded",
+                  skip_http: bool = False) -> Dict[str, Any]:
+    """
+    生成测试小说并运行全部基准测试
+
+    Args:
+        chapters: 章节数
+        paragraphs: 每章的段落数
+        encoding: 文本编码
+        repeat: 每个阶段计时的次数
+        requests: 端到端测试的请求总数
+        concurrency: 端到端测试的并发连接数
+        mode: 端到端测试的服务模式
+        skip_http: 是否跳过端到端测试
+
+    Returns:
+        可以序列化为JSON的测量结果
+    """
+    with tempfile.TemporaryDirectory(prefix="novel-bench-") as workdir:
+        library = os.path.join(workdir, "xs")
+        os.mkdir(library)
+        zip_path = os.path.join(library, BENCH_NOVEL_FILENAME)
+        text_bytes = make_feilu_zip(zip_path, chapters, paragraphs, encoding)
+
+        result = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "parameters": {
+                "chapters": chapters,
+                "paragraphs": paragraphs,
+                "encoding": encoding,
+                "repeat": repeat,
+                "text_bytes": text_bytes,
+                "zip_bytes": os.path.getsize(zip_path),
+            },
+            "stages": bench_stages(zip_path, repeat),
+        }
+
+        if not skip_http:
+            _use_library(library, os.path.join(workdir, "chapters.db"))
+            novel_name = catalog_module.get_catalog().entries()[0].name
+            result["http"] = bench_http(novel_name, chapters, requests, concurrency, mode)
+        return result
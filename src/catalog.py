@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+小说目录模块
+
+该模块在内存中维护小说目录（小说名称到源文件的映射），启动时扫描一次小说目录，
+之后通过轮询目录修改时间增量刷新，请求处理时无需再遍历目录。
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from src.config import XS_DIR, CATALOG_POLL_INTERVAL, CATALOG_STAT_INTERVAL
+from src.parsers.sources import SOURCE_SUFFIXES
+
+# 飞卢小说文件名中小说名称之后的部分，例如"_0000000-飞卢小说网"
+_FEILU_NAME_SUFFIX = re.compile(r"_\d+-飞卢小说网$")
+
+
+def novel_name_from_filename(filename: str, suffixes: Tuple[str, ...] = SOURCE_SUFFIXES) -> str:
+    """
+    根据源文件名得到小说名称
+
+    Args:
+        filename: 源文件名
+        suffixes: 源文件后缀，小写
+
+    Returns:
+        小说名称
+    """
+    lower = filename.lower()
+    suffix = next((suffix for suffix in suffixes if lower.endswith(suffix)), "")
+    stem = filename[:-len(suffix)] if suffix else filename
+    return _FEILU_NAME_SUFFIX.sub("", stem) or stem
+
+
+class NovelEntry:
+    """
+    目录中的一本小说
+    """
+
+    __slots__ = ("name", "filename", "path", "size", "mtime_ns", "chapter_count")
+
+    def __init__(self, name: str, filename: str, path: str, size: int, mtime_ns: int):
+        """
+        初始化目录条目
+
+        Args:
+            name: 小说名称
+            filename: 源文件名
+            path: 源文件完整路径
+            size: 文件大小
+            mtime_ns: 文件修改时间（纳秒）
+        """
+        self.name = name
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # 解析后才知道章节数，未解析时为None
+        self.chapter_count = None
+
+
+class NovelCatalog:
+    """
+    小说目录
+
+    目录数据整体替换而不是原地修改，读取时无需加锁。
+    """
+
+    def __init__(self, directory: str = XS_DIR, suffixes: Tuple[str, ...] = SOURCE_SUFFIXES,
+                 poll_interval: float = CATALOG_POLL_INTERVAL, stat_interval: float = CATALOG_STAT_INTERVAL):
+        """
+        初始化小说目录
+
+        Args:
+            directory: 小说目录路径
+            suffixes: 收录的源文件后缀，小写，默认为RULES中声明的后缀
+            poll_interval: 轮询目录变化的间隔秒数
+            stat_interval: 目录修改时间未变时逐个检查文件的间隔秒数
+        """
+        self.directory = directory
+        self.suffixes = suffixes
+        self.poll_interval = poll_interval
+        self.stat_interval = stat_interval
+        self.version = 0
+        self.dir_mtime_ns = None
+        self._scanned_at = 0.0
+        self._entries = {}
+        self._listeners = []
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def get(self, name: str) -> Optional[NovelEntry]:
+        """
+        按名称精确查找小说
+
+        Args:
+            name: 小说名称
+
+        Returns:
+            目录条目，不存在时返回None
+        """
+        return self._entries.get(name)
+
+    def entries(self) -> List[NovelEntry]:
+        """
+        获取所有小说，按文件名排序
+
+        Returns:
+            目录条目列表
+        """
+        return list(self._entries.values())
+
+    def add_listener(self, listener: Callable[[List[NovelEntry]], None]):
+        """
+        注册目录变化监听函数
+
+        Args:
+            listener: 目录变化后调用，参数为新增和发生变化的条目列表
+        """
+        self._listeners.append(listener)
+
+    def set_chapter_count(self, name: str, chapter_count: int):
+        """
+        记录小说解析后的章节数
+
+        Args:
+            name: 小说名称
+            chapter_count: 章节数
+        """
+        entry = self._entries.get(name)
+        if entry is not None:
+            entry.chapter_count = chapter_count
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        目录修改时间变化时重新扫描小说目录
+
+        原地覆盖文件不会改变目录的修改时间，因此目录未变时也每隔stat_interval秒逐个检查文件。
+        未变化的文件沿用原有条目，只为新增和变化的文件创建条目。
+
+        Args:
+            force: 为True时忽略目录修改时间，总是重新扫描
+
+        Returns:
+            目录内容发生变化时返回True
+        """
+        with self._refresh_lock:
+            updated = self._rescan(force)
+        if updated is None:
+            return False
+
+        for listener in self._listeners:
+            try:
+                listener(updated)
+            except Exception as e:
+                logging.error("通知小说目录变化时出错: %s", str(e))
+        return True
+
+    def _rescan(self, force: bool) -> Optional[List[NovelEntry]]:
+        """
+        重新扫描小说目录，调用方需持有刷新锁
+
+        Args:
+            force: 为True时忽略目录修改时间，总是重新扫描
+
+        Returns:
+            目录内容发生变化时返回新增和变化的条目列表，否则返回None
+        """
+        try:
+            dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            dir_mtime_ns = None
+        now = time.monotonic()
+        if (not force and self.dir_mtime_ns is not None and dir_mtime_ns == self.dir_mtime_ns
+                and now - self._scanned_at < self.stat_interval):
+            return None
+        self._scanned_at = now
+
+        old_entries = self._entries
+        new_entries = {}
+        updated = []
+        added = changed = 0
+        try:
+            with os.scandir(self.directory) as it:
+                dir_entries = sorted((e for e in it if e.name.lower().endswith(self.suffixes)), key=lambda e: e.name)
+        except OSError as e:
+            logging.error("扫描小说目录时出错: %s", str(e))
+            dir_entries = []
+
+        for dir_entry in dir_entries:
+            try:
+                if not dir_entry.is_file():
+                    continue
+                stat = dir_entry.stat()
+            except OSError:
+                continue
+
+            name = novel_name_from_filename(dir_entry.name, self.suffixes)
+            if name in new_entries:
+                logging.warning("小说名称重复，忽略文件: %s", dir_entry.name)
+                continue
+
+            old = old_entries.get(name)
+            if (old is not None and old.filename == dir_entry.name
+                    and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns):
+                new_entries[name] = old
+                continue
+
+            if old is None:
+                added += 1
+            else:
+                changed += 1
+            entry = NovelEntry(name, dir_entry.name, dir_entry.path, stat.st_size, stat.st_mtime_ns)
+            new_entries[name] = entry
+            updated.append(entry)
+
+        removed = len([name for name in old_entries if name not in new_entries])
+        self.dir_mtime_ns = dir_mtime_ns
+        if not (added or changed or removed) and self.version:
+            return None
+
+        self._entries = new_entries
+        self.version += 1
+        logging.info("小说目录已更新: 共%s本，新增%s本，变化%s本，移除%s本",
+                     len(new_entries), added, changed, removed)
+        return updated
+
+    def start(self):
+        """
+        启动后台线程，定期检查小说目录是否变化
+        """
+        if self._thread is not None or self.poll_interval <= 0:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll, name="catalog-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止后台轮询线程
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self):
+        """
+        后台轮询循环
+        """
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error("刷新小说目录时出错: %s", str(e))
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> NovelCatalog:
+    """
+    获取全局小说目录，首次调用时扫描小说目录
+
+    Returns:
+        小说目录
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                catalog = NovelCatalog()
+                catalog.refresh(force=True)
+                _catalog = catalog
+    return _catalog
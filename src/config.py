@@ -29,30 +29,113 @@ ENV = "production"  # 默认环境为生产环境
 # 服务配置
 PORT = 8080  # 服务开启端口
 
+# 并发配置
+SERVER_MODE = "threaded"  # 服务模式，"single"为单线程，"threaded"为线程池并发，"asyncio"为事件循环，"prefork"为多进程
+MAX_WORKERS = 16  # 线程池中处理连接的工作线程数
+MAX_IN_FLIGHT = 64  # 同时处理（含等待工作线程）的最大连接数，超出时返回503
+REQUEST_QUEUE_SIZE = 64  # 监听套接字的连接排队深度
+ASYNC_MAX_CONNECTIONS = 4096  # asyncio模式下同时保持的最大连接数，超出时返回503，需小于进程的文件描述符上限
+
+# 多进程配置（仅类Unix系统，其他系统上prefork模式改用threaded模式）
+PREFORK_WORKERS = 0  # prefork模式的工作进程数，为0时使用CPU核心数
+PREFORK_WORKER_MODE = "threaded"  # prefork模式下每个工作进程的服务模式，"threaded"或"asyncio"
+PREFORK_GRACEFUL_TIMEOUT = 10  # 停止时等待工作进程处理完当前请求的秒数，超时后强制结束
+
+# 长连接配置
+KEEPALIVE_TIMEOUT = 5  # 长连接的空闲超时秒数
+KEEPALIVE_MAX_REQUESTS = 100  # 每个连接最多处理的请求数，为1时不保持连接
+
+# 小说目录配置
+CATALOG_POLL_INTERVAL = 2.0  # 检查小说目录变化的间隔秒数，为0时只在找不到小说时检查
+CATALOG_STAT_INTERVAL = 30.0  # 目录修改时间未变时逐个检查文件的间隔秒数，用于发现被原地覆盖的文件
+
+# 后台预热配置
+WARMUP_ENABLED = False  # 是否在启动后于后台预先解析小说库中的所有小说
+WARMUP_PROCESSES = 1  # 预热使用的进程数，即预热最多占用的CPU核心数
+WARMUP_NICE = 10  # 预热进程和全文索引进程的优先级增量（仅类Unix系统），数值越大越不影响请求处理
+
+# 页面缓存配置
+RENDER_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 已渲染页面缓存的最大字节数，为0时关闭页面缓存
+PARSE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 小说解析结果缓存的最大字节数（按章节序列的近似大小计算），为0时不缓存
+
+# 压缩配置
+COMPRESSION_ENABLED = True  # 是否按Accept-Encoding压缩HTML响应
+COMPRESSION_LEVEL = 6  # 压缩级别，1最快，9压缩率最高
+COMPRESSION_MIN_SIZE = 512  # 小于该字节数的响应不压缩
+STATIC_MAX_AGE = 30 * 24 * 3600  # 静态文件的浏览器缓存秒数，页面中的静态文件地址带有版本参数
+
+# 静态文件配置
+STATIC_CACHE_MAX_BYTES = 4 * 1024 * 1024  # 小静态文件内存缓存的最大字节数
+STATIC_CACHE_MAX_FILE_SIZE = 64 * 1024  # 不超过该字节数的静态文件缓存在内存中，更大的文件用sendfile发送
+
+# 目录分页配置
+TOC_PAGE_SIZE = 200  # 章节列表每页显示的章节数，也是章节索引接口每次默认返回的章节数
+TOC_MAX_PAGE_SIZE = 1000  # 章节列表每页和章节索引接口每次最多返回的章节数
+
+# 全文搜索配置
+SEARCH_ENABLED = True  # 是否在后台为小说库建立全文索引并提供搜索页面
+SEARCH_INDEX_FILE = "search.db"  # 全文索引的SQLite数据库文件名称，与章节存储放在同一目录
+SEARCH_MAX_RESULTS = 50  # 每次搜索最多返回的章节数
+SEARCH_MAX_CANDIDATES = 2000  # 每次搜索最多读取正文确认的候选章节数，超出时结果不完整
+
+# 指标配置
+METRICS_ENABLED = True  # 是否按阶段统计请求耗时并提供/metrics（Prometheus格式）和/status页面
+
 # 路径配置
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 XS_DIR = os.path.join(BASE_DIR, "xs")  # 小说源文件放的位置
 STATIC_DIR = os.path.join(BASE_DIR, "static")  # 静态文件目录
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")  # 模板文件目录
 LOGS_DIR = os.path.join(BASE_DIR, "logs")  # 日志文件目录
+CACHE_DIR = os.path.join(BASE_DIR, "cache")  # 解析结果缓存目录
 
 # 日志配置
 LOG_FILE_NAME = "server.log"  # 默认的日志文件名称
 LOG_LEVEL = "INFO"  # 默认的日志级别
+LOG_MAX_BYTES = 10 * 1024 * 1024  # 日志文件超过该字节数后轮转，为0时不按大小轮转
+LOG_ROTATE_INTERVAL = 24 * 3600  # 日志文件打开超过该秒数后轮转，为0时不按时间轮转
+LOG_BACKUP_COUNT = 5  # 轮转后保留的旧日志文件数
+LOG_FLUSH_INTERVAL = 1.0  # 持续有日志写入时，缓冲的日志最长间隔该秒数写入文件
+ACCESS_LOG_ENABLED = True  # 是否记录访问日志
+ACCESS_LOG_FILE_NAME = "access.log"  # 访问日志文件名称，每行一条JSON记录，与LOG_FILE_NAME放在同一目录，轮转规则相同
+ACCESS_LOG_SAMPLE_RATE = 1.0  # 成功请求（状态码小于400）的访问日志采样比例，0到1之间；错误和慢请求总是记录
+ACCESS_LOG_SLOW_SECONDS = 1.0  # 处理耗时超过该秒数的请求视为慢请求
+
+# 章节存储配置
+CHAPTER_STORE_ENABLED = True  # 是否将解析后的章节持久化到磁盘，重启后无需重新解析
+CHAPTER_STORE_FILE = "chapters.db"  # 章节存储的SQLite数据库文件名称
+STREAM_CHUNK_SIZE = 64 * 1024  # 流式解压时每次读取的字节数，也用作编码检测的样本大小
+LAZY_CHAPTER_INDEX = True  # 是否以偏移索引缓存小说，段落只在渲染章节时拆分，显著降低内存占用
 
 # 小说配置
 TARGET = "飞卢小说"  # 小说目标
-ENDSWITH = ".zip"  # 小说源文件的格式
 
 # 小说规则配置
+# endswith为适用的文件后缀（字符串或列表），小说目录收录所有规则中出现的.zip、.txt和.epub后缀；
+# chapter_patterns为章节标题行的正则表达式（多行模式），每个表达式只能匹配单独一行，
+# 名为title的分组为章节标题，没有该分组时使用整个匹配。
+# 分章时依次尝试适用的规则，使用第一个能在小说开头找到章节标题的规则；EPUB的章节取自书中的目录，不使用分章规则
+_CHINESE_NUMBER = "[0-9零一二三四五六七八九十百千万两〇]+"
 RULES = [
     {
         "name": "飞卢小说",
-        "endswith": ".zip"
+        "endswith": ".zip",
+        # 章节标题前有一个换行和13个空格
+        "chapter_patterns": [r"\n {13}(?P<title>[^\n]*)"]
+    },
+    {
+        "name": "通用",
+        "endswith": [".zip", ".txt", ".epub"],
+        "chapter_patterns": [
+            r"^[ \t]*(?P<title>第" + _CHINESE_NUMBER + r"[章节回卷部集][^\n]{0,30})$",
+            # 段落开头的全角空格已被移除，关键字之后须为分隔符或行尾，以免把正文当作标题
+            r"^[ \t]*(?P<title>(?:序章|楔子|引子|序言|前言|尾声|后记|番外)(?:[ \t:：·、][^\n]{0,30})?)$",
+            r"^[ \t]*(?P<title>[Cc]hapter [0-9]+[^\n]{0,60})$",
+        ]
     }
 ]
 
 # 确保必要的目录存在
-for dir_path in [XS_DIR, LOGS_DIR, STATIC_DIR, TEMPLATES_DIR]:
+for dir_path in [XS_DIR, LOGS_DIR, STATIC_DIR, TEMPLATES_DIR, CACHE_DIR]:
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
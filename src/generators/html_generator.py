@@ -17,184 +17,104 @@
 """
 HTML生成器模块
 
-该模块负责生成HTML内容，包括小说列表、章节列表和章节内容页面。
+该模块负责生成HTML内容，包括小说列表、章节列表、章节内容、搜索结果和服务状态页面。
+页面的公共头尾和固定片段预先构建，渲染时只拼接页面主体并整体编码一次；
+标题、正文和链接地址均经过HTML转义。
 """
 
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from html import escape
+from typing import Any, Dict, List, Optional
 from urllib.parse import unquote
-from src.config import XS_DIR, ENDSWITH
+from src.config import STATIC_DIR, TOC_PAGE_SIZE, SEARCH_ENABLED
+from src.catalog import get_catalog
+from src.parsers.novel_parser import ChapterIndex
 
 
-def generate_html(chapters: Optional[List[Dict[str, Any]]] = None, path: str = "/") -> str:
+def static_url(relative_path: str) -> str:
     """
-    生成HTML内容
-    
+    生成带版本参数的静态文件地址
+
+    版本参数取自文件的修改时间，文件更新后地址随之变化，浏览器可以长期缓存静态文件。
+
     Args:
-        chapters: 章节列表，如果为None则显示小说列表
-        path: 请求路径
-        
+        relative_path: 相对于静态文件目录的路径
+
     Returns:
-        生成的HTML内容
+        静态文件地址
     """
     try:
-        # 基础HTML结构
-        html_parts = [
-            '<!DOCTYPE html>',
-            '<html lang="zh-CN">',
-            '<head>',
-            '    <meta charset="UTF-8">',
-            '    <meta name="viewport" content="width=device-width, initial-scale=1.0">',
-            '    <title>小说阅读器</title>',
-            '    <link rel="stylesheet" href="/static/css/style.css">',
-            '    <script src="/static/js/app.js"></script>',
-            '</head>',
-            '<body>',
-            '    <div class="container">',
-            '        <header class="header">',
-            '            <h1>小说阅读器</h1>',
-            '            <div class="header-controls">',
-            '                <button id="dark-mode-toggle">深色模式</button>',
-            '                <button id="font-decrease">字体减小</button>',
-            '                <button id="font-increase">字体增大</button>',
-            '                <button id="add-bookmark">添加书签</button>',
-            '            </div>',
-            '        </header>',
-            '        <main class="main-content">'
-        ]
-        
-        if path == "/":
-            # 显示小说列表
-            html_parts.extend([
-                '<section class="novel-list">',
-                '<h2>小说列表</h2>',
-                '<ul class="novel-list">'
-            ])
-            
-            # 获取小说列表
-            novels = []
-            if os.path.exists(XS_DIR):
-                for filename in os.listdir(XS_DIR):
-                    if filename.endswith(ENDSWITH):
-                        novel_name = filename[:-18]  # 移除后缀
-                        novel_path = "/{0}".format(novel_name)
-                        novels.append((novel_name, novel_path))
-            
-            if novels:
-                for novel_name, novel_path in novels:
-                    html_parts.append('<li><a href="{0}">{1}</a></li>'.format(novel_path, novel_name))
-            else:
-                html_parts.append('<li>暂无小说，请将小说ZIP文件放入xs目录</li>')
-            
-            html_parts.extend([
-                '</ul>',
-                '</section>'
-            ])
-            
-        elif path.count("/") == 1:
-            # 显示章节列表
-            html_parts.extend([
-                '<section class="chapter-list">',
-                '<h2>章节列表</h2>',
-                '<div class="navigation-links">',
-                '<a href="/" class="home-link">返回首页</a>',
-                '</div>',
-                '<ul class="chapter-list">'
-            ])
-            
-            if chapters and len(chapters) > 0:
-                for chapter in chapters:
-                    chapter_path = "{0}/{1}".format(path, chapter['title'])
-                    html_parts.append('<li><a href="{0}">{1}</a></li>'.format(chapter_path, chapter['title']))
-            else:
-                html_parts.append('<li>暂无章节内容</li>')
-            
-            html_parts.extend([
-                '</ul>',
-                '</section>'
-            ])
-            
-        else:
-            # 显示章节内容
-            html_parts.append('<section class="chapter-content">')
-            
-            if chapters and len(chapters) > 0:
-                # 提取章节标题
-                chapter_title = unquote(path).split("/")[-1]
-                
-                # 查找对应章节
-                target_chapter = None
-                chapter_index = -1
-                for i, chapter in enumerate(chapters):
-                    if chapter["title"] == chapter_title:
-                        target_chapter = chapter
-                        chapter_index = i
-                        break
-                
-                if target_chapter:
-                    html_parts.append('<h2>{0}</h2>'.format(target_chapter['title']))
-                    html_parts.append('<div class="content">')
-                    
-                    for paragraph in target_chapter['content']:
-                        if paragraph:
-                            html_parts.append('<p>{0}</p>'.format(paragraph))
-                    
-                    html_parts.append('</div>')
-                    
-                    # 添加章节导航
-                    html_parts.append('<div class="chapter-navigation">')
-                    
-                    # 返回首页
-                    html_parts.append('<a href="/" class="home-link">返回首页</a>')
-                    
-                    # 上一章
-                    if chapter_index > 0:
-                        prev_chapter = chapters[chapter_index - 1]
-                        prev_path = "{0}/{1}".format(path.rsplit('/', 1)[0], prev_chapter['title'])
-                        html_parts.append('<a href="{0}" class="prev-chapter">上一章</a>'.format(prev_path))
-                    
-                    # 返回目录
-                    novel_path = path.rsplit('/', 1)[0]
-                    html_parts.append('<a href="{0}" class="toc-link">返回目录</a>'.format(novel_path))
-                    
-                    # 下一章
-                    if chapter_index < len(chapters) - 1:
-                        next_chapter = chapters[chapter_index + 1]
-                        next_path = "{0}/{1}".format(path.rsplit('/', 1)[0], next_chapter['title'])
-                        html_parts.append('<a href="{0}" class="next-chapter">下一章</a>'.format(next_path))
-                    
-                    html_parts.append('</div>')
-                else:
-                    html_parts.extend([
-                        '<h2>章节未找到</h2>',
-                        '<p>抱歉，未找到该章节内容。</p>'
-                    ])
-            else:
-                html_parts.extend([
-                    '<h2>章节内容</h2>',
-                    '<p>暂无章节内容</p>'
-                ])
-            
-            html_parts.append('</section>')
-        
-        # 结束HTML结构
-        html_parts.extend([
-            '        </main>',
-            '        <footer class="footer">',
-            '            <p>© 2025 小说阅读器</p>',
-            '        </footer>',
-            '    </div>',
-            '</body>',
-            '</html>'
-        ])
-        
-        return '\n'.join(html_parts)
-        
-    except Exception as e:
-        logging.error("生成HTML时出错: %s", str(e))
-        # 返回错误页面
-        error_html = """
+        version = int(os.stat(os.path.join(STATIC_DIR, relative_path)).st_mtime)
+    except OSError:
+        return "/static/{0}".format(relative_path)
+    return "/static/{0}?v={1:x}".format(relative_path, version)
+
+
+# 页面公共头部，静态文件地址在渲染时填入
+_PAGE_HEAD = "\n".join([
+    '<!DOCTYPE html>',
+    '<html lang="zh-CN">',
+    '<head>',
+    '    <meta charset="UTF-8">',
+    '    <meta name="viewport" content="width=device-width, initial-scale=1.0">',
+    '    <title>小说阅读器</title>',
+    '    <link rel="stylesheet" href="{css}">',
+    '    <script src="{js}"></script>',
+    '</head>',
+    '<body>',
+    '    <div class="container">',
+    '        <header class="header">',
+    '            <h1>小说阅读器</h1>',
+    '{search}',
+    '            <div class="header-controls">',
+    '                <button id="dark-mode-toggle">深色模式</button>',
+    '                <button id="font-decrease">字体减小</button>',
+    '                <button id="font-increase">字体增大</button>',
+    '                <button id="add-bookmark">添加书签</button>',
+    '            </div>',
+    '        </header>',
+    '        <main class="main-content">',
+    ''
+])
+
+# 页面头部中的搜索框，关闭全文搜索时不显示
+_SEARCH_FORM = ('            <form class="search-form" action="/search" method="get" role="search">\n'
+                '                <input type="search" name="q" value="{query}" placeholder="搜索全文" required>\n'
+                '                <button type="submit">搜索</button>\n'
+                '            </form>')
+
+# 页面公共尾部
+_PAGE_FOOT = "\n".join([
+    '',
+    '        </main>',
+    '        <footer class="footer">',
+    '            <p>© 2025 小说阅读器</p>',
+    '        </footer>',
+    '    </div>',
+    '</body>',
+    '</html>'
+]).encode('utf-8')
+
+# 各页面中固定不变的片段
+_NOVEL_LIST_OPEN = '<section class="novel-list">\n<h2>小说列表</h2>\n<ul class="novel-list">\n'
+_NOVEL_LIST_EMPTY = '<li>暂无小说，请将小说ZIP文件放入xs目录</li>\n'
+_TOC_OPEN = ('<section class="chapter-list">\n<h2>章节列表</h2>\n<div class="navigation-links">\n'
+             '<a href="/" class="home-link">返回首页</a>\n</div>\n')
+# 章节列表的data属性供前端脚本按需加载后续章节
+_TOC_LIST_OPEN = ('<ul class="chapter-list" data-base="{base}" data-api="{api}" data-total="{total}" '
+                  'data-end="{end}" data-limit="{limit}">\n')
+_TOC_EMPTY = '<li>暂无章节内容</li>\n'
+_LIST_CLOSE = '</ul>\n</section>'
+_LINK_ITEM = '<li><a href="{0}">{1}</a></li>\n'
+# 章节内容的data属性供前端阅读模式通过章节接口切换和预取章节
+_CHAPTER_OPEN = ('<section class="chapter-content" data-base="{base}" data-api="{api}" data-index="{index}" '
+                 'data-total="{total}">\n<h2>{title}</h2>\n<div class="content">\n')
+_PARAGRAPH_BREAK = '</p>\n<p>'
+_CHAPTER_NOT_FOUND = '<section class="chapter-content">\n<h2>章节未找到</h2>\n<p>抱歉，未找到该章节内容。</p>\n</section>'
+_CHAPTER_EMPTY = '<section class="chapter-content">\n<h2>章节内容</h2>\n<p>暂无章节内容</p>\n</section>'
+
+_ERROR_PAGE = """
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -211,5 +131,439 @@ def generate_html(chapters: Optional[List[Dict[str, Any]]] = None, path: str = "
             </div>
         </body>
         </html>
-        """
-        return error_html
+        """.encode('utf-8')
+
+# 已编码的页面头部及其对应的静态文件地址，静态文件版本变化时重新生成
+_head_cache = (None, b"")
+
+
+def _page_head() -> bytes:
+    """
+    获取已编码的页面头部
+
+    头部只随静态文件版本变化，每个版本只格式化和编码一次。
+
+    Returns:
+        页面头部字节
+    """
+    global _head_cache
+    urls = (static_url("css/style.css"), static_url("js/app.js"))
+    cached_urls, head = _head_cache
+    if cached_urls != urls:
+        head = _format_head(urls)
+        _head_cache = (urls, head)
+    return head
+
+
+def _format_head(urls, query: str = "") -> bytes:
+    """
+    格式化并编码页面头部
+
+    Args:
+        urls: (样式表地址, 脚本地址)
+        query: 搜索框中预先填入的查询内容
+
+    Returns:
+        页面头部字节
+    """
+    search = _SEARCH_FORM.format(query=escape(query)) if SEARCH_ENABLED else ""
+    return _PAGE_HEAD.format(css=escape(urls[0]), js=escape(urls[1]), search=search).encode('utf-8')
+
+
+# 会改变地址结构的字符及其编码，%必须最先替换
+_URL_RESERVED = (("%", "%25"), ("?", "%3F"), ("#", "%23"), ("/", "%2F"))
+
+
+def _quote_segment(segment: str) -> str:
+    """
+    把路径中的一段转义为可以放入href属性的形式
+
+    非ASCII字符由浏览器负责编码，这里只编码会改变地址结构的字符，再做HTML转义。
+    绝大多数标题不含这些字符，比urllib.parse.quote快一个数量级。
+
+    Args:
+        segment: 未编码的路径段
+
+    Returns:
+        转义后的路径段
+    """
+    for char, encoded in _URL_RESERVED:
+        if char in segment:
+            segment = segment.replace(char, encoded)
+    return escape(segment)
+
+
+def _quote_path(path: str) -> str:
+    """
+    把请求路径转义为可以放入href属性的形式
+
+    Args:
+        path: 请求中的路径，可以是百分号编码的形式
+
+    Returns:
+        转义后的路径
+    """
+    return "/".join(_quote_segment(segment) for segment in unquote(path).split("/"))
+
+
+def _render(fragments: List[str], head: Optional[bytes] = None) -> bytes:
+    """
+    把页面片段拼接为完整页面
+
+    Args:
+        fragments: 页面主体片段，均已转义
+        head: 页面头部，默认使用公共头部
+
+    Returns:
+        UTF-8编码的完整页面
+    """
+    if head is None:
+        head = _page_head()
+    return b"".join((head, "".join(fragments).encode('utf-8'), _PAGE_FOOT))
+
+
+def render_novel_list() -> bytes:
+    """
+    渲染小说列表页面
+
+    Returns:
+        UTF-8编码的页面
+    """
+    # 从小说目录获取小说列表，无需访问文件系统
+    novels = get_catalog().entries()
+    fragments = [_NOVEL_LIST_OPEN]
+    if novels:
+        fragments.extend(
+            _LINK_ITEM.format("/" + _quote_segment(novel.name), escape(novel.name, quote=False)) for novel in novels
+        )
+    else:
+        fragments.append(_NOVEL_LIST_EMPTY)
+    fragments.append(_LIST_CLOSE)
+    return _render(fragments)
+
+
+def _toc_href(base: str, page: int, page_size: int) -> str:
+    """
+    生成章节列表指定页的地址
+
+    Args:
+        base: 已转义的小说地址
+        page: 页码，从1开始
+        page_size: 每页章节数
+
+    Returns:
+        章节列表地址
+    """
+    if page_size != TOC_PAGE_SIZE:
+        return "{0}?page={1}&amp;size={2}".format(base, page, page_size)
+    if page > 1:
+        return "{0}?page={1}".format(base, page)
+    return base
+
+
+def _render_pagination(base: str, page: int, pages: int, page_size: int) -> str:
+    """
+    渲染章节列表的分页导航
+
+    Args:
+        base: 已转义的小说地址
+        page: 当前页码
+        pages: 总页数
+        page_size: 每页章节数
+
+    Returns:
+        分页导航片段，只有一页时为空
+    """
+    if pages <= 1:
+        return ""
+    links = ['<div class="pagination">\n']
+    if page > 1:
+        links.append('<a href="{0}" class="first-page">首页</a>\n'.format(_toc_href(base, 1, page_size)))
+        links.append('<a href="{0}" class="prev-page">上一页</a>\n'.format(_toc_href(base, page - 1, page_size)))
+    links.append('<span class="page-info">第{0}/{1}页</span>\n'.format(page, pages))
+    if page < pages:
+        links.append('<a href="{0}" class="next-page">下一页</a>\n'.format(_toc_href(base, page + 1, page_size)))
+        links.append('<a href="{0}" class="last-page">末页</a>\n'.format(_toc_href(base, pages, page_size)))
+    links.append('</div>\n')
+    return "".join(links)
+
+
+def render_toc(chapters: Optional[ChapterIndex], path: str, page: int = 1, page_size: int = TOC_PAGE_SIZE) -> bytes:
+    """
+    渲染章节列表页面
+
+    每页只包含一段章节，页面大小与小说的总章节数无关；后续章节由前端脚本通过章节索引接口按需加载。
+
+    Args:
+        chapters: 章节序列
+        path: 请求路径，不含查询参数
+        page: 页码，从1开始，超出范围时取最近的有效页
+        page_size: 每页章节数
+
+    Returns:
+        UTF-8编码的页面
+    """
+    fragments = [_TOC_OPEN]
+    if chapters:
+        total = len(chapters)
+        pages = (total + page_size - 1) // page_size
+        page = min(max(page, 1), pages)
+        start = (page - 1) * page_size
+        end = min(start + page_size, total)
+
+        base = _quote_path(path)
+        pagination = _render_pagination(base, page, pages, page_size)
+        fragments.append(pagination)
+        fragments.append(_TOC_LIST_OPEN.format(
+            base=base, api="/api" + base + "/chapters", total=total, end=end, limit=page_size
+        ))
+        # 目录只需要章节标题，无需拆分正文
+        prefix = base + "/"
+        titles = chapters.titles
+        fragments.extend(
+            _LINK_ITEM.format(prefix + _quote_segment(chapters.route_key(i)), escape(titles[i], quote=False))
+            for i in range(start, end)
+        )
+        fragments.append('</ul>\n')
+        fragments.append(pagination)
+        fragments.append('</section>')
+    else:
+        fragments.extend(('<ul class="chapter-list">\n', _TOC_EMPTY, _LIST_CLOSE))
+    return _render(fragments)
+
+
+def render_chapter(chapters: Optional[ChapterIndex], path: str) -> bytes:
+    """
+    渲染章节内容页面
+
+    正文整体转义一次，再把段落间的换行替换为段落标签，不逐段格式化。
+
+    Args:
+        chapters: 章节序列
+        path: 请求路径
+
+    Returns:
+        UTF-8编码的页面
+    """
+    if not chapters:
+        return _render([_CHAPTER_EMPTY])
+
+    # 通过标题映射查找对应章节，只读取目标章节的正文
+    novel_path, _, chapter_key = path.rpartition("/")
+    chapter_index = chapters.resolve(unquote(chapter_key))
+    if chapter_index < 0:
+        return _render([_CHAPTER_NOT_FOUND])
+
+    base = _quote_path(novel_path)
+    fragments = [_CHAPTER_OPEN.format(
+        base=base, api="/api" + base + "/chapters", index=chapter_index, total=len(chapters),
+        title=escape(chapters.titles[chapter_index], quote=False)
+    )]
+    text = chapters.paragraph_text(chapter_index)
+    if text:
+        # 文本节点中只需转义&、<和>
+        fragments.extend(('<p>', escape(text, quote=False).replace("\n", _PARAGRAPH_BREAK), '</p>\n'))
+    fragments.append('</div>\n<div class="chapter-navigation">\n<a href="/" class="home-link">返回首页</a>\n')
+
+    # 上一章
+    if chapter_index > 0:
+        fragments.append('<a href="{0}/{1}" class="prev-chapter">上一章</a>\n'.format(
+            base, _quote_segment(chapters.route_key(chapter_index - 1))))
+
+    # 返回目录，定位到当前章节所在的页
+    fragments.append('<a href="{0}" class="toc-link">返回目录</a>\n'.format(
+        _toc_href(base, chapter_index // TOC_PAGE_SIZE + 1, TOC_PAGE_SIZE)))
+
+    # 下一章
+    if chapter_index < len(chapters) - 1:
+        fragments.append('<a href="{0}/{1}" class="next-chapter">下一章</a>\n'.format(
+            base, _quote_segment(chapters.route_key(chapter_index + 1))))
+
+    fragments.append('</div>\n</section>')
+    return _render(fragments)
+
+
+def _highlight(text: str, spans) -> str:
+    """
+    转义摘要文本并用mark标签标出匹配位置
+
+    Args:
+        text: 摘要文本
+        spans: 匹配位置的(起, 止)列表，按起点升序且互不重叠
+
+    Returns:
+        已转义的HTML片段
+    """
+    parts = []
+    position = 0
+    for start, end in spans:
+        parts.append(escape(text[position:start], quote=False))
+        parts.append('<mark>{0}</mark>'.format(escape(text[start:end], quote=False)))
+        position = end
+    parts.append(escape(text[position:], quote=False))
+    return "".join(parts)
+
+
+def render_search(query: str, result=None) -> bytes:
+    """
+    渲染搜索结果页面
+
+    Args:
+        query: 查询内容
+        result: 搜索结果，未输入查询内容时为None
+
+    Returns:
+        UTF-8编码的页面，搜索框中填入本次的查询内容
+    """
+    fragments = ['<section class="search-results">\n<h2>全文搜索</h2>\n']
+    if result is None:
+        fragments.append('<p class="search-summary">请输入要搜索的内容</p>\n')
+    else:
+        summary = "找到{0}个章节，用时{1:.0f}毫秒".format(result.matched, result.elapsed * 1000)
+        if result.truncated:
+            summary += "，匹配内容较多，只搜索了部分章节"
+        if result.indexed < result.total:
+            summary += "（全文索引正在建立，已索引{0}/{1}本小说）".format(result.indexed, result.total)
+        fragments.append('<p class="search-summary">{0}</p>\n'.format(summary))
+
+        if result.hits:
+            fragments.append('<ol class="search-hits">\n')
+            for hit in result.hits:
+                fragments.append('<li>\n<a href="/{0}/{1}">{2} - {3}</a>\n'.format(
+                    _quote_segment(hit.novel), _quote_segment(hit.key),
+                    escape(hit.novel, quote=False), escape(hit.title, quote=False)))
+                fragments.extend(
+                    '<p class="snippet">{0}</p>\n'.format(_highlight(text, spans)) for _, text, spans in hit.snippets
+                )
+                fragments.append('</li>\n')
+            fragments.append('</ol>\n')
+        else:
+            fragments.append('<p>没有找到匹配的章节</p>\n')
+
+    fragments.append('<div class="navigation-links">\n<a href="/" class="home-link">返回首页</a>\n</div>\n</section>')
+    head = _format_head((static_url("css/style.css"), static_url("js/app.js")), query)
+    return _render(fragments, head)
+
+
+def _format_bytes(size: Optional[int]) -> str:
+    """
+    把字节数格式化为便于阅读的形式，无法获取时显示为“-”
+    """
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return "{0:.0f}{1}".format(size, unit) if unit == "B" else "{0:.1f}{1}".format(size, unit)
+        size /= 1024.0
+    return "{0:.1f}GB".format(size)
+
+
+def _timing_rows(timings: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    生成耗时统计表格的行
+
+    Args:
+        timings: 名称 -> 包含count、mean、p50、p90、p99的耗时汇总（秒）
+
+    Returns:
+        已转义的表格行
+    """
+    return [
+        '<tr><td>{0}</td><td>{1}</td><td>{2:.2f}</td><td>{3:.2f}</td><td>{4:.2f}</td><td>{5:.2f}</td></tr>\n'.format(
+            escape(name, quote=False), summary["count"], summary["mean"] * 1000, summary["p50"] * 1000,
+            summary["p90"] * 1000, summary["p99"] * 1000)
+        for name, summary in timings.items()
+    ]
+
+
+def render_status(status: Dict[str, Any]) -> bytes:
+    """
+    渲染服务状态页面
+
+    Args:
+        status: metrics.status_snapshot返回的状态汇总
+
+    Returns:
+        UTF-8编码的页面
+    """
+    fragments = ['<section class="status">\n<h2>服务状态</h2>\n<table class="status-table">\n']
+    overview = [
+        ("进程", str(status["pid"])),
+        ("运行时间", "{0:.0f}秒".format(status["uptime"])),
+        ("常驻内存", _format_bytes(status["rss"])),
+        ("常驻内存峰值", _format_bytes(status["peak_rss"])),
+        ("正在处理的请求", str(status["in_flight"])),
+    ]
+    overview.extend((name, "{0:g}".format(value)) for name, (_, value) in sorted(status["gauges"].items()))
+    fragments.extend('<tr><td>{0}</td><td>{1}</td></tr>\n'.format(escape(name, quote=False), value)
+                     for name, value in overview)
+    fragments.append('</table>\n')
+
+    timing_head = '<tr><th>{0}</th><th>次数</th><th>平均(ms)</th><th>P50(ms)</th><th>P90(ms)</th><th>P99(ms)</th></tr>\n'
+    fragments.append('<h3>各阶段耗时</h3>\n<table class="status-table">\n')
+    fragments.append(timing_head.format("阶段"))
+    fragments.extend(_timing_rows(status["stages"]))
+    fragments.append('</table>\n<h3>各路由耗时（不含写出响应）</h3>\n<table class="status-table">\n')
+    fragments.append(timing_head.format("路由"))
+    fragments.extend(_timing_rows(status["routes"]))
+    fragments.append('</table>\n')
+
+    fragments.append('<h3>响应状态</h3>\n<table class="status-table">\n<tr><th>路由</th><th>状态码</th><th>次数</th></tr>\n')
+    fragments.extend('<tr><td>{0}</td><td>{1}</td><td>{2}</td></tr>\n'.format(escape(route, quote=False), code, count)
+                     for (route, code), count in sorted(status["responses"].items()))
+    fragments.append('</table>\n')
+
+    fragments.append('<h3>缓存</h3>\n<table class="status-table">\n<tr><th>缓存</th><th>命中率</th><th>命中</th>'
+                     '<th>未命中</th><th>淘汰</th><th>条目</th><th>占用</th><th>容量</th></tr>\n')
+    fragments.extend(
+        '<tr><td>{0}</td><td>{1:.1%}</td><td>{2}</td><td>{3}</td><td>{4}</td><td>{5}</td><td>{6}</td><td>{7}</td></tr>\n'.format(
+            escape(name, quote=False), stats["hit_ratio"], stats["hits"], stats["misses"], stats["evictions"],
+            stats["entries"], _format_bytes(stats["bytes"]), _format_bytes(stats["max_bytes"]))
+        for name, stats in sorted(status["caches"].items())
+    )
+    fragments.append('</table>\n<p class="search-summary">耗时的分位数为所在统计区间的上限；'
+                     '<a href="/metrics">/metrics</a>提供Prometheus格式的完整指标</p>\n')
+    fragments.append('<div class="navigation-links">\n<a href="/" class="home-link">返回首页</a>\n</div>\n</section>')
+    return _render(fragments)
+
+
+def render_page(chapters: Optional[ChapterIndex] = None, path: str = "/", page: int = 1,
+                page_size: int = TOC_PAGE_SIZE) -> bytes:
+    """
+    根据请求路径渲染页面
+
+    Args:
+        chapters: 章节序列，如果为None则显示小说列表
+        path: 请求路径，不含查询参数
+        page: 章节列表的页码
+        page_size: 章节列表每页的章节数
+
+    Returns:
+        UTF-8编码的页面，可以直接写入套接字
+
+    Raises:
+        Exception: 读取章节正文等出错时原样抛出，由调用方返回错误状态码，避免错误页面被当作正常页面缓存
+    """
+    if path == "/":
+        return render_novel_list()
+    if path.count("/") == 1:
+        return render_toc(chapters, path, page, page_size)
+    return render_chapter(chapters, path)
+
+
+def generate_html(chapters: Optional[ChapterIndex] = None, path: str = "/") -> str:
+    """
+    生成HTML内容
+    
+    Args:
+        chapters: 章节序列，如果为None则显示小说列表
+        path: 请求路径
+        
+    Returns:
+        生成的HTML内容，出错时为错误页面
+    """
+    try:
+        return render_page(chapters, path).decode('utf-8')
+    except Exception as e:
+        logging.error("生成HTML时出错: %s", str(e))
+        return _ERROR_PAGE.decode('utf-8')
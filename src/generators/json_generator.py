@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+JSON生成器模块
+
+该模块负责生成前端脚本使用的JSON数据，包括小说列表、分段的章节索引、单个章节的内容和搜索结果。
+"""
+
+import json
+from typing import Any, Dict, Iterable
+
+from src.config import TOC_PAGE_SIZE
+from src.parsers.novel_parser import ChapterIndex
+
+# JSON响应的内容类型
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+
+def dump_json(data: Dict[str, Any]) -> bytes:
+    """
+    把数据编码为紧凑的UTF-8 JSON
+
+    Args:
+        data: 要编码的数据
+
+    Returns:
+        UTF-8编码的JSON
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def render_novel_list(entries: Iterable) -> bytes:
+    """
+    生成小说列表
+
+    Args:
+        entries: 小说目录条目
+
+    Returns:
+        UTF-8编码的JSON，novels中每项包含名称name、章节数chapter_count（未解析时为null）、
+        源文件大小size和修改时间mtime（秒）
+    """
+    return dump_json({
+        "novels": [
+            {
+                "name": entry.name,
+                "chapter_count": entry.chapter_count,
+                "size": entry.size,
+                "mtime": entry.mtime_ns // 1000000000,
+            }
+            for entry in entries
+        ],
+    })
+
+
+def render_chapter_index(novel_name: str, chapters: ChapterIndex, offset: int, limit: int) -> bytes:
+    """
+    生成一段章节索引
+
+    只读取请求范围内的章节标题，耗时与小说的总章节数无关。
+
+    Args:
+        novel_name: 小说名称
+        chapters: 章节序列
+        offset: 起始章节下标，从0开始
+        limit: 最多返回的章节数
+
+    Returns:
+        UTF-8编码的JSON，chapters中每项包含下标index、标题title和路由中使用的名称key
+    """
+    total = len(chapters)
+    end = min(offset + limit, total)
+    titles = chapters.titles
+    return dump_json({
+        "novel": novel_name,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "chapters": [
+            {"index": i, "title": titles[i], "key": chapters.route_key(i)}
+            for i in range(offset, end)
+        ],
+    })
+
+
+def render_chapter(novel_name: str, chapters: ChapterIndex, index: int) -> bytes:
+    """
+    生成单个章节的内容
+
+    Args:
+        novel_name: 小说名称
+        chapters: 章节序列
+        index: 章节下标，从0开始
+
+    Returns:
+        UTF-8编码的JSON，包含标题title、段落列表paragraphs、路由中使用的名称key、
+        相邻章节的路由名称prev和next（不存在时为null），以及章节所在的目录页码toc_page
+    """
+    total = len(chapters)
+    return dump_json({
+        "novel": novel_name,
+        "index": index,
+        "total": total,
+        "title": chapters.titles[index],
+        "key": chapters.route_key(index),
+        "prev": chapters.route_key(index - 1) if index > 0 else None,
+        "next": chapters.route_key(index + 1) if index < total - 1 else None,
+        "toc_page": index // TOC_PAGE_SIZE + 1,
+        "paragraphs": chapters.paragraphs(index),
+    })
+
+
+def render_search_result(result) -> bytes:
+    """
+    生成搜索结果
+
+    Args:
+        result: 搜索结果
+
+    Returns:
+        UTF-8编码的JSON，hits中每项包含小说名称novel、章节下标index、标题title、路由中使用的名称key、
+        得分score和匹配段落snippets；snippets中每项包含段落下标paragraph、摘要文本text和
+        摘要中匹配位置的列表highlights（每项为[起, 止)）。indexed和total分别为参与搜索的小说数和小说总数
+    """
+    return dump_json({
+        "query": result.query,
+        "matched": result.matched,
+        "truncated": result.truncated,
+        "indexed": result.indexed,
+        "total": result.total,
+        "elapsed_ms": round(result.elapsed * 1000, 1),
+        "hits": [
+            {
+                "novel": hit.novel,
+                "index": hit.index,
+                "title": hit.title,
+                "key": hit.key,
+                "score": hit.score,
+                "snippets": [
+                    {"paragraph": paragraph, "text": text, "highlights": [list(span) for span in spans]}
+                    for paragraph, text, spans in hit.snippets
+                ],
+            }
+            for hit in result.hits
+        ],
+    })
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+日志配置模块
+
+请求线程中的日志调用只把日志记录放入队列，由后台的QueueListener线程统一格式化并写入控制台和日志文件。
+后台线程把队列中积压的记录作为一批写入，一批写完或距上次写入超过LOG_FLUSH_INTERVAL秒时才刷新文件缓冲。
+日志文件按大小和时间轮转；多进程模式下各工作进程共用同一个日志文件，轮转时通过文件锁协调。
+
+访问日志单独写入ACCESS_LOG_FILE_NAME，每行一条JSON记录；成功请求可以按比例采样，错误和慢请求总是记录。
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
+
+from src.config import (
+    LOGS_DIR, LOG_FILE_NAME, LOG_LEVEL, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT, LOG_FLUSH_INTERVAL,
+    ACCESS_LOG_ENABLED, ACCESS_LOG_FILE_NAME, ACCESS_LOG_SAMPLE_RATE, ACCESS_LOG_SLOW_SECONDS
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 日志格式
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# 访问日志使用的日志器，不向根日志器传递
+access_logger = logging.getLogger("novel.access")
+access_logger.propagate = False
+
+# 当前进程的日志配置：(进程ID, 队列监听器, 根日志器上的队列处理器, 访问日志器上的队列处理器)
+_state = None
+# 从父进程继承的处理器，保持引用以免其文件对象被回收时把父进程缓冲的内容再写一次
+_inherited = []
+_state_lock = threading.Lock()
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """
+    批量写入并按大小和时间轮转的日志文件处理器
+
+    每条记录只写入文件对象的缓冲区，由flush统一写出；是否需要轮转也只在flush时检查，
+    文件可能超出大小上限一批记录的长度。其他进程轮转了日志文件时重新打开新文件，而不是再次轮转。
+    """
+
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES, rotate_interval: float = LOG_ROTATE_INTERVAL,
+                 backup_count: int = LOG_BACKUP_COUNT, encoding: str = 'utf-8'):
+        """
+        初始化处理器
+
+        Args:
+            filename: 日志文件路径
+            max_bytes: 文件超过该字节数后轮转，为0时不按大小轮转
+            rotate_interval: 文件打开超过该秒数后轮转，为0时不按时间轮转
+            backup_count: 保留的旧日志文件数
+            encoding: 文件编码
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_interval = rotate_interval
+        self._rollover_at = time.time() + rotate_interval if rotate_interval else None
+
+    def emit(self, record):
+        """
+        把记录写入文件缓冲区，不立即刷新，也不检查是否需要轮转
+        """
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """
+        写出缓冲的记录，并检查是否需要轮转
+        """
+        self.acquire()
+        try:
+            if self.stream is None:
+                return
+            self.stream.flush()
+            if self._replaced() or self._should_rotate():
+                self._rotate()
+        except OSError:
+            pass
+        finally:
+            self.release()
+
+    def doRollover(self):
+        super().doRollover()
+        if self.rotate_interval:
+            self._rollover_at = time.time() + self.rotate_interval
+
+    def _replaced(self) -> bool:
+        """
+        判断日志文件是否已被其他进程轮转，即路径上的文件已不是当前打开的文件
+        """
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self.stream.fileno())
+        return (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino)
+
+    def _should_rotate(self) -> bool:
+        """
+        判断当前文件是否达到轮转的大小或时间
+        """
+        if self.maxBytes > 0 and self.stream.tell() >= self.maxBytes:
+            return True
+        return self._rollover_at is not None and time.time() >= self._rollover_at
+
+    def _rotate(self):
+        """
+        在文件锁的保护下轮转，其他进程已经轮转时只重新打开文件
+        """
+        with _file_lock(self.baseFilename + ".lock"):
+            if self._replaced():
+                self.stream.close()
+                self.stream = self._open()
+                if self.rotate_interval:
+                    self._rollover_at = time.time() + self.rotate_interval
+            elif self._should_rotate():
+                self.doRollover()
+
+
+@contextmanager
+def _file_lock(path: str):
+    """
+    进程间的文件锁，没有fcntl的系统上不加锁（这些系统不支持多进程模式）
+
+    Args:
+        path: 锁文件路径
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    成批处理日志记录的队列监听器
+
+    队列被取空或距上次刷新超过flush_interval秒时，刷新所有处理器，其余时间记录只写入缓冲区。
+    """
+
+    def __init__(self, log_queue, *handlers, flush_interval: float = LOG_FLUSH_INTERVAL):
+        """
+        初始化监听器
+
+        Args:
+            log_queue: 日志记录队列
+            handlers: 实际输出日志的处理器
+            flush_interval: 持续有记录时两次刷新的最长间隔秒数
+        """
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """
+        刷新所有处理器
+        """
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+        self._last_flush = time.monotonic()
+
+    def dequeue(self, block: bool):
+        """
+        从队列中取出一条记录，需要等待新记录前先刷新处理器
+        """
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            if not block:
+                raise
+        self.flush()
+        return self.queue.get()
+
+    def stop(self):
+        """
+        处理完队列中的所有记录后停止，并刷新处理器
+        """
+        super().stop()
+        self.flush()
+
+
+class _ThreadQueueHandler(QueueHandler):
+    """
+    只在线程间传递记录的队列处理器
+
+    监听器与日志调用方在同一进程中，记录无需序列化，因此不在调用线程中格式化消息，
+    调用线程只需把记录放入队列。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class AccessLogFormatter(logging.Formatter):
+    """
+    把访问日志记录格式化为一行JSON
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "pid": record.process,
+        }
+        entry.update(record.access)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _build_handlers() -> List[logging.Handler]:
+    """
+    创建控制台和日志文件的处理器
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = BatchedRotatingFileHandler(os.path.join(LOGS_DIR, LOG_FILE_NAME))
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    return [file_handler, console_handler]
+
+
+def setup_logging(level: Optional[str] = None, access: bool = ACCESS_LOG_ENABLED):
+    """
+    配置根日志器和访问日志器，日志经队列由后台线程写出
+
+    可以重复调用；fork出的子进程中调用时丢弃从父进程继承的配置（后台线程不会随fork复制），重新创建。
+
+    Args:
+        level: 日志级别名称，默认为LOG_LEVEL
+        access: 是否记录访问日志，默认为ACCESS_LOG_ENABLED
+    """
+    global _state
+    with _state_lock:
+        if _state is not None:
+            if _state[0] == os.getpid():
+                return
+            _discard_inherited(_state)
+            _state = None
+
+        handlers = _build_handlers()
+        if access:
+            access_handler = BatchedRotatingFileHandler(os.path.join(LOGS_DIR, ACCESS_LOG_FILE_NAME))
+            access_handler.setFormatter(AccessLogFormatter())
+            access_handler.addFilter(lambda record: record.name == access_logger.name)
+            for handler in handlers:
+                handler.addFilter(lambda record: record.name != access_logger.name)
+            handlers.append(access_handler)
+
+        log_queue = queue.SimpleQueue() if hasattr(queue, "SimpleQueue") else queue.Queue()
+        listener = BatchingQueueListener(log_queue, *handlers)
+        root_handler = _ThreadQueueHandler(log_queue)
+        access_handler = _ThreadQueueHandler(log_queue)
+
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, level or LOG_LEVEL))
+        root.addHandler(root_handler)
+        access_logger.setLevel(logging.INFO if access else logging.CRITICAL + 1)
+        access_logger.addHandler(access_handler)
+        listener.start()
+        _state = (os.getpid(), listener, root_handler, access_handler)
+
+
+def _discard_inherited(state):
+    """
+    移除从父进程继承的队列处理器
+
+    继承的文件处理器既不刷新也不关闭：缓冲区中是父进程尚未写出的内容，由父进程负责写出。
+    """
+    _, listener, root_handler, access_handler = state
+    logging.getLogger().removeHandler(root_handler)
+    access_logger.removeHandler(access_handler)
+    _inherited.extend(listener.handlers)
+
+
+def stop_logging():
+    """
+    停止后台线程，写出队列中剩余的日志，此后的日志不再输出到文件
+    """
+    global _state
+    with _state_lock:
+        if _state is None or _state[0] != os.getpid():
+            return
+        _, listener, root_handler, access_handler = _state
+        _state = None
+    logging.getLogger().removeHandler(root_handler)
+    access_logger.removeHandler(access_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(stop_logging)
+
+
+def log_access(client: str, request_line: str, status: int, size, seconds: float):
+    """
+    记录一条访问日志
+
+    状态码小于400且不是慢请求时按ACCESS_LOG_SAMPLE_RATE采样。
+
+    Args:
+        client: 客户端地址
+        request_line: 请求行
+        status: 响应状态码
+        size: 响应体字节数，未知时为None
+        seconds: 从读到请求到开始写出响应的秒数
+    """
+    if not access_logger.isEnabledFor(logging.INFO):
+        return
+    sampled = status < 400 and seconds < ACCESS_LOG_SLOW_SECONDS and ACCESS_LOG_SAMPLE_RATE < 1.0
+    if sampled and random.random() >= ACCESS_LOG_SAMPLE_RATE:
+        return
+    parts = request_line.split()
+    record = {
+        "client": client,
+        "method": parts[0] if len(parts) == 3 else None,
+        "path": parts[1] if len(parts) == 3 else request_line,
+        "protocol": parts[2] if len(parts) == 3 else None,
+        "status": status,
+        "bytes": size,
+        "ms": round(seconds * 1000, 3),
+    }
+    if sampled:
+        # 便于统计时按采样比例还原请求数
+        record["sample_rate"] = ACCESS_LOG_SAMPLE_RATE
+    access_logger.info("%s %s", request_line, status, extra={"access": record})
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+请求指标模块
+
+按阶段记录请求耗时（小说目录查找、页面缓存查找、章节存储读取、解压解码、分章、渲染、压缩、写出），
+并统计各路由的请求数和耗时、正在处理的请求数和进程内存占用，供/metrics（Prometheus文本格式）
+和/status页面使用。
+
+耗时记录在固定分桶的直方图中，每次记录只需一次二分查找和一次加锁的计数，不保存单次请求的数据。
+多进程模式下每个工作进程各自统计，/metrics返回处理该请求的进程的指标。
+"""
+
+import os
+import sys
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.config import METRICS_ENABLED
+
+# 请求处理的各个阶段
+STAGES = ("catalog", "cache", "store", "extract", "chapterize", "render", "encode", "write")
+
+# 耗时直方图的分桶上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus文本格式的内容类型
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 缓存统计中累计增长的项，其余项为当前值
+_CACHE_COUNTERS = ("hits", "misses", "evictions", "loads", "invalidations")
+_CACHE_GAUGES = ("entries", "bytes", "max_bytes")
+
+
+class Histogram:
+    """
+    固定分桶的耗时直方图
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Args:
+            bounds: 升序排列的分桶上限，另有一个不设上限的分桶
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """
+        记录一次耗时
+
+        Args:
+            value: 秒数
+        """
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        获取直方图的一致快照
+
+        Returns:
+            (各分桶的计数, 总秒数, 总次数)
+        """
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q: float, snapshot: Optional[Tuple[List[int], float, int]] = None) -> float:
+        """
+        估算分位数，结果为所在分桶的上限
+
+        Args:
+            q: 分位，0到1
+            snapshot: 已获取的快照，默认重新获取
+
+        Returns:
+            分位数的估计值，没有记录时返回0；落在最后一个分桶时返回最大的分桶上限
+        """
+        counts, _, count = snapshot or self.snapshot()
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[min(i, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    """
+    进程内的指标集合
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化指标集合
+
+        Args:
+            buckets: 耗时直方图的分桶上限
+        """
+        self.buckets = buckets
+        self.started_at = time.time()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._stages = {stage: Histogram(buckets) for stage in STAGES}
+        # 路由 -> 请求耗时直方图
+        self._routes: Dict[str, Histogram] = {}
+        # (路由, 状态码) -> 请求数
+        self._responses: Dict[Tuple[str, int], int] = {}
+        # 名称 -> (说明, 取值函数)
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def observe_stage(self, stage: str, seconds: float):
+        """
+        记录一个阶段的耗时
+
+        Args:
+            stage: 阶段名称，须为STAGES之一
+            seconds: 秒数
+        """
+        self._stages[stage].observe(seconds)
+
+    def request_started(self):
+        """
+        记录开始处理一个请求
+        """
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, route: str, status: int, seconds: float):
+        """
+        记录一个请求处理完成
+
+        Args:
+            route: 路由类别
+            status: 响应状态码
+            seconds: 生成响应的秒数，不含写出响应
+        """
+        with self._lock:
+            self.in_flight -= 1
+            key = (route, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+            histogram = self._routes.get(route)
+            if histogram is None:
+                histogram = self._routes[route] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def register_gauge(self, name: str, description: str, func: Callable[[], float]):
+        """
+        注册在导出时取值的指标，例如服务器引擎的连接数，同名的指标会被替换
+
+        Args:
+            name: 指标名称
+            description: 指标说明
+            func: 返回当前值的函数
+        """
+        with self._lock:
+            self._gauges[name] = (description, func)
+
+    def stages(self) -> Dict[str, Histogram]:
+        """
+        获取各阶段的耗时直方图
+        """
+        return dict(self._stages)
+
+    def routes(self) -> Dict[str, Histogram]:
+        """
+        获取各路由的请求耗时直方图
+        """
+        with self._lock:
+            return dict(self._routes)
+
+    def responses(self) -> Dict[Tuple[str, int], int]:
+        """
+        获取各路由和状态码的请求数
+        """
+        with self._lock:
+            return dict(self._responses)
+
+    def gauges(self) -> Dict[str, Tuple[str, float]]:
+        """
+        获取注册的指标的当前值，取值出错的指标不返回
+
+        Returns:
+            名称 -> (说明, 当前值)
+        """
+        with self._lock:
+            gauges = dict(self._gauges)
+        values = {}
+        for name, (description, func) in gauges.items():
+            try:
+                values[name] = (description, float(func()))
+            except Exception:
+                continue
+        return values
+
+
+# 全局指标集合
+registry = MetricsRegistry()
+
+
+def observe_stage(stage: str, seconds: float):
+    """
+    在全局指标集合中记录一个阶段的耗时，关闭指标时不记录
+
+    Args:
+        stage: 阶段名称
+        seconds: 秒数
+    """
+    if METRICS_ENABLED:
+        registry.observe_stage(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    记录with语句块的耗时，块中抛出异常时同样记录
+
+    Args:
+        stage: 阶段名称
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe_stage(stage, time.perf_counter() - start)
+
+
+def process_memory() -> Tuple[Optional[int], Optional[int]]:
+    """
+    获取进程的内存占用
+
+    当前常驻内存从/proc读取（Linux）；峰值来自getrusage，Linux上以KB为单位，macOS上以字节为单位。
+
+    Returns:
+        (当前常驻内存字节数, 常驻内存峰值字节数)，无法获取的项为None
+    """
+    rss = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    peak = None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if not sys.platform.startswith("darwin"):
+            peak *= 1024
+    except (ImportError, OSError):
+        pass
+    if rss is not None and peak is not None:
+        # 内核只在部分时机更新峰值，可能略小于刚读取的当前值
+        peak = max(peak, rss)
+    return rss, peak
+
+
+def _hit_ratio(stats: Dict[str, int]) -> float:
+    """
+    计算缓存命中率，没有访问时为0
+    """
+    total = stats.get("hits", 0) + stats.get("misses", 0)
+    return stats.get("hits", 0) / total if total else 0.0
+
+
+def _format_value(value: float) -> str:
+    """
+    按Prometheus文本格式输出数值
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """
+    转义标签值中的反斜杠、双引号和换行
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, label: str, histograms: Dict[str, Histogram]) -> List[str]:
+    """
+    生成一组直方图的Prometheus文本
+
+    Args:
+        name: 指标名称
+        label: 区分各直方图的标签名称
+        histograms: 标签值 -> 直方图
+
+    Returns:
+        文本行
+    """
+    lines = []
+    for value, histogram in sorted(histograms.items()):
+        counts, total, count = histogram.snapshot()
+        labels = '{0}="{1}"'.format(label, _escape_label(value))
+        cumulative = 0
+        for bound, n in zip(histogram.bounds + (float("inf"),), counts):
+            cumulative += n
+            lines.append('{0}_bucket{{{1},le="{2}"}} {3}'.format(name, labels, _format_value(bound), cumulative))
+        lines.append("{0}_sum{{{1}}} {2}".format(name, labels, _format_value(total)))
+        lines.append("{0}_count{{{1}}} {2}".format(name, labels, count))
+    return lines
+
+
+def render_prometheus(caches: Dict[str, Dict[str, int]], metrics: MetricsRegistry = registry) -> bytes:
+    """
+    以Prometheus文本格式导出指标
+
+    Args:
+        caches: 缓存名称 -> 缓存的stats()结果
+        metrics: 指标集合
+
+    Returns:
+        UTF-8编码的文本
+    """
+    lines = [
+        "# HELP novel_stage_duration_seconds Time spent in each request processing stage.",
+        "# TYPE novel_stage_duration_seconds histogram",
+    ]
+    lines.extend(_histogram_lines("novel_stage_duration_seconds", "stage", metrics.stages()))
+
+    lines.append("# HELP novel_request_duration_seconds Time to build a response, excluding the socket write.")
+    lines.append("# TYPE novel_request_duration_seconds histogram")
+    lines.extend(_histogram_lines("novel_request_duration_seconds", "route", metrics.routes()))
+
+    lines.append("# HELP novel_responses_total Responses by route and status code.")
+    lines.append("# TYPE novel_responses_total counter")
+    for (route, status), count in sorted(metrics.responses().items()):
+        lines.append('novel_responses_total{{route="{0}",status="{1}"}} {2}'.format(
+            _escape_label(route), status, count))
+
+    lines.append("# HELP novel_requests_in_flight Requests currently being processed.")
+    lines.append("# TYPE novel_requests_in_flight gauge")
+    lines.append("novel_requests_in_flight {0}".format(metrics.in_flight))
+
+    for key in _CACHE_COUNTERS + _CACHE_GAUGES:
+        counter = key in _CACHE_COUNTERS
+        name = "novel_cache_{0}{1}".format(key, "_total" if counter else "")
+        samples = [(cache, stats[key]) for cache, stats in sorted(caches.items()) if key in stats]
+        if not samples:
+            continue
+        lines.append("# HELP {0} Cache {1}.".format(name, key.replace("_", " ")))
+        lines.append("# TYPE {0} {1}".format(name, "counter" if counter else "gauge"))
+        lines.extend('{0}{{cache="{1}"}} {2}'.format(name, _escape_label(cache), value) for cache, value in samples)
+    lines.append("# HELP novel_cache_hit_ratio Cache hits divided by lookups since start.")
+    lines.append("# TYPE novel_cache_hit_ratio gauge")
+    lines.extend('novel_cache_hit_ratio{{cache="{0}"}} {1}'.format(_escape_label(cache), _format_value(_hit_ratio(stats)))
+                 for cache, stats in sorted(caches.items()))
+
+    for name, (description, value) in sorted(metrics.gauges().items()):
+        lines.append("# HELP {0} {1}".format(name, description))
+        lines.append("# TYPE {0} gauge".format(name))
+        lines.append("{0} {1}".format(name, _format_value(value)))
+
+    rss, peak = process_memory()
+    if rss is not None:
+        lines.append("# HELP process_resident_memory_bytes Resident memory size in bytes.")
+        lines.append("# TYPE process_resident_memory_bytes gauge")
+        lines.append("process_resident_memory_bytes {0}".format(rss))
+    if peak is not None:
+        lines.append("# HELP process_max_resident_memory_bytes Peak resident memory size in bytes.")
+        lines.append("# TYPE process_max_resident_memory_bytes gauge")
+        lines.append("process_max_resident_memory_bytes {0}".format(peak))
+    lines.append("# HELP process_start_time_seconds Start time of the process since unix epoch in seconds.")
+    lines.append("# TYPE process_start_time_seconds gauge")
+    lines.append("process_start_time_seconds {0}".format(_format_value(metrics.started_at)))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _summarize(histogram: Histogram) -> Dict[str, float]:
+    """
+    汇总直方图，分位数为所在分桶的上限
+    """
+    snapshot = histogram.snapshot()
+    _, total, count = snapshot
+    return {
+        "count": count,
+        "mean": total / count if count else 0.0,
+        "p50": histogram.quantile(0.5, snapshot),
+        "p90": histogram.quantile(0.9, snapshot),
+        "p99": histogram.quantile(0.99, snapshot),
+    }
+
+
+def status_snapshot(caches: Dict[str, Dict[str, int]], metrics: MetricsRegistry = registry) -> Dict[str, Any]:
+    """
+    汇总供状态页面显示的指标
+
+    Args:
+        caches: 缓存名称 -> 缓存的stats()结果
+        metrics: 指标集合
+
+    Returns:
+        包含运行时间、进程信息、内存、请求、阶段耗时和缓存统计的字典
+    """
+    rss, peak = process_memory()
+    caches = {name: dict(stats, hit_ratio=_hit_ratio(stats)) for name, stats in caches.items()}
+    return {
+        "uptime": time.time() - metrics.started_at,
+        "pid": os.getpid(),
+        "rss": rss,
+        "peak_rss": peak,
+        "in_flight": metrics.in_flight,
+        "gauges": metrics.gauges(),
+        "stages": {stage: _summarize(histogram) for stage, histogram in metrics.stages().items()},
+        "routes": {route: _summarize(histogram) for route, histogram in sorted(metrics.routes().items())},
+        "responses": metrics.responses(),
+        "caches": caches,
+    }
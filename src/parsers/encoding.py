@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+文本编码检测模块
+
+所有文本加载器共用的编码检测：只检查文件开头固定大小的样本，依次识别BOM、UTF-8、
+无BOM的UTF-16以及GB18030（兼容GBK）和Big5，检测开销与小说大小无关。
+检测结果按文件身份缓存，文件未变化时不再重复检测。
+"""
+
+import re
+import codecs
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, Iterator, Optional, Tuple
+
+from src.config import STREAM_CHUNK_SIZE
+from src.utils.helpers import file_identity
+
+# 按检测到的编码解码全文失败时依次尝试的编码
+FALLBACK_ENCODINGS = ['utf-8', 'gb18030', 'big5']
+
+# 无法识别时使用的编码，能解码任意字节
+DEFAULT_ENCODING = 'iso-8859-1'
+
+# 按文件身份缓存的检测结果数量上限
+ENCODING_CACHE_SIZE = 1024
+
+# 按BOM识别的编码，UTF-32的BOM以UTF-16的BOM开头，需要先检查
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# 简体和繁体中文里最常用的字，正确解码的文本中占比很高，用错编码解码时几乎不出现
+_COMMON_HANZI = re.compile("[{0}]".format(
+    "的一是不了在人有我他这个们中来上大为和国地到以说时要就出会可也你对生能而子那得于着下自之年过发后"
+    "作里用道行所然家种事成方多经么去法学如都同现当没动面起看定天分还进好小部其些主样理心她本前开但因"
+    "只从想实日点"
+    "這個們來為國時說會對發後裡過麼學當沒動還進樣實從問開經現點與"
+))
+
+# 文件路径和成员名称 -> (文件身份, 编码)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _decodes(sample: bytes, encoding: str, at_eof: bool) -> bool:
+    """
+    判断样本能否按指定编码解码，样本末尾被截断的多字节字符不视为错误
+
+    Args:
+        sample: 文件开头的字节
+        encoding: 编码名称
+        at_eof: 样本是否已经包含整个文件
+
+    Returns:
+        能够解码时返回True
+    """
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=at_eof)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _common_hanzi_count(sample: bytes, encoding: str) -> int:
+    """
+    统计样本按指定编码解码后常用汉字的个数
+
+    Args:
+        sample: 文件开头的字节
+        encoding: 编码名称
+
+    Returns:
+        常用汉字的个数
+    """
+    return len(_COMMON_HANZI.findall(sample.decode(encoding, errors='ignore')))
+
+
+def _detect_utf16(sample: bytes) -> Optional[str]:
+    """
+    识别没有BOM的UTF-16，其他编码的文本中不会出现空字节
+
+    Args:
+        sample: 文件开头的字节
+
+    Returns:
+        utf-16-le或utf-16-be，不像UTF-16时返回None
+    """
+    if b"\x00" not in sample:
+        return None
+    sample = sample[:len(sample) // 2 * 2]
+    candidates = [encoding for encoding in ('utf-16-le', 'utf-16-be') if _decodes(sample, encoding, False)]
+    if len(candidates) < 2:
+        return candidates[0] if candidates else None
+    # 两种字节序都能解码时，选择解码结果中换行和常用汉字较多的字节序
+    scores = [
+        _common_hanzi_count(sample, encoding) + sample.decode(encoding).count("\n")
+        for encoding in candidates
+    ]
+    return candidates[0] if scores[0] >= scores[1] else candidates[1]
+
+
+def detect_encoding(sample: bytes, at_eof: bool = False) -> str:
+    """
+    根据文件开头的样本检测编码
+
+    样本末尾可能截断了多字节字符，因此使用增量解码器判断，未结束的字节不视为错误。
+    GB18030和Big5都能解码时，选择解码结果中常用汉字较多的编码。
+
+    Args:
+        sample: 文件开头的字节
+        at_eof: 样本是否已经包含整个文件
+
+    Returns:
+        检测到的编码，都无法识别时返回iso-8859-1
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    # 空字节也是合法的UTF-8，需要先识别UTF-16
+    encoding = _detect_utf16(sample)
+    if encoding is not None:
+        return encoding
+
+    # 合法的UTF-8在其他编码下几乎不可能成立，纯ASCII的文本也按UTF-8解码
+    if _decodes(sample, 'utf-8', at_eof):
+        return 'utf-8'
+
+    gb = _decodes(sample, 'gb18030', at_eof)
+    big5 = _decodes(sample, 'big5', at_eof)
+    if gb and big5:
+        if _common_hanzi_count(sample, 'big5') > _common_hanzi_count(sample, 'gb18030'):
+            return 'big5'
+        return 'gb18030'
+    if gb:
+        return 'gb18030'
+    if big5:
+        return 'big5'
+    return DEFAULT_ENCODING
+
+
+def cached_encoding(key: Hashable, identity: Optional[Tuple[int, int]]) -> Optional[str]:
+    """
+    查询缓存的检测结果
+
+    Args:
+        key: 文本来源，例如(文件路径, ZIP成员名称)
+        identity: 文件当前的身份信息，None表示无法获取，此时不使用缓存
+
+    Returns:
+        缓存的编码，未缓存或文件已变化时返回None
+    """
+    if identity is None:
+        return None
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != identity:
+            return None
+        _cache.move_to_end(key)
+        return cached[1]
+
+
+def remember_encoding(key: Hashable, identity: Optional[Tuple[int, int]], encoding: str):
+    """
+    缓存检测结果，也用于记录解码全文后纠正的编码
+
+    Args:
+        key: 文本来源
+        identity: 文件的身份信息，None时不缓存
+        encoding: 编码
+    """
+    if identity is None:
+        return
+    with _cache_lock:
+        _cache[key] = (identity, encoding)
+        _cache.move_to_end(key)
+        while len(_cache) > ENCODING_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def source_encoding(file_path: str, member: Optional[str], sample: bytes, at_eof: bool = False) -> str:
+    """
+    获取文本来源的编码，文件未变化时使用缓存的结果，否则根据样本检测
+
+    Args:
+        file_path: 文件路径
+        member: ZIP等容器中的成员名称，普通文件为None
+        sample: 文本开头的字节，只在需要检测时使用
+        at_eof: 样本是否已经包含全部文本
+
+    Returns:
+        编码
+    """
+    key = (file_path, member)
+    try:
+        identity = file_identity(file_path)
+    except OSError:
+        identity = None
+    encoding = cached_encoding(key, identity)
+    if encoding is None:
+        encoding = detect_encoding(sample[:STREAM_CHUNK_SIZE], at_eof=at_eof and len(sample) <= STREAM_CHUNK_SIZE)
+        remember_encoding(key, identity, encoding)
+    return encoding
+
+
+def detect_file_encoding(file_path: str, sample_size: int = STREAM_CHUNK_SIZE) -> str:
+    """
+    检测普通文本文件的编码，只读取文件开头的样本
+
+    Args:
+        file_path: 文件路径
+        sample_size: 样本字节数
+
+    Returns:
+        编码
+
+    Raises:
+        OSError: 如果文件不存在或无法读取
+    """
+    identity = file_identity(file_path)
+    key = (file_path, None)
+    encoding = cached_encoding(key, identity)
+    if encoding is None:
+        with open(file_path, 'rb') as f:
+            sample = f.read(sample_size)
+        encoding = detect_encoding(sample, at_eof=len(sample) < sample_size)
+        remember_encoding(key, identity, encoding)
+        logging.debug("检测到文件%s的编码为%s", file_path, encoding)
+    return encoding
+
+
+def iter_decoded(blocks: Iterable[bytes], encoding: str) -> Iterator[str]:
+    """
+    增量解码字节块序列，多字节字符跨越块边界时留到下一块一起解码
+
+    Args:
+        blocks: 字节块序列
+        encoding: 编码
+
+    Yields:
+        解码后的非空文本块
+
+    Raises:
+        UnicodeDecodeError: 如果内容无法按该编码解码
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def decode_text(data: bytes, encoding: str) -> Tuple[str, str]:
+    """
+    解码完整的文本
+
+    按检测到的编码解码失败时依次尝试其他编码；都失败时说明文本中只有个别损坏的字节，
+    仍按检测到的编码解码并替换无法解码的字节，而不是把整本小说解码为乱码。
+
+    Args:
+        data: 文本的全部字节，也可以是mmap等支持缓冲区协议的对象
+        encoding: 检测到的编码
+
+    Returns:
+        (文本, 实际使用的编码)
+    """
+    for candidate in [encoding] + [e for e in FALLBACK_ENCODINGS if e != encoding]:
+        try:
+            return str(data, candidate), candidate
+        except UnicodeDecodeError:
+            continue
+    logging.warning("文本中有无法按%s解码的字节，已替换为占位符", encoding)
+    return str(data, encoding, 'replace'), encoding
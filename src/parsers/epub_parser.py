@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+EPUB文件解析模块
+
+EPUB是包含XHTML文档的ZIP文件。章节结构直接取自书中的目录（EPUB3的导航文档或EPUB2的NCX），
+加载时只读取容器、OPF和目录文件，章节正文在访问时才解压对应的文档，无需分章。
+"""
+
+import sys
+import zipfile
+import logging
+import posixpath
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from urllib.parse import unquote
+from typing import Dict, List, Tuple
+
+from src.parsers.encoding import decode_text, detect_encoding
+from src.parsers.novel_parser import ChapterIndex, ChapterList, ChapterReadError, preprocess_text, split_paragraphs
+
+# 描述OPF文件位置的容器文件
+CONTAINER_PATH = "META-INF/container.xml"
+
+# 产生换行的块级元素
+_BLOCK_TAGS = frozenset((
+    "p", "div", "br", "h1", "h2", "h3", "h4", "h5", "h6", "li", "tr", "blockquote", "pre", "section", "hr",
+))
+
+# 内容不属于正文的元素
+_SKIP_TAGS = frozenset(("head", "script", "style", "title"))
+
+
+def _local_name(tag: str) -> str:
+    """
+    去掉XML元素名称中的命名空间
+
+    Args:
+        tag: 元素名称，例如"{http://www.idpf.org/2007/opf}item"
+
+    Returns:
+        不含命名空间的名称
+    """
+    return tag.rpartition("}")[2]
+
+
+def _resolve(base_dir: str, href: str) -> str:
+    """
+    把文档中的相对地址转换为ZIP中的成员名称
+
+    Args:
+        base_dir: 引用该地址的文档所在目录
+        href: 相对地址，可以带有#片段
+
+    Returns:
+        ZIP成员名称
+    """
+    path = unquote(href.partition("#")[0])
+    return posixpath.normpath(posixpath.join(base_dir, path)) if base_dir else posixpath.normpath(path)
+
+
+def _read_xml(zip_ref: zipfile.ZipFile, name: str) -> ET.Element:
+    """
+    读取并解析ZIP中的XML文件
+
+    Args:
+        zip_ref: 已打开的EPUB文件
+        name: 成员名称
+
+    Returns:
+        根元素
+
+    Raises:
+        KeyError: 如果成员不存在
+        ET.ParseError: 如果XML格式错误
+    """
+    return ET.fromstring(zip_ref.read(name))
+
+
+class _TextExtractor(HTMLParser):
+    """
+    从XHTML文档中提取纯文本，块级元素之间以换行分隔
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def xhtml_to_text(data: bytes) -> str:
+    """
+    把XHTML文档转换为以换行分隔段落的纯文本
+
+    Args:
+        data: 文档的字节内容
+
+    Returns:
+        纯文本
+    """
+    text, _ = decode_text(data, detect_encoding(data[:4096], at_eof=len(data) <= 4096))
+    extractor = _TextExtractor()
+    extractor.feed(text)
+    extractor.close()
+    # 文档中的换行只是排版，段落以块级元素为准
+    return "".join(part if part == "\n" else part.replace("\n", " ") for part in extractor.parts)
+
+
+def _opf_path(zip_ref: zipfile.ZipFile) -> str:
+    """
+    从容器文件中找到OPF文件的位置
+
+    Args:
+        zip_ref: 已打开的EPUB文件
+
+    Returns:
+        OPF文件的成员名称
+
+    Raises:
+        ValueError: 如果容器文件中没有OPF文件
+    """
+    for element in _read_xml(zip_ref, CONTAINER_PATH).iter():
+        if _local_name(element.tag) == "rootfile" and element.get("full-path"):
+            return element.get("full-path")
+    raise ValueError("EPUB容器文件中没有rootfile")
+
+
+def _nav_titles(zip_ref: zipfile.ZipFile, nav_path: str) -> List[Tuple[str, str]]:
+    """
+    读取EPUB3导航文档中的目录
+
+    Args:
+        zip_ref: 已打开的EPUB文件
+        nav_path: 导航文档的成员名称
+
+    Returns:
+        按目录顺序排列的(文档成员名称, 标题)列表
+    """
+    root = _read_xml(zip_ref, nav_path)
+    navs = [element for element in root.iter() if _local_name(element.tag) == "nav"]
+    tocs = [nav for nav in navs if any(_local_name(key) == "type" and value == "toc"
+                                       for key, value in nav.attrib.items())]
+    base_dir = posixpath.dirname(nav_path)
+    entries = []
+    for nav in (tocs or navs)[:1]:
+        for element in nav.iter():
+            if _local_name(element.tag) == "a" and element.get("href"):
+                title = "".join(element.itertext()).strip()
+                entries.append((_resolve(base_dir, element.get("href")), title))
+    return entries
+
+
+def _ncx_titles(zip_ref: zipfile.ZipFile, ncx_path: str) -> List[Tuple[str, str]]:
+    """
+    读取EPUB2的NCX目录
+
+    Args:
+        zip_ref: 已打开的EPUB文件
+        ncx_path: NCX文件的成员名称
+
+    Returns:
+        按目录顺序排列的(文档成员名称, 标题)列表
+    """
+    root = _read_xml(zip_ref, ncx_path)
+    base_dir = posixpath.dirname(ncx_path)
+    entries = []
+    for point in root.iter():
+        if _local_name(point.tag) != "navPoint":
+            continue
+        title, src = "", None
+        for child in point:
+            name = _local_name(child.tag)
+            if name == "navLabel":
+                title = "".join(child.itertext()).strip()
+            elif name == "content":
+                src = child.get("src")
+        if src:
+            entries.append((_resolve(base_dir, src), title))
+    return entries
+
+
+def read_epub_structure(zip_ref: zipfile.ZipFile) -> Tuple[str, List[str], List[List[str]]]:
+    """
+    根据OPF的阅读顺序和目录得到章节结构
+
+    目录中出现的文档开始一个新章节，不在目录中的文档并入前一章；
+    书中没有目录时每个文档都是一章。
+
+    Args:
+        zip_ref: 已打开的EPUB文件
+
+    Returns:
+        (书名, 章节标题列表, 每个章节包含的文档成员名称列表)，没有目录标题的章节标题为空字符串
+
+    Raises:
+        KeyError: 如果OPF引用的文件不存在
+        ValueError: 如果找不到OPF文件
+        ET.ParseError: 如果XML格式错误
+    """
+    opf_path = _opf_path(zip_ref)
+    opf = _read_xml(zip_ref, opf_path)
+    base_dir = posixpath.dirname(opf_path)
+
+    book_title = ""
+    manifest: Dict[str, Tuple[str, str, str]] = {}
+    spine = []
+    ncx_id = None
+    for element in opf.iter():
+        name = _local_name(element.tag)
+        if name == "title" and not book_title:
+            book_title = "".join(element.itertext()).strip()
+        elif name == "item" and element.get("id") and element.get("href"):
+            manifest[element.get("id")] = (
+                _resolve(base_dir, element.get("href")),
+                element.get("media-type", ""),
+                element.get("properties", ""),
+            )
+        elif name == "spine":
+            ncx_id = element.get("toc")
+        elif name == "itemref" and element.get("linear", "yes") != "no":
+            spine.append(element.get("idref"))
+
+    toc = []
+    nav = [href for href, _, properties in manifest.values() if "nav" in properties.split()]
+    if nav:
+        toc = _nav_titles(zip_ref, nav[0])
+    if not toc:
+        ncx = manifest.get(ncx_id) if ncx_id else None
+        if ncx is None:
+            ncx = next((item for item in manifest.values() if item[1] == "application/x-dtbncx+xml"), None)
+        if ncx is not None:
+            toc = _ncx_titles(zip_ref, ncx[0])
+
+    toc_titles = {}
+    for href, title in toc:
+        toc_titles.setdefault(href, title)
+
+    titles = []
+    members = []
+    for idref in spine:
+        item = manifest.get(idref)
+        if item is None or "html" not in item[1]:
+            continue
+        href = item[0]
+        if not members or not toc_titles or href in toc_titles:
+            titles.append(toc_titles.get(href, ""))
+            members.append([href])
+        else:
+            members[-1].append(href)
+    return book_title, titles, members
+
+
+class EpubChapterIndex(ChapterIndex):
+    """
+    EPUB章节序列
+
+    只保存每个章节对应的文档名称，访问章节时才从EPUB中解压这些文档。
+    """
+
+    def __init__(self, file_path: str, titles: List[str], members: List[List[str]]):
+        """
+        初始化章节序列
+
+        Args:
+            file_path: EPUB文件路径
+            titles: 章节标题列表
+            members: 每个章节包含的文档成员名称列表
+        """
+        super().__init__(titles)
+        self.file_path = file_path
+        self.members = [tuple(names) for names in members]
+
+    def paragraphs(self, index: int) -> List[str]:
+        try:
+            with zipfile.ZipFile(self.file_path, 'r') as zip_ref:
+                text = "\n".join(xhtml_to_text(zip_ref.read(name)) for name in self.members[index])
+        except KeyError as e:
+            logging.error("EPUB中缺少章节文档: %s: %s", self.file_path, str(e))
+            raise ChapterReadError(404, "Chapter Content Missing")
+        except (OSError, zipfile.BadZipFile) as e:
+            logging.error("读取EPUB章节时出错: %s: %s", self.file_path, str(e))
+            raise ChapterReadError(500, "Internal Server Error")
+        paragraphs = split_paragraphs(preprocess_text(text))
+        # 正文开头通常重复了章节标题
+        if paragraphs and paragraphs[0] == self.titles[index]:
+            del paragraphs[0]
+        return paragraphs
+
+    def approximate_size(self) -> int:
+        return super().approximate_size() + sum(
+            sys.getsizeof(names) + sum(map(sys.getsizeof, names)) for names in self.members
+        )
+
+
+def load_epub(file_path: str) -> ChapterIndex:
+    """
+    读取EPUB的章节结构
+
+    Args:
+        file_path: EPUB文件路径
+
+    Returns:
+        章节序列，无法解析时返回空序列
+    """
+    try:
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            book_title, titles, members = read_epub_structure(zip_ref)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, ET.ParseError) as e:
+        logging.error("读取EPUB文件时出错: %s: %s", file_path, str(e))
+        return ChapterList([])
+
+    # 没有目录标题的章节使用书名或章节序号
+    for i, title in enumerate(titles):
+        if not title:
+            titles[i] = book_title if i == 0 and book_title else "第{0}章".format(i + 1)
+    logging.info("从EPUB目录中读取到%s个章节: %s", len(titles), file_path)
+    return EpubChapterIndex(file_path, titles, members)
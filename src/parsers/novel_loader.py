@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+小说加载模块
+
+该模块负责把小说源文件加载为章节序列：自带章节结构的源文件（EPUB）直接读取目录，
+其他源文件优先读取章节存储，其次流式读取分章，流式读取失败时回退到完整读取。
+"""
+
+import time
+import zipfile
+import logging
+from typing import Iterable, Iterator, Optional
+
+from src.config import LAZY_CHAPTER_INDEX, STREAM_CHUNK_SIZE
+from src.parsers.rules import rules_for
+from src.parsers.sources import ChapterSource, TextSource, source_for
+from src.parsers.novel_parser import (
+    ChapterIndex, ChapterList, TrackedChapters, build_chapter_index, iter_chapters, novel_chapter_index,
+    novel_chapterizer, skip_prefix
+)
+from src.storage.chapter_store import ChapterStore, get_chapter_store
+from src.utils.helpers import file_identity
+from src.metrics import observe_stage, stage_timer
+
+
+def load_novel(file_path: str, touch: bool = True) -> ChapterIndex:
+    """
+    加载小说并分章
+
+    Args:
+        file_path: 源文件路径
+        touch: 是否在章节存储中把本次加载记为读者访问，后台预热时为False
+
+    Returns:
+        章节序列，无法解析时返回空序列
+    """
+    source = source_for(file_path)
+    if source is None:
+        logging.warning("不支持的小说文件类型: %s", file_path)
+        return ChapterList([])
+    if isinstance(source, ChapterSource):
+        # 源文件自带章节结构，读取目录的开销很小，无需写入章节存储
+        return source.load_chapters(file_path)
+
+    store = get_chapter_store()
+    if store is None:
+        return _timed_parse(file_path, source, None, touch)
+
+    with stage_timer("store"):
+        chapters = store.load(file_path, touch)
+    if chapters is not None:
+        return chapters
+    with store.parse_lock(file_path):
+        # 等待锁期间其他进程可能已经解析并保存了这本小说
+        chapters = store.load(file_path, touch)
+        if chapters is not None:
+            return chapters
+        return _timed_parse(file_path, source, store, touch)
+
+
+class _TimedSource(TextSource):
+    """
+    累计读取源文件（解压和解码）所用时间的插件包装
+
+    流式分章时读取和分章交替进行，只有在文本块迭代器内部的时间计为读取。
+    """
+
+    def __init__(self, source: TextSource):
+        """
+        初始化
+
+        Args:
+            source: 被包装的插件
+        """
+        self.source = source
+        self.suffix = source.suffix
+        self.elapsed = 0.0
+
+    def _timed(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        逐块转发文本块，累计取得每一块的时间
+        """
+        iterator = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(iterator, None)
+            self.elapsed += time.perf_counter() - start
+            if chunk is None:
+                return
+            yield chunk
+
+    def iter_chunks(self, file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        return self._timed(self.source.iter_chunks(file_path, chunk_size))
+
+    def read_text(self, file_path: str) -> Optional[str]:
+        start = time.perf_counter()
+        try:
+            return self.source.read_text(file_path)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+def _timed_parse(file_path: str, source: TextSource, store: Optional[ChapterStore], touch: bool) -> ChapterIndex:
+    """
+    读取并分章，分别记录读取和分章（含写入章节存储）的耗时，参数和返回值与_parse_novel相同
+    """
+    timed = _TimedSource(source)
+    start = time.perf_counter()
+    try:
+        return _parse_novel(file_path, timed, store, touch)
+    finally:
+        observe_stage("extract", timed.elapsed)
+        observe_stage("chapterize", time.perf_counter() - start - timed.elapsed)
+
+
+def _append_novel(file_path: str, source: TextSource, store: ChapterStore, rules,
+                  identity, touch: bool) -> Optional[ChapterIndex]:
+    """
+    增量分章：文件在上次分章的续接点之前的内容不变时（例如连载小说追加了新章节），
+    保留之前的章节，只对续接点之后的文本重新分章
+
+    Args:
+        file_path: 源文件路径
+        source: 源文件类型插件
+        store: 章节存储
+        rules: 适用于文件的分章规则
+        identity: 解析前获取的文件身份信息
+        touch: 是否在章节存储中把本次加载记为读者访问
+
+    Returns:
+        章节序列，不能增量分章时返回None
+    """
+    stored = store.resume_point(file_path)
+    if stored is None:
+        return None
+    novel_id, resume = stored
+    rule = next((rule for rule in rules if rule.name == resume.rule), None)
+    if rule is None:
+        return None
+
+    tail = skip_prefix(source.iter_chunks(file_path), resume)
+    if tail is None:
+        logging.info("续接点之前的内容已变化，重新分章: %s", file_path)
+        return None
+    if not store.append(file_path, novel_id, resume, TrackedChapters(tail, [rule], resume), identity):
+        return None
+    return store.load(file_path, touch)
+
+
+def _parse_novel(file_path: str, source: TextSource, store: Optional[ChapterStore], touch: bool) -> ChapterIndex:
+    """
+    读取并分章，启用章节存储时把结果写入存储
+
+    Args:
+        file_path: 源文件路径
+        source: 源文件类型插件
+        store: 章节存储，未启用时为None
+        touch: 是否在章节存储中把本次加载记为读者访问
+
+    Returns:
+        章节序列，无法解析时返回空序列
+    """
+    try:
+        identity = file_identity(file_path)
+    except OSError:
+        identity = None
+    rules = rules_for(file_path)
+
+    try:
+        if store is not None and identity is not None:
+            if store.refresh_identity(file_path, identity):
+                chapters = store.load(file_path, touch)
+                if chapters is not None:
+                    return chapters
+            chapters = _append_novel(file_path, source, store, rules, identity, touch)
+            if chapters is not None:
+                return chapters
+            # 边读取边分章，章节直接写入章节存储
+            if store.save(file_path, TrackedChapters(source.iter_chunks(file_path), rules), identity):
+                chapters = store.load(file_path, touch)
+                if chapters is not None:
+                    return chapters
+        elif LAZY_CHAPTER_INDEX:
+            return build_chapter_index(source.iter_chunks(file_path), rules)
+        else:
+            return ChapterList(list(iter_chapters(source.iter_chunks(file_path), rules)))
+    except (OSError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        # UnicodeDecodeError是ValueError的子类，需要先处理
+        logging.warning("流式读取小说失败，改为完整读取: %s", str(e))
+    except ValueError as e:
+        # ZIP中没有可用的TXT文件
+        logging.warning("%s", str(e))
+        return ChapterList([])
+
+    txt_content = source.read_text(file_path)
+    if not txt_content:
+        return ChapterList([])
+
+    if LAZY_CHAPTER_INDEX:
+        chapters = novel_chapter_index(txt_content, rules)
+    else:
+        chapters = ChapterList(novel_chapterizer(txt_content, rules))
+
+    if chapters and store is not None and identity is not None:
+        store.save(file_path, chapters, identity)
+    return chapters
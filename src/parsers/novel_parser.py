@@ -17,69 +17,610 @@
 """
 小说章节解析模块
 
-该模块负责将小说文本内容分章处理，提取章节标题和内容。
+该模块负责将小说文本内容分章处理，提取章节标题和内容。章节标题行由分章规则中的
+正则表达式识别，对全文只做一次finditer，不产生中间的分割结果。
 """
 
+import re
+import sys
+import zlib
 import logging
-from typing import List, Dict, Any
+from array import array
+from itertools import chain
+from collections.abc import Sequence
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 
+from src.parsers.rules import ChapterRule, choose_rule
 
-def novel_chapterizer(txt_content: str) -> List[Dict[str, Any]]:
+# 选择分章规则时使用的文本开头字符数
+RULE_SAMPLE_SIZE = 64 * 1024
+
+_NON_BLANK = re.compile(r"\S")
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """
+    将章节正文拆分为段落，去除首尾空白并过滤空行
+
+    Args:
+        text: 章节正文
+
+    Returns:
+        段落列表
+    """
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+def preprocess_text(text: str) -> str:
+    """
+    预处理文本，移除多余的回车和全角空格
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        预处理后的文本
+    """
+    return text.replace("\r", "").replace("\u3000", "")
+
+
+def _parse_chapter(text: str, start: int, end: int, heading: Optional[Tuple[str, int]],
+                   chapter_number: int) -> Optional[Tuple[str, int]]:
+    """
+    解析一个章节片段的标题和正文起始位置
+
+    Args:
+        text: 预处理后的文本
+        start: 章节片段的起始位置
+        end: 章节片段的结束位置
+        heading: 章节标题行的(标题, 标题行结束位置)；第一个章节标题之前的部分为None，以其第一行作为标题
+        chapter_number: 章节片段的序号（从1开始），用于没有标题的章节
+
+    Returns:
+        (标题, 正文起始位置)，正文为空时返回None
+    """
+    if heading is not None:
+        title, body_start = heading
+    else:
+        line_end = text.find("\n", start, end)
+        if line_end >= 0:
+            title = text[start:line_end].strip()
+            body_start = line_end + 1
+        else:
+            # 处理特殊情况，没有明确的标题和内容分隔
+            title = ""
+            body_start = start
+
+    # 只保留内容不为空的章节
+    if not _NON_BLANK.search(text, body_start, end):
+        return None
+    return title or "第{0}章".format(chapter_number), body_start
+
+
+def _iter_segments(text: str, rule: ChapterRule, segment_start: int, heading: Optional[Tuple[str, int]],
+                   pos: int, endpos: int) -> Iterator[Tuple[int, int, Optional[Tuple[str, int]]]]:
+    """
+    在文本的指定范围内查找章节标题行，产生已经确定结束位置的章节片段
+
+    Args:
+        text: 预处理后的文本
+        rule: 分章规则
+        segment_start: 当前章节片段的起始位置
+        heading: 当前章节片段的标题行信息，格式同_parse_chapter
+        pos: 查找的起始位置
+        endpos: 查找的结束位置，必须位于行尾
+
+    Yields:
+        (片段起始位置, 片段结束位置, 标题行信息)；最后产生(下一片段起始位置, -1, 其标题行信息)，
+        表示尚未结束的片段
+    """
+    for match in rule.pattern.finditer(text, pos, endpos):
+        start = match.start()
+        # 第一个章节标题之前没有内容时不产生空片段
+        if heading is not None or start > segment_start:
+            yield segment_start, start, heading
+        heading = (rule.title(match), match.end())
+        segment_start = start
+    yield segment_start, -1, heading
+
+
+def iter_chapter_segments(chunks: Iterable[str], rules: Optional[List[ChapterRule]] = None,
+                          on_rule: Optional[Callable[[ChapterRule], None]] = None
+                          ) -> Iterator[Tuple[str, Optional[Tuple[str, int]]]]:
+    """
+    从文本块流中切分出预处理后的章节片段
+
+    只扫描已经完整读入的行，章节标题行跨越文本块边界时也能正确识别；只在内存中保留当前章节片段。
+    所有片段依次拼接即为预处理后的全文。
+
+    Args:
+        chunks: 文本块序列
+        rules: 候选分章规则，根据文本开头选择，None表示所有规则
+        on_rule: 选定分章规则后调用，参数为选定的规则
+
+    Yields:
+        (章节片段, 标题行信息)，标题行信息中的位置相对于片段起始位置，格式同_parse_chapter
+    """
+    rule = None
+    buffer = ""
+    scan_from = 0
+    heading = None
+    for chunk in chain(chunks, (None,)):
+        if chunk is not None:
+            chunk = preprocess_text(chunk)
+            if not chunk:
+                continue
+            buffer += chunk
+            if rule is None:
+                # 读入足够的样本后再选择分章规则
+                if len(buffer) < RULE_SAMPLE_SIZE:
+                    continue
+                rule = choose_rule(rules, buffer[:RULE_SAMPLE_SIZE])
+                if on_rule is not None:
+                    on_rule(rule)
+            # 只扫描到最后一个换行，之后的行可能还不完整
+            scan_end = buffer.rfind("\n")
+            if scan_end <= scan_from:
+                continue
+        else:
+            if not buffer:
+                return
+            if rule is None:
+                rule = choose_rule(rules, buffer)
+                if on_rule is not None:
+                    on_rule(rule)
+            scan_end = len(buffer)
+
+        segment_start = 0
+        for start, end, segment_heading in _iter_segments(buffer, rule, 0, heading, scan_from, scan_end):
+            if end < 0:
+                segment_start, heading = start, segment_heading
+            else:
+                yield buffer[start:end], _relative_heading(segment_heading, start)
+        if segment_start:
+            buffer = buffer[segment_start:]
+            heading = _relative_heading(heading, segment_start)
+        scan_from = scan_end - segment_start
+
+    if heading is not None or buffer:
+        yield buffer, heading
+
+
+def _relative_heading(heading: Optional[Tuple[str, int]], offset: int) -> Optional[Tuple[str, int]]:
+    """
+    把标题行信息中的位置改为相对于offset的位置
+
+    Args:
+        heading: 标题行信息
+        offset: 新的起点
+
+    Returns:
+        标题行信息
+    """
+    if heading is None or not offset:
+        return heading
+    return heading[0], heading[1] - offset
+
+
+def iter_chapters(chunks: Iterable[str], rules: Optional[List[ChapterRule]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    从文本块流中逐章解析章节，分章规则与novel_chapterizer相同
+
+    Args:
+        chunks: 文本块序列
+        rules: 候选分章规则，None表示所有规则
+
+    Yields:
+        章节字典，包含标题和内容
+    """
+    for chapter_number, (segment, heading) in enumerate(iter_chapter_segments(chunks, rules), 1):
+        parsed = _parse_chapter(segment, 0, len(segment), heading, chapter_number)
+        if parsed is not None:
+            title, body_start = parsed
+            yield {
+                "title": title,
+                "content": split_paragraphs(segment[body_start:])
+            }
+
+
+def _text_checksum(text: str, checksum: int = 0) -> int:
+    """
+    计算文本的CRC32校验值，可以分段累加
+
+    Args:
+        text: 文本
+        checksum: 之前各段文本的校验值
+
+    Returns:
+        累加后的校验值
+    """
+    return zlib.crc32(text.encode("utf-8", "surrogatepass"), checksum)
+
+
+class ResumePoint:
+    """
+    增量分章的续接点
+
+    记录上次分章时最后一个章节片段之前的预处理文本长度和校验值。连载小说更新后通常只在末尾追加内容，
+    新文本的开头与之一致时，只需从最后一个章节片段开始重新分章，之前的章节原样保留。
+    最后一个章节可能也有新增内容，因此总是重新分章。
+    """
+
+    __slots__ = ("rule", "offset", "checksum", "segments", "chapters")
+
+    def __init__(self, rule: str, offset: int, checksum: int, segments: int, chapters: int):
+        """
+        初始化续接点
+
+        Args:
+            rule: 分章规则名称
+            offset: 最后一个章节片段在预处理文本中的起始位置
+            checksum: 该位置之前文本的CRC32校验值
+            segments: 该位置之前的章节片段数，用于为没有标题的章节编号
+            chapters: 这些片段解析出的章节数，即需要保留的章节数
+        """
+        self.rule = rule
+        self.offset = offset
+        self.checksum = checksum
+        self.segments = segments
+        self.chapters = chapters
+
+
+def skip_prefix(chunks: Iterable[str], resume: ResumePoint) -> Optional[Iterator[str]]:
+    """
+    确认文本开头与续接点之前的文本一致，并跳过这部分文本
+
+    Args:
+        chunks: 文本块序列
+        resume: 续接点
+
+    Returns:
+        续接点之后的预处理文本块，文本开头不一致或文本不足时返回None
+    """
+    chunks = iter(chunks)
+    remaining = resume.offset
+    checksum = 0
+    for chunk in chunks:
+        chunk = preprocess_text(chunk)
+        if len(chunk) < remaining:
+            checksum = _text_checksum(chunk, checksum)
+            remaining -= len(chunk)
+            continue
+        checksum = _text_checksum(chunk[:remaining], checksum)
+        if checksum != resume.checksum:
+            return None
+        return chain((chunk[remaining:],), chunks)
+    return None
+
+
+class TrackedChapters:
+    """
+    逐章解析文本块流，同时记录下次增量分章的续接点
+
+    迭代结束后resume_point为本次分章的续接点。从续接点开始分章时，
+    文本块须从续接点位置开始，章节编号和续接点位置接着之前的结果计算。
+    """
+
+    def __init__(self, chunks: Iterable[str], rules: Optional[List[ChapterRule]] = None,
+                 resume: Optional[ResumePoint] = None):
+        """
+        初始化
+
+        Args:
+            chunks: 文本块序列
+            rules: 候选分章规则，None表示所有规则；从续接点开始时应只包含续接点的规则
+            resume: 文本块的起点对应的续接点，从头分章时为None
+        """
+        self._chunks = chunks
+        self._rules = rules
+        self._resume = resume
+        self._rule = None
+        self.resume_point = None
+
+    def _set_rule(self, rule: ChapterRule):
+        """
+        记录分章使用的规则，续接时只使用该规则
+        """
+        self._rule = rule
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        resume = self._resume
+        offset = resume.offset if resume else 0
+        checksum = resume.checksum if resume else 0
+        segments = resume.segments if resume else 0
+        chapters = resume.chapters if resume else 0
+        last = None
+        last_parsed = False
+        for segment, heading in iter_chapter_segments(self._chunks, self._rules, self._set_rule):
+            if last is not None:
+                # 前一个片段已不是最后一个片段，计入续接点之前的部分
+                offset += len(last)
+                checksum = _text_checksum(last, checksum)
+                segments += 1
+                chapters += last_parsed
+            parsed = _parse_chapter(segment, 0, len(segment), heading, segments + 1)
+            last, last_parsed = segment, parsed is not None
+            if parsed is not None:
+                title, body_start = parsed
+                yield {
+                    "title": title,
+                    "content": split_paragraphs(segment[body_start:])
+                }
+        if self._rule is not None:
+            self.resume_point = ResumePoint(self._rule.name, offset, checksum, segments, chapters)
+
+
+class ChapterReadError(Exception):
+    """
+    读取章节正文失败，例如源文件中的章节内容缺失或损坏，包含应当返回的HTTP状态码
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ChapterIndex(Sequence):
+    """
+    章节序列基类
+
+    标题在构建时即确定，正文段落只在访问具体章节时才生成。下标访问返回
+    包含title和content的章节字典，与novel_chapterizer的返回格式一致。
+
+    构建时同时建立标题到下标的映射，按标题或序号查找章节都是常数时间。
+    标题重复时映射指向第一次出现的章节，其余同名章节通过序号访问。
+    """
+
+    def __init__(self, titles: List[str]):
+        """
+        初始化章节序列
+
+        Args:
+            titles: 章节标题列表
+        """
+        self.titles = titles
+        self.title_index = {}
+        for i, title in enumerate(titles):
+            self.title_index.setdefault(title, i)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return {
+            "title": self.titles[index],
+            "content": self.paragraphs(index)
+        }
+
+    def resolve(self, key: str) -> int:
+        """
+        根据路由中的章节部分查找章节下标
+
+        先按标题精确匹配，匹配不到且为纯数字（可带route_key加上的"~"前缀）时按从1开始的章节序号查找。
+
+        Args:
+            key: 章节标题或章节序号
+
+        Returns:
+            章节下标，未找到时返回-1
+        """
+        index = self.title_index.get(key)
+        if index is not None:
+            return index
+        number = key.lstrip("~")
+        if number.isascii() and number.isdigit():
+            number = int(number)
+            if 1 <= number <= len(self.titles):
+                return number - 1
+        return -1
+
+    def route_key(self, index: int) -> str:
+        """
+        获取章节在路由中使用的名称
+
+        标题唯一时使用标题，同名章节中除第一个以外的使用章节序号；
+        序号与某个章节的标题相同时（例如标题为"12"）在前面加"~"，避免被resolve解析为该标题的章节。
+
+        Args:
+            index: 章节下标
+
+        Returns:
+            路由中的章节部分
+        """
+        title = self.titles[index]
+        if self.title_index.get(title) == index:
+            return title
+        key = str(index + 1)
+        while key in self.title_index:
+            key = "~" + key
+        return key
+
+    def approximate_size(self) -> int:
+        """
+        估算章节序列占用的内存字节数，用于按字节数限制解析缓存的容量
+
+        Returns:
+            标题及标题映射占用的近似字节数，子类加上各自保存的正文
+        """
+        return (sys.getsizeof(self.titles) + sys.getsizeof(self.title_index)
+                + sum(map(sys.getsizeof, self.titles)))
+
+    def paragraphs(self, index: int) -> List[str]:
+        """
+        获取指定章节的段落列表
+
+        Args:
+            index: 章节下标
+
+        Returns:
+            段落列表
+        """
+        raise NotImplementedError
+
+    def paragraph_text(self, index: int) -> str:
+        """
+        获取指定章节以换行分隔的段落文本，渲染时可以整体转义而无需逐段处理
+
+        Args:
+            index: 章节下标
+
+        Returns:
+            段落文本，段落均非空
+        """
+        return "\n".join(filter(None, self.paragraphs(index)))
+
+
+class ChapterList(ChapterIndex):
+    """
+    已完全展开的章节序列，包装novel_chapterizer返回的章节列表
+    """
+
+    def __init__(self, chapters: List[Dict[str, Any]]):
+        """
+        初始化章节序列
+
+        Args:
+            chapters: 章节列表，每个章节包含标题和内容
+        """
+        super().__init__([chapter["title"] for chapter in chapters])
+        self._contents = [chapter["content"] for chapter in chapters]
+
+    def paragraphs(self, index: int) -> List[str]:
+        return self._contents[index]
+
+    def approximate_size(self) -> int:
+        size = super().approximate_size() + sys.getsizeof(self._contents)
+        for paragraphs in self._contents:
+            size += sys.getsizeof(paragraphs) + sum(map(sys.getsizeof, paragraphs))
+        return size
+
+
+class TextChapterIndex(ChapterIndex):
+    """
+    基于偏移量的章节索引
+
+    只保存预处理后的全文和每个章节正文在全文中的起止位置，段落在渲染章节时才拆分，
+    避免为整本书创建大量段落字符串。
+    """
+
+    def __init__(self, text: str, titles: List[str], starts: array, ends: array):
+        """
+        初始化章节索引
+
+        Args:
+            text: 预处理后的小说全文
+            titles: 章节标题列表
+            starts: 每个章节正文的起始位置
+            ends: 每个章节正文的结束位置
+        """
+        super().__init__(titles)
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    def paragraphs(self, index: int) -> List[str]:
+        return split_paragraphs(self.text[self.starts[index]:self.ends[index]])
+
+    def approximate_size(self) -> int:
+        return (super().approximate_size() + sys.getsizeof(self.text)
+                + sys.getsizeof(self.starts) + sys.getsizeof(self.ends))
+
+
+def novel_chapter_index(txt_content: str, rules: Optional[List[ChapterRule]] = None) -> TextChapterIndex:
+    """
+    为小说文本建立章节偏移索引，分章规则与novel_chapterizer相同
+
+    Args:
+        txt_content: 小说文本内容
+        rules: 候选分章规则，根据文本开头选择，None表示所有规则
+
+    Returns:
+        章节索引
+    """
+    titles = []
+    starts = array('q')
+    ends = array('q')
+    text = ""
+    try:
+        # 预处理文本，移除多余的回车和空格
+        text = preprocess_text(txt_content)
+        rule = choose_rule(rules, text[:RULE_SAMPLE_SIZE])
+
+        # 最后一个片段的结束位置为-1，表示到文本末尾
+        segments = _iter_segments(text, rule, 0, None, 0, len(text))
+        for chapter_number, (start, end, heading) in enumerate(segments, 1):
+            if end < 0:
+                end = len(text)
+            parsed = _parse_chapter(text, start, end, heading, chapter_number)
+            if parsed is not None:
+                titles.append(parsed[0])
+                starts.append(parsed[1])
+                ends.append(end)
+
+        logging.info("按%s规则解析出%s个章节", rule.name, len(titles))
+
+    except Exception as e:
+        logging.error("分章处理时出错: %s", str(e))
+        # 返回空索引作为错误处理
+        titles, starts, ends = [], array('q'), array('q')
+
+    return TextChapterIndex(text, titles, starts, ends)
+
+
+def build_chapter_index(chunks: Iterable[str], rules: Optional[List[ChapterRule]] = None) -> TextChapterIndex:
+    """
+    从文本块流中建立章节偏移索引，结果与novel_chapter_index相同
+
+    边读取边分章，只在最后把各章节片段拼接成一份全文，不需要先得到完整的原始文本。
+
+    Args:
+        chunks: 文本块序列
+        rules: 候选分章规则，None表示所有规则
+
+    Returns:
+        章节索引
+
+    Raises:
+        Exception: 文本块序列产生的异常会原样抛出，便于调用方回退到其他读取方式
+    """
+    titles = []
+    starts = array('q')
+    ends = array('q')
+    segments = []
+    offset = 0
+
+    for chapter_number, (segment, heading) in enumerate(iter_chapter_segments(chunks, rules), 1):
+        parsed = _parse_chapter(segment, 0, len(segment), heading, chapter_number)
+        if parsed is not None:
+            titles.append(parsed[0])
+            starts.append(offset + parsed[1])
+            ends.append(offset + len(segment))
+        segments.append(segment)
+        offset += len(segment)
+
+    logging.info("成功解析%s个章节", len(titles))
+    return TextChapterIndex("".join(segments), titles, starts, ends)
+
+
+def novel_chapterizer(txt_content: str, rules: Optional[List[ChapterRule]] = None) -> List[Dict[str, Any]]:
     """
     将小说文本内容分章处理
     
     Args:
         txt_content: 小说文本内容
+        rules: 候选分章规则，None表示所有规则
         
     Returns:
         分章后的章节列表，每个章节包含标题和内容
     """
     chapters = []
     try:
-        # 预处理文本，移除多余的回车和空格
-        processed_content = txt_content.replace("\r", "").replace("\u3000", "")
-        
-        # 分割章节
-        chapters_raw = processed_content.split("\n             ")
-        
-        for i, chapter_raw in enumerate(chapters_raw):
-            try:
-                # 分割标题和内容
-                parts = chapter_raw.split("\n ")
-                
-                if len(parts) >= 2:
-                    title = parts[0].strip()
-                    content_parts = parts[1:]
-                    content = "\n".join(content_parts).split("\n")
-                    # 过滤空行
-                    content = [line.strip() for line in content if line.strip()]
-                    
-                    # 只添加内容不为空的章节
-                    if content:
-                        chapters.append({
-                            "title": title,
-                            "content": content
-                        })
-                else:
-                    # 处理特殊情况，没有明确的标题和内容分隔
-                    title = "第{0}章".format(i+1)
-                    content = chapter_raw.split("\n")
-                    content = [line.strip() for line in content if line.strip()]
-                    
-                    # 只添加内容不为空的章节
-                    if content:
-                        chapters.append({
-                            "title": title,
-                            "content": content
-                        })
-                    
-            except Exception as e:
-                logging.error("处理章节时出错: %s", str(e))
-                # 跳过错误章节，继续处理其他章节
-                continue
-        
-        logging.info("成功解析%s个章节", len(chapters))
-        
+        chapters = list(novel_chapter_index(txt_content, rules))
     except Exception as e:
         logging.error("分章处理时出错: %s", str(e))
         # 返回空列表作为错误处理
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+分章规则模块
+
+该模块把配置中的RULES编译为分章规则。每条规则声明适用的文件后缀和章节标题行的正则表达式，
+同一规则的多个表达式合并为一个预编译的正则表达式，分章时只需对全文做一次finditer。
+"""
+
+import re
+import logging
+from typing import Iterable, List, Optional
+
+from src.config import RULES
+
+# 飞卢小说的章节标题前有一个换行和13个空格；以字面量开头的表达式可以使用快速子串查找
+FEILU_CHAPTER_PATTERN = r"\n {13}(?P<title>[^\n]*)"
+
+# 规则未声明chapter_patterns时使用的章节标题表达式
+DEFAULT_CHAPTER_PATTERNS = [FEILU_CHAPTER_PATTERN]
+
+# 表达式中表示章节标题的命名分组
+_TITLE_GROUP = re.compile(r"\(\?P<title>")
+
+
+class ChapterRule:
+    """
+    编译后的分章规则
+
+    每个章节标题表达式只能匹配单独一行（可以包含该行之前的换行符），以便流式分章时
+    只扫描已经完整读入的行。表达式中名为title的分组为章节标题，没有该分组时使用整个匹配。
+    """
+
+    __slots__ = ("name", "suffixes", "pattern", "_title_groups")
+
+    def __init__(self, name: str, endswith, chapter_patterns: Optional[Iterable[str]] = None):
+        """
+        编译分章规则
+
+        Args:
+            name: 规则名称
+            endswith: 适用的文件后缀，可以是字符串或字符串列表
+            chapter_patterns: 章节标题行的正则表达式列表，按多行模式编译
+
+        Raises:
+            re.error: 表达式无效
+        """
+        self.name = name
+        self.suffixes = (endswith,) if isinstance(endswith, str) else tuple(endswith)
+        self._title_groups = []
+        alternatives = []
+        for i, pattern in enumerate(chapter_patterns or DEFAULT_CHAPTER_PATTERNS):
+            # 合并后分组名不能重复，为每个表达式的标题分组编号
+            group = "title{0}".format(i)
+            if _TITLE_GROUP.search(pattern):
+                pattern = _TITLE_GROUP.sub("(?P<{0}>".format(group), pattern)
+                self._title_groups.append(group)
+            alternatives.append("(?:{0})".format(pattern))
+        self.pattern = re.compile("|".join(alternatives), re.MULTILINE)
+
+    def applies_to(self, filename: str) -> bool:
+        """
+        判断规则是否适用于文件
+
+        Args:
+            filename: 文件名或路径
+
+        Returns:
+            文件后缀与规则匹配时返回True
+        """
+        return filename.lower().endswith(self.suffixes)
+
+    def title(self, match) -> str:
+        """
+        从章节标题表达式的匹配结果中取出标题
+
+        Args:
+            match: 匹配结果
+
+        Returns:
+            去除首尾空白的标题，可能为空
+        """
+        for group in self._title_groups:
+            value = match.group(group)
+            if value is not None:
+                return value.strip()
+        return match.group(0).strip()
+
+
+def compile_rules(rules: Iterable[dict]) -> List[ChapterRule]:
+    """
+    编译配置中的分章规则，跳过无效的规则
+
+    Args:
+        rules: 规则配置列表，每项包含name、endswith和可选的chapter_patterns
+
+    Returns:
+        分章规则列表，至少包含一条规则
+    """
+    compiled = []
+    for rule in rules:
+        try:
+            compiled.append(ChapterRule(rule["name"], rule.get("endswith", ""), rule.get("chapter_patterns")))
+        except (KeyError, TypeError, re.error) as e:
+            logging.error("分章规则无效，已忽略: %s, %s", rule.get("name") if isinstance(rule, dict) else rule, str(e))
+    if not compiled:
+        compiled.append(ChapterRule("飞卢小说", ".zip"))
+    return compiled
+
+
+# 按配置顺序排列的分章规则
+CHAPTER_RULES = compile_rules(RULES)
+
+
+def rules_for(filename: str) -> List[ChapterRule]:
+    """
+    获取适用于文件的分章规则
+
+    Args:
+        filename: 文件名或路径
+
+    Returns:
+        按配置顺序排列的适用规则，没有适用的规则时返回所有规则
+    """
+    return [rule for rule in CHAPTER_RULES if rule.applies_to(filename)] or list(CHAPTER_RULES)
+
+
+def choose_rule(rules: Optional[List[ChapterRule]], sample: str) -> ChapterRule:
+    """
+    根据文本开头选择分章规则
+
+    依次尝试各规则，使用第一个能在样本中找到章节标题的规则；都找不到时使用第一个规则。
+
+    Args:
+        rules: 候选规则，None表示所有规则
+        sample: 预处理后的文本开头部分
+
+    Returns:
+        分章规则
+    """
+    rules = rules or CHAPTER_RULES
+    for rule in rules:
+        if rule.pattern.search(sample):
+            return rule
+    return rules[0]
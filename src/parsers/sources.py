@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+小说源文件类型模块
+
+每种源文件类型由一个插件负责读取：ZIP压缩包、未压缩的TXT文件和EPUB。
+小说目录收录的文件后缀取自配置中RULES声明的endswith，其中有对应插件的后缀才会被收录。
+"""
+
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.config import STREAM_CHUNK_SIZE
+from src.parsers.rules import CHAPTER_RULES
+from src.parsers.novel_parser import ChapterIndex
+from src.parsers.zip_parser import extract_txt_from_zip, iter_txt_chunks_from_zip
+from src.parsers.txt_parser import iter_txt_chunks_from_file, read_txt_file
+from src.parsers.epub_parser import load_epub
+
+
+class NovelSource(ABC):
+    """
+    源文件类型插件基类
+
+    需要分章的类型继承TextSource，自带章节结构的类型继承ChapterSource。
+    """
+
+    # 插件负责的文件后缀，小写
+    suffix = ""
+
+
+class TextSource(NovelSource):
+    """
+    需要分章的源文件类型，提供文本内容
+    """
+
+    @abstractmethod
+    def iter_chunks(self, file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        """
+        以流的方式读取源文件的文本内容，出错时直接抛出异常，由调用方回退到read_text
+
+        Args:
+            file_path: 源文件路径
+            chunk_size: 每次读取的字节数
+
+        Yields:
+            解码后的文本块
+        """
+
+    @abstractmethod
+    def read_text(self, file_path: str) -> Optional[str]:
+        """
+        一次读取源文件的全部文本内容
+
+        Args:
+            file_path: 源文件路径
+
+        Returns:
+            文本内容，如果失败则返回None
+        """
+
+
+class ChapterSource(NovelSource):
+    """
+    自带章节结构的源文件类型，直接读取书中的目录，无需分章
+    """
+
+    @abstractmethod
+    def load_chapters(self, file_path: str) -> ChapterIndex:
+        """
+        读取源文件自带的章节结构
+
+        Args:
+            file_path: 源文件路径
+
+        Returns:
+            章节序列，无法解析时返回空序列
+        """
+
+
+class ZipSource(TextSource):
+    """
+    ZIP压缩包，其中的每个TXT文件作为一卷
+    """
+
+    suffix = ".zip"
+
+    def iter_chunks(self, file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        return iter_txt_chunks_from_zip(file_path, chunk_size)
+
+    def read_text(self, file_path: str) -> Optional[str]:
+        return extract_txt_from_zip(file_path)
+
+
+class TxtSource(TextSource):
+    """
+    未压缩的TXT文件，通过mmap按块解码
+    """
+
+    suffix = ".txt"
+
+    def iter_chunks(self, file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        return iter_txt_chunks_from_file(file_path, chunk_size)
+
+    def read_text(self, file_path: str) -> Optional[str]:
+        return read_txt_file(file_path)
+
+
+class EpubSource(ChapterSource):
+    """
+    EPUB电子书，章节取自书中的目录，正文在访问章节时才解压
+    """
+
+    suffix = ".epub"
+
+    def load_chapters(self, file_path: str) -> ChapterIndex:
+        return load_epub(file_path)
+
+
+# 后缀 -> 插件
+SOURCE_TYPES: Dict[str, NovelSource] = {
+    source.suffix: source for source in (ZipSource(), TxtSource(), EpubSource())
+}
+
+
+def _configured_suffixes() -> Tuple[str, ...]:
+    """
+    收集RULES中声明且有对应插件的文件后缀
+
+    Returns:
+        按配置顺序排列的后缀
+    """
+    suffixes: List[str] = []
+    for rule in CHAPTER_RULES:
+        for suffix in rule.suffixes:
+            suffix = suffix.lower()
+            if suffix in suffixes:
+                continue
+            if suffix not in SOURCE_TYPES:
+                logging.warning("分章规则%s中的文件后缀%s没有对应的读取方式，已忽略", rule.name, suffix)
+                continue
+            suffixes.append(suffix)
+    return tuple(suffixes) or (ZipSource.suffix,)
+
+
+# 小说目录收录的文件后缀
+SOURCE_SUFFIXES = _configured_suffixes()
+
+
+def source_for(file_path: str) -> Optional[NovelSource]:
+    """
+    根据文件后缀获取读取插件
+
+    Args:
+        file_path: 源文件路径
+
+    Returns:
+        读取插件，后缀未在RULES中声明时返回None
+    """
+    suffix = os.path.splitext(file_path)[1].lower()
+    if suffix not in SOURCE_SUFFIXES:
+        return None
+    return SOURCE_TYPES.get(suffix)
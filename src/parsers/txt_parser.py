@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+TXT文件解析模块
+
+该模块负责读取未压缩的TXT小说文件。文件通过mmap映射到内存，按块增量解码，
+不需要先把整个文件读入内存，也不需要像ZIP那样解压。
+"""
+
+import os
+import mmap
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from src.config import STREAM_CHUNK_SIZE
+from src.parsers.encoding import decode_text, iter_decoded, remember_encoding, source_encoding
+from src.parsers.zip_parser import FEILU_SUFFIX, skip_first_line
+from src.utils.helpers import file_identity
+
+
+@contextmanager
+def _map_file(file_path: str):
+    """
+    以只读方式把文件映射到内存
+
+    Args:
+        file_path: 文件路径
+
+    Yields:
+        映射后的mmap对象，空文件无法映射，此时为b""
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def iter_txt_chunks_from_file(file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    以流的方式从TXT文件中读取文本内容
+
+    根据文件开头的样本检测编码后逐块增量解码，内存占用与数据块大小相当。
+    出错时直接抛出异常，由调用方决定如何回退。
+
+    Args:
+        file_path: TXT文件路径
+        chunk_size: 每次解码的字节数
+
+    Yields:
+        解码后的文本块
+
+    Raises:
+        OSError: 如果文件不存在或无法读取
+        UnicodeDecodeError: 如果按样本检测到的编码无法解码后续内容
+    """
+    name = os.path.basename(file_path)
+    with _map_file(file_path) as data:
+        size = len(data)
+        encoding = source_encoding(file_path, None, data[:chunk_size], at_eof=size <= chunk_size)
+        logging.info("使用%s编码流式解码文件: %s", encoding, name)
+        blocks = (data[offset:offset + chunk_size] for offset in range(0, size, chunk_size))
+        chunks = iter_decoded(blocks, encoding)
+        # 飞卢小说的正文文件第一行是小说标题
+        if FEILU_SUFFIX in name:
+            chunks = skip_first_line(chunks, name)
+        yield from chunks
+
+
+def read_txt_file(file_path: str) -> Optional[str]:
+    """
+    读取TXT文件的全部文本内容，按检测到的编码解码失败时尝试其他编码
+
+    Args:
+        file_path: TXT文件路径
+
+    Returns:
+        文本内容，如果失败则返回None
+    """
+    name = os.path.basename(file_path)
+    try:
+        with _map_file(file_path) as data:
+            detected = source_encoding(file_path, None, data[:STREAM_CHUNK_SIZE],
+                                       at_eof=len(data) <= STREAM_CHUNK_SIZE)
+            content, encoding = decode_text(data, detected)
+        logging.info("使用%s编码成功解码文件: %s", encoding, name)
+        if encoding != detected:
+            # 记录纠正后的编码，下次流式读取直接使用
+            remember_encoding((file_path, None), file_identity(file_path), encoding)
+    except OSError as e:
+        logging.error("读取TXT文件时出错: %s", str(e))
+        return None
+
+    if FEILU_SUFFIX in name:
+        newline = content.find('\n')
+        if newline >= 0:
+            content = content[newline + 1:]
+            logging.info("跳过了文件%s的第一行小说标题", name)
+    return content
@@ -17,12 +17,196 @@
 """
 ZIP文件解析模块
 
-该模块负责从ZIP文件中提取文本内容，支持多种编码格式的自动检测。
+该模块负责从ZIP文件中提取文本内容，编码由编码检测模块根据文件开头的样本确定。
+ZIP中有多个TXT文件时，每个文件作为一卷，按文件名顺序拼接。
 """
 
+import re
 import zipfile
 import logging
-from typing import Optional
+import posixpath
+from itertools import chain
+from typing import Any, Iterable, Iterator, List, Optional
+
+from src.config import STREAM_CHUNK_SIZE
+from src.parsers.encoding import decode_text, iter_decoded, remember_encoding, source_encoding
+from src.utils.helpers import file_identity
+
+# 需要忽略的VIP说明文件
+VIP_FILES = ["Vip╙├╗º▒╪╢┴.txt", "Vip用户必读.txt"]
+
+# 飞卢小说正文文件的后缀，这类文件的第一行是小说标题
+FEILU_SUFFIX = "-飞卢小说网.txt"
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def _natural_key(name: str) -> List[Any]:
+    """
+    文件名的自然排序键，名称中的数字按数值比较，例如"第2卷"排在"第10卷"之前
+
+    Args:
+        name: 文件名
+
+    Returns:
+        排序键
+    """
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in _DIGITS.split(name) if part]
+
+
+def select_txt_files(zip_ref: zipfile.ZipFile, zip_path: str) -> List[str]:
+    """
+    选择ZIP文件中的小说正文文件
+
+    飞卢小说只有一个正文文件；其他ZIP中的每个TXT文件都作为一卷，按文件名自然排序。
+
+    Args:
+        zip_ref: 已打开的ZIP文件
+        zip_path: ZIP文件路径，仅用于日志
+
+    Returns:
+        正文文件在ZIP中的名称列表，如果没有合适的文件则返回空列表
+    """
+    # 获取ZIP文件中的所有TXT文件
+    txt_files = [f for f in zip_ref.namelist() if f.endswith('.txt')]
+
+    if not txt_files:
+        logging.warning("ZIP文件中未找到TXT文件: %s", zip_path)
+        return []
+
+    # 移除VIP文件
+    txt_files = [f for f in txt_files if posixpath.basename(f) not in VIP_FILES]
+
+    if not txt_files:
+        logging.warning("ZIP文件中仅包含VIP文件: %s", zip_path)
+        return []
+
+    # 优先选择带有"-飞卢小说网.txt"的文件
+    feilu_files = [f for f in txt_files if FEILU_SUFFIX in f]
+    if feilu_files:
+        return feilu_files[:1]
+    return sorted(txt_files, key=_natural_key)
+
+
+def skip_first_line(chunks: Iterable[str], name: str) -> Iterator[str]:
+    """
+    跳过文本的第一行，用于去掉飞卢小说正文开头的小说标题
+
+    Args:
+        chunks: 文本块序列
+        name: 文件名称，仅用于日志
+
+    Yields:
+        去掉第一行后的文本块，整个文本只有一行时保留原内容
+    """
+    pending_title = []
+    chunks = iter(chunks)
+    for text in chunks:
+        newline = text.find('\n')
+        if newline < 0:
+            pending_title.append(text)
+            continue
+        logging.info("跳过了文件%s的第一行小说标题", name)
+        if newline + 1 < len(text):
+            yield text[newline + 1:]
+        yield from chunks
+        return
+    text = "".join(pending_title)
+    if text:
+        yield text
+
+
+def _iter_member_chunks(zip_ref: zipfile.ZipFile, zip_path: str, txt_file: str,
+                        chunk_size: int) -> Iterator[str]:
+    """
+    以流的方式解码ZIP中的一个正文文件
+
+    Args:
+        zip_ref: 已打开的ZIP文件
+        zip_path: ZIP文件路径
+        txt_file: 正文文件在ZIP中的名称
+        chunk_size: 每次读取的字节数
+
+    Yields:
+        解码后的文本块
+    """
+    with zip_ref.open(txt_file) as member:
+        sample = member.read(chunk_size)
+        encoding = source_encoding(zip_path, txt_file, sample, at_eof=len(sample) < chunk_size)
+        logging.info("使用%s编码流式解码文件: %s", encoding, txt_file)
+        blocks = chain((sample,), iter(lambda: member.read(chunk_size), b""))
+        chunks = iter_decoded(blocks, encoding)
+        # 对于带有"-飞卢小说网.txt"的文件，跳过第一行（小说标题）
+        if FEILU_SUFFIX in txt_file:
+            chunks = skip_first_line(chunks, txt_file)
+        yield from chunks
+
+
+def iter_txt_chunks_from_zip(zip_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    以流的方式从ZIP文件中读取文本内容
+
+    每个正文文件只打开一次，根据第一个数据块检测编码（文件未变化时使用缓存的结果）后增量解码，
+    内存占用与数据块大小相当。有多个正文文件时依次输出各卷，卷之间以换行分隔。
+    与extract_txt_from_zip不同，出错时直接抛出异常，由调用方决定如何回退。
+
+    Args:
+        zip_path: ZIP文件路径
+        chunk_size: 每次读取的字节数
+
+    Yields:
+        解码后的文本块
+
+    Raises:
+        FileNotFoundError: 如果ZIP文件不存在
+        zipfile.BadZipFile: 如果ZIP文件无效
+        UnicodeDecodeError: 如果按样本检测到的编码无法解码后续内容
+        ValueError: 如果ZIP文件中没有可用的TXT文件
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        txt_files = select_txt_files(zip_ref, zip_path)
+        if not txt_files:
+            raise ValueError("ZIP文件中没有可用的TXT文件: {0}".format(zip_path))
+
+        for volume, txt_file in enumerate(txt_files):
+            if volume:
+                yield "\n"
+            yield from _iter_member_chunks(zip_ref, zip_path, txt_file, chunk_size)
+
+
+def _decode_member(zip_ref: zipfile.ZipFile, zip_path: str, txt_file: str) -> str:
+    """
+    完整解压并解码ZIP中的一个正文文件
+
+    Args:
+        zip_ref: 已打开的ZIP文件
+        zip_path: ZIP文件路径
+        txt_file: 正文文件在ZIP中的名称
+
+    Returns:
+        文本内容
+    """
+    # 只解压一次，按样本检测到的编码解码，失败时才尝试其他编码
+    data = zip_ref.read(txt_file)
+    detected = source_encoding(zip_path, txt_file, data[:STREAM_CHUNK_SIZE],
+                               at_eof=len(data) <= STREAM_CHUNK_SIZE)
+    content, encoding = decode_text(data, detected)
+    del data
+    logging.info("使用%s编码成功解码文件: %s", encoding, txt_file)
+    if encoding != detected:
+        # 记录纠正后的编码，下次流式读取直接使用
+        try:
+            remember_encoding((zip_path, txt_file), file_identity(zip_path), encoding)
+        except OSError:
+            pass
+
+    # 对于带有"-飞卢小说网.txt"的文件，跳过第一行（小说标题）
+    if FEILU_SUFFIX in txt_file:
+        newline = content.find('\n')
+        if newline >= 0:
+            content = content[newline + 1:]
+            logging.info("跳过了文件%s的第一行小说标题", txt_file)
+    return content
 
 
 def extract_txt_from_zip(zip_path: str) -> Optional[str]:
@@ -42,53 +226,12 @@ def extract_txt_from_zip(zip_path: str) -> Optional[str]:
     result = None
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # 获取ZIP文件中的所有TXT文件
-            txt_files = [f for f in zip_ref.namelist() if f.endswith('.txt')]
-            
+            txt_files = select_txt_files(zip_ref, zip_path)
             if not txt_files:
-                logging.warning("ZIP文件中未找到TXT文件: %s", zip_path)
                 return None
-            
-            # 移除VIP文件
-            vip_files = ["Vip╙├╗º▒╪╢┴.txt", "Vip用户必读.txt"]
-            txt_files = [f for f in txt_files if f not in vip_files]
-            
-            if not txt_files:
-                logging.warning("ZIP文件中仅包含VIP文件: %s", zip_path)
-                return None
-            
-            # 优先选择带有"-飞卢小说网.txt"的文件
-            feilu_files = [f for f in txt_files if "-飞卢小说网.txt" in f]
-            if feilu_files:
-                txt_file = feilu_files[0]
-            else:
-                # 如果没有找到，选择第一个文件
-                txt_file = txt_files[0]
-            
-            # 尝试使用不同编码解码文件
-            encodings = ['gbk', 'utf-8', 'utf-16', 'iso-8859-1']
-            
-            for encoding in encodings:
-                try:
-                    content = zip_ref.read(txt_file).decode(encoding)
-                    logging.info("使用%s编码成功解码文件: %s", encoding, txt_file)
-                    
-                    # 对于带有"-飞卢小说网.txt"的文件，跳过第一行（小说标题）
-                    if "-飞卢小说网.txt" in txt_file:
-                        lines = content.split('\n')
-                        if len(lines) > 1:
-                            # 跳过第一行，重新组合内容
-                            content = '\n'.join(lines[1:])
-                            logging.info("跳过了文件%s的第一行小说标题", txt_file)
-                    
-                    result = content
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if not result:
-                logging.error("无法解码TXT文件: %s", txt_file)
-            
+
+            result = "\n".join(_decode_member(zip_ref, zip_path, txt_file) for txt_file in txt_files)
+
     except FileNotFoundError:
         logging.error("ZIP文件不存在: %s", zip_path)
     except zipfile.BadZipFile:
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+多进程服务模块
+
+主进程创建监听套接字后fork出多个工作进程，工作进程继承同一个监听套接字并各自接受连接，
+分章等纯Python计算因此可以使用多个CPU核心。主进程只负责监控：工作进程异常退出时重新启动，
+收到SIGTERM或SIGINT时通知所有工作进程处理完当前请求后退出。
+
+工作进程之间通过磁盘上的章节存储共享解析结果，同一本小说只由一个进程解析。
+仅支持提供fork的类Unix系统。
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+from typing import Dict, Optional
+
+from src.config import PREFORK_WORKERS, PREFORK_GRACEFUL_TIMEOUT, WARMUP_ENABLED, SEARCH_ENABLED
+from src.catalog import get_catalog
+from src.app import start_warmer, start_search_indexer, watch_catalog
+from src.logger import setup_logging, stop_logging
+
+# 工作进程启动后存活不足该秒数就退出时，视为启动失败，延迟重启以免反复fork
+MIN_WORKER_UPTIME = 1.0
+
+# 主进程检查工作进程状态的间隔秒数
+SUPERVISE_INTERVAL = 0.5
+
+
+def _describe_exit(status: int) -> str:
+    """
+    描述子进程的退出状态
+
+    Args:
+        status: os.waitpid返回的状态
+
+    Returns:
+        退出状态描述
+    """
+    if os.WIFSIGNALED(status):
+        return "被信号{0}结束".format(os.WTERMSIG(status))
+    return "退出码{0}".format(os.WEXITSTATUS(status))
+
+
+def _run_worker(httpd, slot: int):
+    """
+    在工作进程中运行服务器，收到SIGTERM后处理完当前请求再退出
+
+    Args:
+        httpd: 从主进程继承的服务器实例
+        slot: 工作进程编号，只有0号进程负责后台预热和建立全文索引
+    """
+    # 日志的后台写入线程不会随fork复制，重新配置日志
+    setup_logging()
+    # Ctrl+C会发给整个进程组，由主进程统一通知工作进程退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # serve_forever所在的线程不能调用shutdown，在其他线程中调用
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=httpd.shutdown, daemon=True).start())
+
+    catalog = get_catalog()
+    catalog.start()
+    watch_catalog(catalog)
+    warmer = start_warmer(catalog) if WARMUP_ENABLED and slot == 0 else None
+    indexer = start_search_indexer(catalog) if SEARCH_ENABLED and slot == 0 else None
+    logging.info("工作进程%s已启动", os.getpid())
+    try:
+        httpd.serve_forever()
+    finally:
+        if indexer is not None:
+            indexer.stop()
+        if warmer is not None:
+            warmer.stop()
+        catalog.stop()
+        httpd.server_close()
+        logging.info("工作进程%s已退出", os.getpid())
+        # 工作进程通过os._exit退出，不会执行atexit，需要在此写出剩余的日志
+        stop_logging()
+
+
+class PreforkSupervisor:
+    """
+    工作进程监控器
+    """
+
+    def __init__(self, httpd, workers: Optional[int] = None, graceful_timeout: float = PREFORK_GRACEFUL_TIMEOUT):
+        """
+        初始化监控器
+
+        Args:
+            httpd: 已绑定监听地址的服务器实例，工作进程通过fork继承
+            workers: 工作进程数，默认为PREFORK_WORKERS，为0时使用CPU核心数
+            graceful_timeout: 停止时等待工作进程退出的秒数，超时后强制结束
+        """
+        if workers is None:
+            workers = PREFORK_WORKERS
+        self.httpd = httpd
+        self.workers = workers or os.cpu_count() or 1
+        self.graceful_timeout = graceful_timeout
+        # 进程ID -> (工作进程编号, 启动时间)
+        self._children: Dict[int, tuple] = {}
+        # 等待重启的工作进程编号 -> 重启时间
+        self._restarts: Dict[int, float] = {}
+        self._stopping = False
+
+        # 多个进程同时等待同一个监听套接字，连接被其他进程接受后accept不能阻塞
+        httpd.socket.setblocking(False)
+
+    def run(self):
+        """
+        启动工作进程并监控，直到收到SIGTERM或SIGINT后停止所有工作进程
+        """
+        previous = {
+            signum: signal.signal(signum, self._handle_stop_signal)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        logging.info("以多进程模式启动: 工作进程%s个", self.workers)
+        try:
+            for slot in range(self.workers):
+                self._spawn(slot)
+            while not self._stopping:
+                self._reap()
+                now = time.monotonic()
+                for slot, restart_at in list(self._restarts.items()):
+                    if restart_at <= now:
+                        del self._restarts[slot]
+                        self._spawn(slot)
+                time.sleep(SUPERVISE_INTERVAL)
+        finally:
+            self._stop_workers()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def _handle_stop_signal(self, signum, frame):
+        """
+        收到停止信号时结束监控循环
+        """
+        if not self._stopping:
+            logging.info("收到信号%s，正在停止工作进程...", signum)
+        self._stopping = True
+
+    def _spawn(self, slot: int):
+        """
+        fork一个工作进程
+
+        Args:
+            slot: 工作进程编号
+        """
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                _run_worker(self.httpd, slot)
+            except BaseException:
+                logging.exception("工作进程%s异常退出", os.getpid())
+                exit_code = 1
+            finally:
+                # 不执行主进程的清理逻辑
+                os._exit(exit_code)
+        self._children[pid] = (slot, time.monotonic())
+
+    def _reap(self):
+        """
+        回收已退出的工作进程，未在停止过程中时安排重启
+        """
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            child = self._children.pop(pid, None)
+            if child is None:
+                continue
+            slot, started_at = child
+            if self._stopping:
+                continue
+
+            logging.warning("工作进程%s%s，正在重启", pid, _describe_exit(status))
+            if time.monotonic() - started_at < MIN_WORKER_UPTIME:
+                self._restarts[slot] = time.monotonic() + MIN_WORKER_UPTIME
+            else:
+                self._restarts[slot] = 0
+
+    def _stop_workers(self):
+        """
+        通知所有工作进程退出，超时后强制结束
+        """
+        self._stopping = True
+        self._restarts.clear()
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        for pid in list(self._children):
+            logging.warning("工作进程%s未在%s秒内退出，强制结束", pid, self.graceful_timeout)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+全文搜索模块
+
+该模块负责在后台为小说库建立全文索引，并根据索引执行搜索。
+
+索引在独立的低优先级进程中建立，不与请求处理线程争抢GIL；小说目录发现新增或变化的小说时
+只为这些小说重新建立索引，被移除的小说的索引随之删除。
+
+搜索先通过索引找出可能包含查询内容的候选章节，再读取候选章节的正文确认并统计出现次数，
+按出现次数排序，最后为排在前面的章节给出匹配段落的摘要。
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from itertools import zip_longest
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config import SEARCH_MAX_RESULTS, SEARCH_MAX_CANDIDATES, WARMUP_NICE
+from src.parsers.novel_loader import load_novel
+from src.parsers.novel_parser import ChapterIndex, ChapterReadError
+from src.utils.helpers import file_identity
+from src.storage.search_index import get_search_index, iter_bits, normalize_text
+from src.warmup import create_background_executor
+
+# 查询内容的最大字符数，超出部分被忽略
+MAX_QUERY_LENGTH = 64
+
+# 每个章节最多给出的匹配段落摘要数
+MAX_SNIPPETS = 3
+
+# 摘要中匹配位置之前保留的字符数和摘要的最大字符数
+SNIPPET_BEFORE = 30
+SNIPPET_LENGTH = 120
+
+# 章节标题中每次出现计入得分的权重
+TITLE_WEIGHT = 5
+
+# 请求线程正在解析小说时，索引调度线程每隔该秒数检查一次是否可以继续
+INDEX_BUSY_WAIT = 0.5
+
+# 每建立一本小说的索引后暂停的秒数，限制索引对请求处理的影响
+INDEX_PAUSE = 0.1
+
+
+def parse_query(query: str) -> List[str]:
+    """
+    把查询内容拆分为规范化的短语，以空白分隔的多个短语须同时出现在同一章节中
+
+    Args:
+        query: 用户输入的查询内容
+
+    Returns:
+        去重后的短语列表，查询内容为空时返回空列表
+    """
+    phrases = []
+    for phrase in normalize_text(query[:MAX_QUERY_LENGTH]).split():
+        if phrase not in phrases:
+            phrases.append(phrase)
+    return phrases
+
+
+class SearchHit:
+    """
+    一个匹配的章节
+    """
+
+    __slots__ = ("novel", "index", "title", "key", "score", "snippets")
+
+    def __init__(self, novel: str, index: int, title: str, key: str, score: int,
+                 snippets: List[Tuple[int, str, List[Tuple[int, int]]]]):
+        """
+        初始化匹配结果
+
+        Args:
+            novel: 小说名称
+            index: 章节下标
+            title: 章节标题
+            key: 章节在路由中使用的名称
+            score: 得分，即查询短语在章节中出现的加权次数
+            snippets: 匹配段落的摘要，每项为(段落下标, 摘要文本, 摘要中匹配位置的(起, 止)列表)
+        """
+        self.novel = novel
+        self.index = index
+        self.title = title
+        self.key = key
+        self.score = score
+        self.snippets = snippets
+
+
+class SearchResult:
+    """
+    一次搜索的结果
+    """
+
+    __slots__ = ("query", "hits", "matched", "truncated", "indexed", "total", "elapsed")
+
+    def __init__(self, query: str, hits: List[SearchHit], matched: int, truncated: bool,
+                 indexed: int, total: int, elapsed: float):
+        """
+        初始化搜索结果
+
+        Args:
+            query: 查询内容
+            hits: 得分最高的匹配章节
+            matched: 确认匹配的章节总数
+            truncated: 候选章节是否超出上限而未全部确认
+            indexed: 索引与源文件一致、参与搜索的小说数
+            total: 小说库中的小说数
+            elapsed: 搜索用时秒数
+        """
+        self.query = query
+        self.hits = hits
+        self.matched = matched
+        self.truncated = truncated
+        self.indexed = indexed
+        self.total = total
+        self.elapsed = elapsed
+
+
+def _find_all(text: str, phrase: str) -> List[int]:
+    """
+    查找短语在文本中的所有出现位置，不重叠
+
+    Args:
+        text: 规范化后的文本
+        phrase: 规范化后的短语
+
+    Returns:
+        出现位置列表
+    """
+    positions = []
+    start = text.find(phrase)
+    while start >= 0:
+        positions.append(start)
+        start = text.find(phrase, start + len(phrase))
+    return positions
+
+
+def _snippet(paragraph: str, normalized: str, phrases: List[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    截取段落中第一个匹配位置附近的文字作为摘要
+
+    Args:
+        paragraph: 段落原文
+        normalized: 规范化后的段落
+        phrases: 规范化后的查询短语
+
+    Returns:
+        (摘要文本, 摘要中匹配位置的(起, 止)列表)，截断处以省略号表示
+    """
+    # 极少数字符转换大小写后长度会变化，此时以规范化后的文本作为摘要，保证位置对应
+    source = paragraph if len(paragraph) == len(normalized) else normalized
+    first = min(pos for pos in (normalized.find(phrase) for phrase in phrases) if pos >= 0)
+    start = max(0, first - SNIPPET_BEFORE)
+    end = min(len(source), start + SNIPPET_LENGTH)
+
+    spans = []
+    for phrase in phrases:
+        for pos in _find_all(normalized[start:end], phrase):
+            spans.append((pos, pos + len(phrase)))
+    spans.sort()
+    # 去掉与前一个匹配重叠的位置
+    merged = []
+    for span in spans:
+        if merged and span[0] < merged[-1][1]:
+            continue
+        merged.append(span)
+
+    text = source[start:end]
+    if start > 0:
+        text = "…" + text
+        merged = [(s + 1, e + 1) for s, e in merged]
+    if end < len(source):
+        text += "…"
+    return text, merged
+
+
+def _score_chapter(chapters: ChapterIndex, index: int, phrases: List[str]) -> int:
+    """
+    读取章节正文，确认章节包含所有查询短语并统计得分
+
+    整章正文作为一个字符串查找，不拆分段落。
+
+    Args:
+        chapters: 章节序列
+        index: 章节下标
+        phrases: 规范化后的查询短语
+
+    Returns:
+        各短语出现次数之和，标题中的出现按TITLE_WEIGHT加权；章节不包含所有短语时返回0
+    """
+    title = normalize_text(chapters.titles[index])
+    text = normalize_text(chapters.paragraph_text(index))
+    score = 0
+    for phrase in phrases:
+        count = title.count(phrase) * TITLE_WEIGHT + text.count(phrase)
+        if not count:
+            return 0
+        score += count
+    return score
+
+
+def _chapter_snippets(chapters: ChapterIndex, index: int,
+                      phrases: List[str]) -> List[Tuple[int, str, List[Tuple[int, int]]]]:
+    """
+    生成章节中匹配段落的摘要
+
+    Args:
+        chapters: 章节序列
+        index: 章节下标
+        phrases: 规范化后的查询短语
+
+    Returns:
+        最多MAX_SNIPPETS个匹配段落的(段落下标, 摘要文本, 摘要中匹配位置的(起, 止)列表)
+    """
+    snippets = []
+    for i, paragraph in enumerate(chapters.paragraphs(index)):
+        normalized = normalize_text(paragraph)
+        if any(phrase in normalized for phrase in phrases):
+            text, spans = _snippet(paragraph, normalized, phrases)
+            snippets.append((i, text, spans))
+            if len(snippets) >= MAX_SNIPPETS:
+                break
+    return snippets
+
+
+def search(query: str, entries: Iterable, load_chapters: Callable[[object], ChapterIndex],
+           limit: int = SEARCH_MAX_RESULTS, max_candidates: int = SEARCH_MAX_CANDIDATES) -> SearchResult:
+    """
+    在小说库中搜索
+
+    只搜索索引与源文件一致的小说。候选章节超出上限时，各小说轮流取候选章节，
+    避免结果全部来自排在前面的小说。
+
+    Args:
+        query: 用户输入的查询内容
+        entries: 小说目录条目
+        load_chapters: 根据目录条目获取章节序列的函数
+        limit: 最多返回的章节数
+        max_candidates: 最多确认的候选章节数
+
+    Returns:
+        搜索结果
+    """
+    started = time.perf_counter()
+    entries = list(entries)
+    phrases = parse_query(query)
+    index = get_search_index()
+    if not phrases or index is None:
+        return SearchResult(query, [], 0, False, 0, len(entries), time.perf_counter() - started)
+
+    indexed = index.indexed()
+    fresh = {}
+    for entry in entries:
+        record = indexed.get(entry.path)
+        if record is not None and record[1] == (entry.mtime_ns, entry.size):
+            fresh[record[0]] = entry
+
+    bitmaps = index.candidates(phrases, fresh.keys())
+    # 按小说目录顺序轮流取各小说的候选章节
+    per_novel = [
+        [(fresh[novel_id], chapter) for chapter in iter_bits(bitmaps[novel_id])]
+        for novel_id in sorted(bitmaps, key=lambda novel_id: fresh[novel_id].filename)
+    ]
+    candidates = [item for group in zip_longest(*per_novel) for item in group if item is not None]
+    truncated = len(candidates) > max_candidates
+
+    matches = []
+    loaded: Dict[str, Optional[ChapterIndex]] = {}
+    for order, (entry, chapter) in enumerate(candidates[:max_candidates]):
+        if entry.path not in loaded:
+            try:
+                loaded[entry.path] = load_chapters(entry)
+            except Exception as e:
+                logging.error("搜索时读取小说出错: %s, %s", entry.path, str(e))
+                loaded[entry.path] = None
+        chapters = loaded[entry.path]
+        if chapters is None or chapter >= len(chapters):
+            continue
+        try:
+            score = _score_chapter(chapters, chapter, phrases)
+        except ChapterReadError:
+            # 已在读取时记录日志，跳过无法读取的章节
+            continue
+        if score:
+            matches.append((-score, order, entry, chapters, chapter))
+
+    # 先按整章统计得分，只为返回的章节拆分段落生成摘要
+    matches.sort(key=lambda item: item[:2])
+    hits = [
+        SearchHit(entry.name, chapter, chapters.titles[chapter], chapters.route_key(chapter), -negative_score,
+                  _chapter_snippets(chapters, chapter, phrases))
+        for negative_score, _, entry, chapters, chapter in matches[:limit]
+    ]
+    elapsed = time.perf_counter() - started
+    logging.info("搜索\"%s\": 候选章节%s个，匹配%s个，用时%.1f毫秒", query, len(candidates), len(matches), elapsed * 1000)
+    return SearchResult(query, hits, len(matches), truncated, len(fresh), len(entries), elapsed)
+
+
+def _index_novel(path: str) -> int:
+    """
+    在索引进程中为一本小说建立全文索引
+
+    Args:
+        path: 小说源文件路径
+
+    Returns:
+        写入的词项数，索引已是最新时返回0
+    """
+    index = get_search_index()
+    identity = file_identity(path)
+    if index.is_fresh(path, identity):
+        return 0
+    chapters = load_novel(path, touch=False)
+    return index.add(path, identity, chapters)
+
+
+class SearchIndexer:
+    """
+    后台建立全文索引的调度器
+
+    调度线程按加入顺序逐本把小说交给单个低优先级的索引进程，索引写入磁盘，
+    多进程模式下所有工作进程共享同一份索引。每本小说之间稍作停顿，请求线程正在解析小说时暂停。
+    """
+
+    def __init__(self, nice: int = WARMUP_NICE, busy: Optional[Callable[[], bool]] = None):
+        """
+        初始化调度器
+
+        Args:
+            nice: 索引进程的优先级增量
+            busy: 返回True时暂不开始下一本小说，例如请求线程正在解析小说
+        """
+        self.nice = nice
+        self.busy = busy
+        self._queue = deque()
+        self._queued = set()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._executor = None
+        self._thread = None
+
+    def schedule(self, entries: Iterable):
+        """
+        把索引不是最新的小说加入队列
+
+        Args:
+            entries: 小说目录条目
+        """
+        index = get_search_index()
+        if index is None:
+            return
+        indexed = index.indexed()
+        with self._condition:
+            for entry in entries:
+                record = indexed.get(entry.path)
+                if record is not None and record[1] == (entry.mtime_ns, entry.size):
+                    continue
+                if entry.path not in self._queued:
+                    self._queued.add(entry.path)
+                    self._queue.append(entry.path)
+            self._condition.notify()
+
+    def purge(self, entries: Iterable):
+        """
+        删除已不在小说目录中的小说的索引
+
+        Args:
+            entries: 小说目录中的所有条目
+        """
+        index = get_search_index()
+        if index is None:
+            return
+        paths = {entry.path for entry in entries}
+        removed = [path for path in index.indexed() if path not in paths]
+        if removed:
+            index.remove(removed)
+
+    def start(self):
+        """
+        启动索引进程和调度线程
+        """
+        if self._thread is not None:
+            return
+        self._executor = create_background_executor(1, self.nice)
+        self._thread = threading.Thread(target=self._run, name="search-indexer", daemon=True)
+        self._thread.start()
+        logging.info("全文索引已启动")
+
+    def stop(self):
+        """
+        停止调度，放弃尚未开始的索引任务
+        """
+        with self._condition:
+            self._stopped = True
+            self._queue.clear()
+            self._queued.clear()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def pending(self) -> int:
+        """
+        获取等待建立索引的小说数
+
+        Returns:
+            队列中的小说数
+        """
+        return len(self._queued)
+
+    def _run(self):
+        """
+        调度循环，同一时间只有一本小说在建立索引
+        """
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopped:
+                    self._condition.wait()
+                while self.busy is not None and self.busy() and not self._stopped:
+                    self._condition.wait(INDEX_BUSY_WAIT)
+                if self._stopped:
+                    return
+                path = self._queue.popleft()
+                self._queued.discard(path)
+
+            try:
+                future = self._executor.submit(_index_novel, path)
+            except RuntimeError:
+                return
+            try:
+                future.result()
+            except Exception as e:
+                logging.error("建立全文索引时出错: %s, %s", path, str(e))
+            with self._condition:
+                self._condition.wait(INDEX_PAUSE)
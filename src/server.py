@@ -21,56 +21,84 @@ HTTP服务器实现模块
 """
 
 import os
+import time
 import logging
+import threading
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import unquote
 from webbrowser import open as op
 
-from src.config import PORT, XS_DIR, STATIC_DIR, LOGS_DIR, LOG_FILE_NAME, LOG_LEVEL, ENDSWITH
-from src.parsers.zip_parser import extract_txt_from_zip
-from src.parsers.novel_parser import novel_chapterizer
-from src.generators.html_generator import generate_html
-from src.utils.helpers import safe_join, validate_path, validate_novel_name, cached_function
+from src.config import (
+    PORT, SERVER_MODE, MAX_WORKERS, MAX_IN_FLIGHT, REQUEST_QUEUE_SIZE,
+    WARMUP_ENABLED, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS, PREFORK_WORKER_MODE, SEARCH_ENABLED
+)
+from src.catalog import get_catalog
+from src.app import Request, Response, handle_request, start_warmer, start_search_indexer, watch_catalog
+from src.async_server import create_async_server
+from src.metrics import registry as metrics, stage_timer
+from src.prefork import PreforkSupervisor
+from src.logger import setup_logging, stop_logging, log_access
 
-# 配置日志
-log_file = os.path.join(LOGS_DIR, LOG_FILE_NAME)
-logger = logging.getLogger()
-logger.setLevel(getattr(logging, LOG_LEVEL))
-
-# 创建文件处理器，将日志写入文件
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-
-# 创建流处理器，将日志输出到控制台
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-
-# 将处理器添加到日志器
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
-
-# 缓存装饰器，用于缓存小说解析结果
-@cached_function(maxsize=64)
-def extract_and_parse_novel(zip_path: str):
-    """
-    提取并解析小说内容，使用缓存提高性能
-    
-    Args:
-        zip_path: ZIP文件路径
-        
-    Returns:
-        解析后的章节列表
-    """
-    txt_content = extract_txt_from_zip(zip_path)
-    if txt_content:
-        return novel_chapterizer(txt_content)
-    return []
 
 class NovelHTTPRequestHandler(BaseHTTPRequestHandler):
     """
     小说阅读器的HTTP请求处理器
+
+    使用HTTP/1.1长连接，同一连接上可以连续处理多个请求，空闲超时或达到请求数上限后关闭。
     """
+
+    protocol_version = "HTTP/1.1"
+    # 长连接的空闲超时秒数，由StreamRequestHandler设置到套接字上
+    timeout = KEEPALIVE_TIMEOUT
+    # 响应头和响应体分两次写出，长连接上开启Nagle算法会与客户端的延迟确认叠加，每个响应多等约40毫秒
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        """
+        处理连接上的所有请求，最多处理KEEPALIVE_MAX_REQUESTS个
+        """
+        self._requests_left = KEEPALIVE_MAX_REQUESTS
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            self.handle_one_request()
+
+    def handle_one_request(self):
+        """
+        处理连接上的一个请求
+        """
+        self._requests_left -= 1
+        self._started = None
+        self._response_size = None
+        super().handle_one_request()
+
+    def parse_request(self) -> bool:
+        """
+        解析请求行和请求头，并记录开始处理请求的时间
+        """
+        self._started = time.perf_counter()
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        """
+        发送状态行，并告知客户端连接是否会保持
+        """
+        super().send_response(code, message)
+        allow_keep_alive = getattr(self.server, "allow_keep_alive", None)
+        if self._requests_left <= 0 or allow_keep_alive is None or not allow_keep_alive():
+            # 单线程模式下空闲的长连接会阻塞其他客户端，因此总是关闭
+            self.send_header('Connection', 'close')
+        elif self.request_version == 'HTTP/1.0' and not self.close_connection:
+            self.send_header('Connection', 'keep-alive')
     
+    def log_request(self, code='-', size='-'):
+        """
+        记录结构化的访问日志，耗时为读到请求到开始写出响应
+        """
+        seconds = time.perf_counter() - self._started if self._started is not None else 0.0
+        log_access(self.client_address[0], self.requestline, int(code), self._response_size, seconds)
+
     def log_message(self, fmt, *args):
         """
         自定义日志格式，记录到文件中
@@ -81,213 +109,232 @@ class NovelHTTPRequestHandler(BaseHTTPRequestHandler):
         """
         处理GET请求
         """
-        try:
-            # 处理静态文件请求
-            if self.path.startswith('/static/'):
-                self._handle_static_file()
-                return
-            
-            # 处理根路径请求
-            if self.path == "/":
-                self._handle_root()
-                return
-            
-            # 处理小说和章节请求
-            self._handle_novel_request()
-            
-        except Exception as e:
-            logging.error("请求处理时出错: %s", str(e))
-            self._send_error(500, "Internal Server Error")
-    
-    def _handle_static_file(self):
+        self._write_response(handle_request(Request('GET', self.path, self.headers, self.client_address)))
+
+    def _write_response(self, response: Response):
         """
-        处理静态文件请求
+        写出路由生成的响应
+
+        Args:
+            response: HTTP响应
         """
-        try:
-            # 获取静态文件路径
-            static_file_path = self.path[len('/static/'):]
-            
-            # 验证路径安全性
-            if not validate_path(static_file_path):
-                self._send_error(403, "Forbidden")
-                return
-            
-            # 构建完整文件路径
-            file_path = safe_join(STATIC_DIR, static_file_path)
-            
-            if not file_path or not os.path.exists(file_path):
-                self._send_error(404, "Not Found")
-                return
-            
-            # 确定文件MIME类型
-            content_type = self._get_content_type(file_path)
-            
-            # 发送文件
-            self.send_response(200)
-            self.send_header('Content-type', content_type)
+        if response.file is not None:
+            self._response_size = response.file[2]
+        else:
+            self._response_size = len(response.body) if response.status != 304 else 0
+        with stage_timer("write"):
+            self.send_response(response.status)
+            for name, value in response.headers:
+                self.send_header(name, value)
             self.end_headers()
-            
-            with open(file_path, 'rb') as f:
-                self.wfile.write(f.read())
-            
-            logging.info("成功返回静态文件: %s", self.path)
-            
-        except Exception as e:
-            logging.error("处理静态文件时出错: %s", str(e))
-            self._send_error(500, "Internal Server Error")
-    
-    def _handle_root(self):
+            if response.file is not None:
+                file_path, offset, count = response.file
+                with open(file_path, 'rb') as f:
+                    self.connection.sendfile(f, offset, count)
+            elif response.status != 304 and response.body:
+                self.wfile.write(response.body)
+
+class PooledHTTPServer(HTTPServer):
+    """
+    基于有界线程池的并发HTTP服务器
+
+    接受连接的主线程只负责把连接交给线程池；同时处理（含等待工作线程）的连接数
+    超过上限时直接返回503，避免请求无限堆积。
+    """
+
+    # 超出并发上限时返回的响应
+    _BUSY_RESPONSE = (
+        b"HTTP/1.0 503 Service Unavailable\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"Content-Length: 19\r\n"
+        b"Retry-After: 1\r\n"
+        b"Connection: close\r\n"
+        b"\r\n"
+        b"Service Unavailable"
+    )
+
+    def __init__(self, server_address, handler_class, max_workers: int = MAX_WORKERS,
+                 max_in_flight: int = MAX_IN_FLIGHT, queue_size: int = REQUEST_QUEUE_SIZE):
         """
-        处理根路径请求，返回小说列表
+        初始化服务器
+
+        Args:
+            server_address: 监听地址
+            handler_class: 请求处理器类
+            max_workers: 工作线程数
+            max_in_flight: 同时处理的最大请求数
+            queue_size: 监听套接字的连接排队深度
         """
-        try:
-            html_content = generate_html()
-            self._send_html(html_content)
-            logging.info("成功返回小说列表页面")
-            
-        except Exception as e:
-            logging.error("处理根路径时出错: %s", str(e))
-            self._send_error(500, "Internal Server Error")
-    
-    def _handle_novel_request(self):
+        # 必须在父类初始化（listen）之前设置；端口被占用时父类会先调用server_close再抛出异常，
+        # 线程池也要提前创建（提交任务前不会启动线程）
+        self.request_queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="novel-worker")
+        self._slots = threading.BoundedSemaphore(max(max_in_flight, max_workers))
+        self._max_workers = max_workers
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+        metrics.register_gauge("novel_connections_in_flight",
+                               "Connections being handled or waiting for a worker thread.", lambda: self._in_flight)
+
+    def allow_keep_alive(self) -> bool:
         """
-        处理小说和章节请求
+        判断是否可以保持连接
+
+        有连接在等待工作线程时不再保持空闲连接，把工作线程让给等待中的连接。
+
+        Returns:
+            可以保持连接时返回True
+        """
+        return self._in_flight <= self._max_workers
+
+    def process_request(self, request, client_address):
         """
+        将请求提交到线程池处理
+        """
+        if not self._slots.acquire(blocking=False):
+            logging.warning("并发请求数已达上限，拒绝来自%s的请求", client_address[0])
+            try:
+                request.sendall(self._BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+
+        with self._in_flight_lock:
+            self._in_flight += 1
         try:
-            # 解析路径
-            path_parts = unquote(self.path).strip('/').split('/')
-            
-            if not path_parts or not path_parts[0]:
-                self._handle_root()
-                return
-            
-            novel_name = path_parts[0]
-            
-            # 验证小说名称
-            if not validate_novel_name(novel_name):
-                self._send_error(400, "Invalid Novel Name")
-                return
-            
-            # 查找对应的ZIP文件
-            zip_file = None
-            if os.path.exists(XS_DIR):
-                for filename in os.listdir(XS_DIR):
-                    if filename.endswith(ENDSWITH) and novel_name in filename:
-                        zip_file = os.path.join(XS_DIR, filename)
-                        break
-            
-            if not zip_file:
-                self._send_error(404, "Novel Not Found")
-                return
-            
-            # 提取并解析小说内容
-            chapters = extract_and_parse_novel(zip_file)
-            
-            if not chapters:
-                self._send_error(404, "No Chapters Found")
-                return
-            
-            # 处理章节请求
-            if len(path_parts) > 1:
-                # 章节详情页面
-                html_content = generate_html(chapters, self.path)
-            else:
-                # 章节列表页面
-                html_content = generate_html(chapters, self.path)
-            
-            self._send_html(html_content)
-            logging.info("成功返回小说内容: %s", self.path)
-            
-        except Exception as e:
-            logging.error("处理小说请求时出错: %s", str(e))
-            self._send_error(500, "Internal Server Error")
-    
-    def _send_html(self, html_content: str):
+            self._executor.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # 线程池已关闭
+            self._release_slot()
+            self.shutdown_request(request)
+
+    def _release_slot(self):
         """
-        发送HTML内容
-        
-        Args:
-            html_content: HTML内容
+        释放一个并发名额
         """
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
-    
-    def _send_error(self, status_code: int, message: str):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _process_request_worker(self, request, client_address):
         """
-        发送错误响应
-        
-        Args:
-            status_code: HTTP状态码
-            message: 错误消息
+        在工作线程中处理请求
         """
-        self.send_response(status_code)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        
-        error_html = """
-        <!DOCTYPE html>
-        <html lang="zh-CN">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>{0} - {1}</title>
-            <link rel="stylesheet" href="/static/css/style.css">
-        </head>
-        <body>
-            <div class="container">
-                <h1>{0} - {1}</h1>
-                <p>抱歉，请求处理时发生错误。</p>
-                <a href="/">返回首页</a>
-            </div>
-        </body>
-        </html>
-        """.format(status_code, message)
-        
-        self.wfile.write(error_html.encode('utf-8'))
-    
-    def _get_content_type(self, file_path: str):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._release_slot()
+
+    def server_close(self):
         """
-        根据文件扩展名获取内容类型
-        
-        Args:
-            file_path: 文件路径
-            
-        Returns:
-            内容类型字符串
+        关闭服务器并等待正在处理的请求完成
         """
-        ext = os.path.splitext(file_path)[1].lower()
-        
-        content_types = {
-            '.css': 'text/css',
-            '.js': 'application/javascript',
-            '.html': 'text/html',
-            '.txt': 'text/plain',
-            '.png': 'image/png',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.gif': 'image/gif'
-        }
-        
-        return content_types.get(ext, 'application/octet-stream')
-
-def start_server():
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def create_server(server_address=None, mode: Optional[str] = None):
     """
-    启动HTTP服务器
+    根据配置创建HTTP服务器
+
+    Args:
+        server_address: 监听地址，默认为所有网卡的PORT端口
+        mode: 服务模式，默认为SERVER_MODE
+
+    Returns:
+        HTTP服务器实例，均提供serve_forever、shutdown和server_close方法
+    """
+    if server_address is None:
+        server_address = ('', PORT)
+    if mode is None:
+        mode = SERVER_MODE
+
+    if mode == "asyncio":
+        return create_async_server(server_address)
+
+    if mode == "threaded":
+        logging.info("以线程池模式启动: 工作线程%s个，最大并发请求%s个", MAX_WORKERS, MAX_IN_FLIGHT)
+        return PooledHTTPServer(server_address, NovelHTTPRequestHandler)
+
+    if mode != "single":
+        logging.warning("未知的服务模式%s，使用单线程模式", mode)
+    return HTTPServer(server_address, NovelHTTPRequestHandler)
+
+
+def open_browser(server_url: str):
+    """
+    自动打开浏览器访问服务器
+
+    Args:
+        server_url: 服务器地址
     """
-    server_address = ('', PORT)
-    httpd = HTTPServer(server_address, NovelHTTPRequestHandler)
-    
-    server_url = "http://127.0.0.1:{0}".format(PORT)
-    logging.info("服务器启动成功，地址为: %s", server_url)
-    
-    # 自动打开浏览器
     try:
         op(server_url)
         logging.info("已自动打开浏览器")
     except Exception as e:
         logging.warning("无法自动打开浏览器: %s", str(e))
+
+
+def start_server(mode: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None):
+    """
+    启动HTTP服务器
+
+    Args:
+        mode: 服务模式，默认为SERVER_MODE
+        port: 监听端口，默认为PORT
+        workers: prefork模式的工作进程数，默认为PREFORK_WORKERS
+    """
+    setup_logging()
+    try:
+        _run_server(mode, port, workers)
+    finally:
+        stop_logging()
+
+
+def _run_server(mode: Optional[str], port: Optional[int], workers: Optional[int]):
+    """
+    按服务模式运行服务器直到关闭，参数与start_server相同
+    """
+    if port is None:
+        port = PORT
+    if mode is None:
+        mode = SERVER_MODE
+    if mode == "prefork" and not hasattr(os, "fork"):
+        logging.warning("当前系统不支持fork，prefork模式改用线程池模式")
+        mode = "threaded"
+
+    server_url = "http://127.0.0.1:{0}".format(port)
+
+    if mode == "prefork":
+        # 主进程只创建监听套接字，小说目录等由各工作进程在fork之后自行建立
+        httpd = create_server(('', port), PREFORK_WORKER_MODE)
+        logging.info("服务器启动成功，地址为: %s", server_url)
+        open_browser(server_url)
+        try:
+            PreforkSupervisor(httpd, workers).run()
+        finally:
+            httpd.server_close()
+            logging.info("服务器已关闭")
+        return
+
+    httpd = create_server(('', port), mode)
+
+    # 启动时建立小说目录，并在后台跟踪目录变化
+    catalog = get_catalog()
+    catalog.start()
+    watch_catalog(catalog)
+    warmer = start_warmer(catalog) if WARMUP_ENABLED else None
+    indexer = start_search_indexer(catalog) if SEARCH_ENABLED else None
+    
+    logging.info("服务器启动成功，地址为: %s", server_url)
+    
+    # 自动打开浏览器
+    open_browser(server_url)
     
     # 启动服务器
     try:
@@ -295,4 +342,11 @@ def start_server():
     except KeyboardInterrupt:
         logging.info("服务器正在关闭...")
         httpd.shutdown()
+    finally:
+        if indexer is not None:
+            indexer.stop()
+        if warmer is not None:
+            warmer.stop()
+        catalog.stop()
+        httpd.server_close()
         logging.info("服务器已关闭")
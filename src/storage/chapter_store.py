@@ -0,0 +1,738 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+章节存储模块
+
+该模块负责把解析后的章节持久化到SQLite数据库中，服务重启后可直接读取，无需重新解压和分章。
+存储以源文件路径为键，并记录文件的修改时间、大小和内容摘要，文件变化后对应记录自动失效。
+"""
+
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+import zipfile
+from contextlib import contextmanager
+from typing import List, Iterable, Dict, Any, Optional, Tuple
+
+from src.config import CACHE_DIR, CHAPTER_STORE_ENABLED, CHAPTER_STORE_FILE
+from src.utils.helpers import file_identity
+from src.parsers.novel_parser import ChapterIndex, ResumePoint
+
+try:
+    import fcntl
+except ImportError:
+    # Windows没有fcntl，只以单进程方式运行，不需要跨进程加锁
+    fcntl = None
+
+# 数据库结构版本，结构变化时递增，旧数据会被丢弃重建
+SCHEMA_VERSION = 4
+
+# 写入章节时每批的章节数，每批单独提交，解析期间不长时间占用写锁
+WRITE_BATCH_SIZE = 200
+
+# 超过该秒数仍未完成的暂存记录视为写入进程已退出，打开数据库时清理
+STAGING_EXPIRE_SECONDS = 3600
+
+# 读者访问时间先记录在内存中，最多每隔该秒数尝试写入一次数据库
+TOUCH_FLUSH_INTERVAL = 5.0
+
+# 正在写入的记录path为NULL，读取时按path查询不会看到
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS novels (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    chapter_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL,
+    rule TEXT,
+    resume_offset INTEGER,
+    resume_checksum INTEGER,
+    resume_segments INTEGER,
+    resume_chapters INTEGER
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    novel_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (novel_id, idx)
+);
+"""
+
+
+def file_digest(file_path: str) -> str:
+    """
+    计算文件的内容摘要
+
+    ZIP文件只读取中央目录，按成员名称、CRC和大小计算摘要，无需解压；
+    其他文件按大小和首尾各64KB计算摘要。
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        十六进制摘要字符串
+    """
+    sha1 = hashlib.sha1()
+    try:
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                sha1.update(info.filename.encode('utf-8', 'surrogateescape'))
+                sha1.update(b"%d:%d;" % (info.CRC, info.file_size))
+        return "zip:" + sha1.hexdigest()
+    except zipfile.BadZipFile:
+        pass
+
+    with open(file_path, 'rb') as f:
+        return _raw_digest(f, os.fstat(f.fileno()).st_size)
+
+
+def _raw_digest(f, size: int) -> str:
+    """
+    按大小和首尾各64KB计算非ZIP文件的摘要
+
+    Args:
+        f: 以二进制方式打开的文件
+        size: 参与计算的文件长度，小于文件实际长度时只计算文件的前size个字节
+
+    Returns:
+        十六进制摘要字符串
+    """
+    sha1 = hashlib.sha1()
+    sha1.update(b"%d;" % size)
+    f.seek(0)
+    sha1.update(f.read(min(size, 65536)))
+    if size > 131072:
+        f.seek(size - 65536)
+        sha1.update(f.read(65536))
+    return "raw:" + sha1.hexdigest()
+
+
+def appended_to(file_path: str, size: int, digest: str) -> bool:
+    """
+    判断文件是否可能只是在原有内容的末尾追加了内容，只读取少量数据，用于决定是否尝试增量分章
+
+    文件变短时一定不是追加。非ZIP文件按原长度重新计算摘要，与原摘要一致说明原有内容的首尾未变；
+    ZIP文件的摘要取自中央目录，无法按原长度计算，只检查大小。
+
+    Args:
+        file_path: 文件路径
+        size: 原文件大小
+        digest: 原文件的内容摘要
+
+    Returns:
+        可能是追加时返回True
+
+    Raises:
+        OSError: 如果文件不存在或无法访问
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < size:
+            return False
+        if not digest.startswith("raw:"):
+            return True
+        return _raw_digest(f, size) == digest
+
+
+class StoredChapterIndex(ChapterIndex):
+    """
+    由章节存储提供正文的章节序列
+
+    构建时只读取章节标题，正文在访问具体章节时按主键单独查询。
+    """
+
+    def __init__(self, store: "ChapterStore", novel_id: int, titles):
+        """
+        初始化章节序列
+
+        Args:
+            store: 章节存储
+            novel_id: 存储记录ID
+            titles: 章节标题列表
+        """
+        super().__init__(titles)
+        self._store = store
+        self._novel_id = novel_id
+
+    def paragraphs(self, index: int) -> List[str]:
+        content = self._store.load_content(self._novel_id, index)
+        return content.split("\n") if content else []
+
+    def paragraph_text(self, index: int) -> str:
+        # 存储中的正文本身就是以换行分隔的段落
+        return self._store.load_content(self._novel_id, index) or ""
+
+
+class ChapterStore:
+    """
+    基于SQLite的章节存储
+
+    每个线程使用独立的数据库连接，数据库以WAL模式打开，支持多线程和多进程并发读取。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        初始化章节存储
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._touches = {}
+        self._touch_lock = threading.Lock()
+        self._touch_flushed = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        获取当前线程的数据库连接，必要时创建数据库结构
+
+        Returns:
+            数据库连接
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self._init_lock:
+            if not self._initialized:
+                # 多个进程可能同时首次打开数据库，在写事务中检查并创建结构
+                conn.execute("BEGIN IMMEDIATE")
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version != SCHEMA_VERSION:
+                    if version:
+                        logging.info("章节存储结构已变化，重建数据库: %s", self.db_path)
+                    conn.execute("DROP TABLE IF EXISTS chapters")
+                    conn.execute("DROP TABLE IF EXISTS novels")
+                    for statement in _SCHEMA.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                    conn.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+                else:
+                    self._purge_staging(conn)
+                conn.commit()
+                self._initialized = True
+
+        self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _purge_staging(conn: sqlite3.Connection):
+        """
+        清理写入进程中途退出后遗留的暂存记录，调用方需已开启事务
+
+        Args:
+            conn: 数据库连接
+        """
+        expired = time.time() - STAGING_EXPIRE_SECONDS
+        conn.execute(
+            "DELETE FROM chapters WHERE novel_id IN (SELECT id FROM novels WHERE path IS NULL AND created_at < ?)",
+            (expired,)
+        )
+        conn.execute("DELETE FROM novels WHERE path IS NULL AND created_at < ?", (expired,))
+
+    @contextmanager
+    def parse_lock(self, file_path: str):
+        """
+        跨进程互斥地解析同一本小说
+
+        多进程模式下，同时请求同一本未解析小说的多个进程中只有一个解析，
+        其他进程等待后直接读取存储结果。锁文件按源文件路径命名，放在数据库旁的locks目录中。
+
+        Args:
+            file_path: 源文件路径
+        """
+        if fcntl is None:
+            yield
+            return
+        lock_dir = os.path.join(os.path.dirname(self.db_path), "locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        name = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+        with open(os.path.join(lock_dir, name + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _lookup(self, conn: sqlite3.Connection, file_path: str) -> Optional[Tuple[int, int]]:
+        """
+        查找与文件当前状态匹配的存储记录，只读不写
+
+        修改时间或大小不一致时视为没有有效记录，但保留旧记录：内容未变时由解析流程调用
+        refresh_identity更新修改时间，内容变化时增量分章沿用其中未变化的章节，旧记录在保存新结果时被替换。
+
+        Args:
+            conn: 数据库连接
+            file_path: 源文件路径
+
+        Returns:
+            (记录ID, 章节数)，没有有效记录时返回None
+        """
+        row = conn.execute(
+            "SELECT id, mtime_ns, size, chapter_count FROM novels WHERE path = ?",
+            (file_path,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        novel_id, mtime_ns, size, chapter_count = row
+        if (mtime_ns, size) == file_identity(file_path):
+            return novel_id, chapter_count
+
+        logging.info("源文件已变化，存储的章节已过期: %s", file_path)
+        return None
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, novel_id: int):
+        """
+        删除一条存储记录及其章节
+
+        Args:
+            conn: 数据库连接
+            novel_id: 记录ID
+        """
+        with conn:
+            conn.execute("DELETE FROM chapters WHERE novel_id = ?", (novel_id,))
+            conn.execute("DELETE FROM novels WHERE id = ?", (novel_id,))
+
+    def load(self, file_path: str, touch: bool = True) -> Optional[StoredChapterIndex]:
+        """
+        读取文件对应的已解析章节，只读取标题，正文按需查询
+
+        Args:
+            file_path: 源文件路径
+            touch: 是否把本次读取记为读者访问
+
+        Returns:
+            章节序列，如果没有有效的存储记录则返回None
+        """
+        try:
+            conn = self._connect()
+            found = self._lookup(conn, file_path)
+            if found is None:
+                return None
+
+            novel_id, chapter_count = found
+            titles = [row[0] for row in conn.execute(
+                "SELECT title FROM chapters WHERE novel_id = ? ORDER BY idx",
+                (novel_id,)
+            )]
+            if len(titles) != chapter_count:
+                logging.warning("存储的章节不完整，丢弃: %s", file_path)
+                self._delete(conn, novel_id)
+                return None
+
+            if touch:
+                self._touch(novel_id)
+
+            logging.info("从章节存储读取%s个章节: %s", chapter_count, file_path)
+            return StoredChapterIndex(self, novel_id, titles)
+
+        except (sqlite3.Error, OSError) as e:
+            logging.error("读取章节存储时出错: %s", str(e))
+            return None
+
+    def _touch(self, novel_id: int):
+        """
+        在内存中记录读者访问时间，距上次写入超过TOUCH_FLUSH_INTERVAL时顺带尝试写入数据库
+
+        Args:
+            novel_id: 存储记录ID
+        """
+        now = time.time()
+        with self._touch_lock:
+            self._touches[novel_id] = now
+            due = now - self._touch_flushed >= TOUCH_FLUSH_INTERVAL
+            if due:
+                self._touch_flushed = now
+        if due:
+            self.flush_touches()
+
+    def flush_touches(self):
+        """
+        把内存中的读者访问时间写入数据库
+
+        访问时间只用于预热排序，写入是尽力而为的：使用不等待锁的独立连接，
+        数据库正被其他线程或进程写入时放回内存，下次再写，不会阻塞调用方。
+        """
+        with self._touch_lock:
+            touches, self._touches = self._touches, {}
+        if not touches:
+            return
+        try:
+            conn = getattr(self._local, "touch_conn", None)
+            if conn is None:
+                self._connect()
+                conn = sqlite3.connect(self.db_path, timeout=0)
+                self._local.touch_conn = conn
+            with conn:
+                conn.executemany(
+                    "UPDATE novels SET accessed_at = MAX(IFNULL(accessed_at, 0), ?) WHERE id = ?",
+                    [(accessed_at, novel_id) for novel_id, accessed_at in touches.items()]
+                )
+        except sqlite3.Error as e:
+            logging.debug("暂时无法写入读者访问时间: %s", str(e))
+            with self._touch_lock:
+                for novel_id, accessed_at in touches.items():
+                    if self._touches.get(novel_id, 0) < accessed_at:
+                        self._touches[novel_id] = accessed_at
+
+    def status(self, file_path: str) -> Tuple[bool, Optional[float]]:
+        """
+        查询文件的存储状态，不会删除过期记录
+
+        Args:
+            file_path: 源文件路径
+
+        Returns:
+            (记录是否与文件当前的修改时间和大小一致, 记录上次被读取的时间戳)，
+            没有记录时返回(False, None)
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT id, mtime_ns, size, accessed_at FROM novels WHERE path = ?",
+                (file_path,)
+            ).fetchone()
+            if row is None:
+                return False, None
+            novel_id, mtime_ns, size, accessed_at = row
+            # 还未写入数据库的访问时间更新
+            pending = self._touches.get(novel_id)
+            if pending is not None and (accessed_at is None or pending > accessed_at):
+                accessed_at = pending
+            return (mtime_ns, size) == file_identity(file_path), accessed_at
+        except (sqlite3.Error, OSError) as e:
+            logging.error("查询章节存储状态时出错: %s", str(e))
+            return False, None
+
+    def load_content(self, novel_id: int, index: int) -> Optional[str]:
+        """
+        读取单个章节的正文
+
+        Args:
+            novel_id: 存储记录ID
+            index: 章节下标
+
+        Returns:
+            以换行分隔的段落文本，记录不存在时返回None
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT content FROM chapters WHERE novel_id = ? AND idx = ?",
+                (novel_id, index)
+            ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logging.error("读取章节正文时出错: %s", str(e))
+            return None
+
+    def refresh_identity(self, file_path: str, identity: Tuple[int, int]) -> bool:
+        """
+        文件被touch或复制时修改时间会变，但内容不变：用内容摘要确认后更新记录的修改时间，
+        使记录重新有效。只在解析流程中调用一次，读取路径不写数据库。
+
+        Args:
+            file_path: 源文件路径
+            identity: 文件当前的身份信息
+
+        Returns:
+            记录内容与文件一致并已更新时返回True
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT id, size, digest FROM novels WHERE path = ?", (file_path,)).fetchone()
+            mtime_ns, size = identity
+            if row is None or row[1] != size or file_digest(file_path) != row[2]:
+                return False
+            with conn:
+                conn.execute("UPDATE novels SET mtime_ns = ? WHERE id = ? AND digest = ?", (mtime_ns, row[0], row[2]))
+            logging.info("源文件内容未变，沿用存储的章节: %s", file_path)
+            return True
+        except (sqlite3.Error, OSError) as e:
+            logging.error("更新章节存储记录时出错: %s", str(e))
+            return False
+
+    def resume_point(self, file_path: str) -> Optional[Tuple[int, ResumePoint]]:
+        """
+        读取文件上次分章时记录的续接点，用于源文件变化后的增量分章
+
+        先用记录的文件大小和摘要确认文件可能只是追加了内容，文件被改写时不返回续接点，
+        避免解压并校验续接点之前的全部文本后才发现需要完整分章。
+
+        Args:
+            file_path: 源文件路径
+
+        Returns:
+            (记录ID, 续接点)，没有记录、记录中没有可用的续接点或文件不是追加时返回None
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT id, size, digest, rule, resume_offset, resume_checksum, resume_segments, resume_chapters "
+                "FROM novels WHERE path = ?",
+                (file_path,)
+            ).fetchone()
+            # 只有一个章节片段时没有可以保留的章节
+            if row is None or row[3] is None or not row[4]:
+                return None
+            if not appended_to(file_path, row[1], row[2]):
+                logging.info("源文件不是在末尾追加内容，完整分章: %s", file_path)
+                return None
+        except (sqlite3.Error, OSError) as e:
+            logging.error("读取章节存储时出错: %s", str(e))
+            return None
+        return row[0], ResumePoint(*row[3:])
+
+    @staticmethod
+    def _resume_values(chapters) -> Tuple:
+        """
+        取出章节迭代器记录的续接点，用于写入记录
+
+        Args:
+            chapters: 已迭代完的章节序列，为TrackedChapters时带有续接点
+
+        Returns:
+            (规则名称, 续接位置, 校验值, 片段数, 章节数)，没有续接点时均为None
+        """
+        resume = getattr(chapters, "resume_point", None)
+        if resume is None:
+            return None, None, None, None, None
+        return resume.rule, resume.offset, resume.checksum, resume.segments, resume.chapters
+
+    def append(self, file_path: str, novel_id: int, resume: ResumePoint, chapters: Iterable[Dict[str, Any]],
+               identity: Tuple[int, int]) -> bool:
+        """
+        增量保存：保留续接点之前的章节，用从续接点开始重新分章的结果替换其余章节
+
+        与save一样先把新章节分批写入暂存记录，再用一个短事务替换续接点之后的章节；
+        记录在此期间被其他进程替换时放弃写入。
+
+        Args:
+            file_path: 源文件路径
+            novel_id: resume_point返回的记录ID
+            resume: resume_point返回的续接点
+            chapters: 从续接点开始解析出的章节迭代器，通常为TrackedChapters
+            identity: 解析前获取的文件身份信息
+
+        Returns:
+            保存成功返回True，否则返回False
+        """
+        try:
+            mtime_ns, size = identity
+            digest = file_digest(file_path)
+
+            conn = self._connect()
+            staging_id = self._stage(conn, mtime_ns, size, digest)
+            try:
+                chapter_count = self._write_chapters(conn, staging_id, chapters, resume.chapters)
+                with conn:
+                    row = conn.execute(
+                        "SELECT resume_offset, resume_checksum FROM novels WHERE id = ? AND path = ?",
+                        (novel_id, file_path)
+                    ).fetchone()
+                    if row is None or tuple(row) != (resume.offset, resume.checksum):
+                        logging.info("章节存储记录已被替换，放弃增量保存: %s", file_path)
+                        replaced = True
+                    else:
+                        replaced = False
+                        conn.execute("DELETE FROM chapters WHERE novel_id = ? AND idx >= ?",
+                                     (novel_id, resume.chapters))
+                        conn.execute("UPDATE chapters SET novel_id = ? WHERE novel_id = ?", (novel_id, staging_id))
+                        conn.execute("DELETE FROM novels WHERE id = ?", (staging_id,))
+                        conn.execute(
+                            "UPDATE novels SET mtime_ns = ?, size = ?, digest = ?, chapter_count = ?, rule = ?, "
+                            "resume_offset = ?, resume_checksum = ?, resume_segments = ?, resume_chapters = ? "
+                            "WHERE id = ?",
+                            (mtime_ns, size, digest, chapter_count) + self._resume_values(chapters) + (novel_id,)
+                        )
+            except BaseException:
+                self._discard(conn, staging_id)
+                raise
+            if replaced:
+                self._discard(conn, staging_id)
+                return False
+
+            logging.info("增量分章：保留%s个章节，重新写入%s个章节: %s",
+                         resume.chapters, chapter_count - resume.chapters, file_path)
+            return True
+
+        except (sqlite3.Error, OSError) as e:
+            logging.error("写入章节存储时出错: %s", str(e))
+            return False
+
+    @staticmethod
+    def _stage(conn: sqlite3.Connection, mtime_ns: int, size: int, digest: str) -> int:
+        """
+        创建一条暂存记录，章节写完之前读取方看不到它
+
+        Args:
+            conn: 数据库连接
+            mtime_ns: 文件修改时间纳秒数
+            size: 文件大小
+            digest: 文件内容摘要
+
+        Returns:
+            暂存记录ID
+        """
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO novels (path, mtime_ns, size, digest, chapter_count, created_at) "
+                "VALUES (NULL, ?, ?, ?, 0, ?)",
+                (mtime_ns, size, digest, time.time())
+            )
+        return cursor.lastrowid
+
+    @staticmethod
+    def _write_chapters(conn: sqlite3.Connection, novel_id: int, chapters: Iterable[Dict[str, Any]],
+                        start: int = 0) -> int:
+        """
+        分批写入章节，每批在事务外从迭代器取出后再用一个短事务提交
+
+        章节通常是边解压边分章的迭代器，取下一个章节可能很慢，不能在持有写锁时进行。
+
+        Args:
+            conn: 数据库连接
+            novel_id: 写入的记录ID
+            chapters: 章节序列或章节迭代器
+            start: 第一个章节的下标
+
+        Returns:
+            写入后的章节总数，即最后一个章节的下标加1
+        """
+        index = start
+        batch = []
+        for index, chapter in enumerate(chapters, start + 1):
+            batch.append((novel_id, index - 1, chapter["title"], "\n".join(chapter["content"])))
+            if len(batch) >= WRITE_BATCH_SIZE:
+                with conn:
+                    conn.executemany("INSERT INTO chapters (novel_id, idx, title, content) VALUES (?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany("INSERT INTO chapters (novel_id, idx, title, content) VALUES (?, ?, ?, ?)", batch)
+        return index
+
+    def _discard(self, conn: sqlite3.Connection, novel_id: int):
+        """
+        尽力删除写入失败的暂存记录，删除失败时留待下次打开数据库时清理
+
+        Args:
+            conn: 数据库连接
+            novel_id: 暂存记录ID
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._delete(conn, novel_id)
+        except sqlite3.Error as e:
+            logging.warning("清理暂存的章节记录时出错: %s", str(e))
+
+    def save(self, file_path: str, chapters: Iterable[Dict[str, Any]],
+             identity: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        保存文件解析后的章节，替换该文件已有的记录
+
+        章节可以是边解析边产生的迭代器，先分批写入一条暂存记录，全部写完后用一个短事务替换旧记录，
+        中途出错时不会留下不完整的记录。迭代器抛出的非存储类异常会原样抛出。
+        章节为TrackedChapters时同时记录增量分章的续接点。
+
+        Args:
+            file_path: 源文件路径
+            chapters: 章节序列或章节迭代器
+            identity: 解析前获取的文件身份信息，避免解析期间文件变化导致记录错配
+
+        Returns:
+            保存成功返回True，否则返回False
+        """
+        try:
+            if identity is None:
+                identity = file_identity(file_path)
+            mtime_ns, size = identity
+            digest = file_digest(file_path)
+
+            conn = self._connect()
+            novel_id = self._stage(conn, mtime_ns, size, digest)
+            try:
+                chapter_count = self._write_chapters(conn, novel_id, chapters)
+                with conn:
+                    row = conn.execute("SELECT id FROM novels WHERE path = ?", (file_path,)).fetchone()
+                    if row is not None:
+                        conn.execute("DELETE FROM chapters WHERE novel_id = ?", (row[0],))
+                        conn.execute("DELETE FROM novels WHERE id = ?", (row[0],))
+                    conn.execute(
+                        "UPDATE novels SET path = ?, chapter_count = ?, created_at = ?, rule = ?, resume_offset = ?, "
+                        "resume_checksum = ?, resume_segments = ?, resume_chapters = ? WHERE id = ?",
+                        (file_path, chapter_count, time.time()) + self._resume_values(chapters) + (novel_id,)
+                    )
+            except BaseException:
+                self._discard(conn, novel_id)
+                raise
+
+            logging.info("已将%s个章节写入章节存储: %s", chapter_count, file_path)
+            return True
+
+        except (sqlite3.Error, OSError) as e:
+            logging.error("写入章节存储时出错: %s", str(e))
+            return False
+
+    def invalidate(self, file_path: str):
+        """
+        删除文件对应的存储记录
+
+        Args:
+            file_path: 源文件路径
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT id FROM novels WHERE path = ?", (file_path,)).fetchone()
+            if row is not None:
+                self._delete(conn, row[0])
+        except sqlite3.Error as e:
+            logging.error("删除章节存储记录时出错: %s", str(e))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_chapter_store() -> Optional[ChapterStore]:
+    """
+    获取全局章节存储实例
+
+    Returns:
+        章节存储实例，如果配置中关闭了章节存储则返回None
+    """
+    global _store
+    if not CHAPTER_STORE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChapterStore(os.path.join(CACHE_DIR, CHAPTER_STORE_FILE))
+    return _store
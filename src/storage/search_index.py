@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+全文索引存储模块
+
+该模块以SQLite保存整个小说库的倒排索引，数据库与章节存储放在同一个缓存目录中。
+中文没有空格分词，索引以单字和相邻两字（二元组）为词项，任意长度的查询都可以拆成二元组查找，
+不依赖分词词典。
+
+每本小说的每个词项保存为一行，内容是出现该词项的章节集合：出现的章节较少时保存章节下标数组，
+较多时保存位图，两种编码中取较小的一种。查询时把各词项的章节集合转换为整数位图做按位与，
+得到可能包含查询内容的候选章节，再由调用方读取正文确认。
+"""
+
+import os
+import time
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import defaultdict
+from operator import add
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.config import CACHE_DIR, SEARCH_ENABLED, SEARCH_INDEX_FILE
+from src.parsers.novel_parser import ChapterIndex
+
+# 数据库结构版本，结构或词项规则变化时递增，旧索引会被丢弃重建
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS novels (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    chapter_count INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    novel_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    chapters BLOB NOT NULL,
+    PRIMARY KEY (novel_id, term)
+) WITHOUT ROWID;
+"""
+
+# 章节集合的编码标记
+_BITMAP = b"B"
+_SHORT_ARRAY = b"H"
+_LONG_ARRAY = b"I"
+
+
+def normalize_text(text: str) -> str:
+    """
+    规范化要索引或查询的文本，英文字母不区分大小写
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        规范化后的文本
+    """
+    return text.lower()
+
+
+def text_terms(text: str) -> Set[str]:
+    """
+    提取文本中的所有词项
+
+    Args:
+        text: 规范化后的文本
+
+    Returns:
+        文本中出现的单字和相邻两字
+    """
+    terms = set(text)
+    # 逐字相加在C中完成，比按下标切片快数倍
+    terms.update(map(add, text, text[1:]))
+    return terms
+
+
+def query_terms(phrase: str) -> List[str]:
+    """
+    把查询短语拆分为查找所需的词项
+
+    单字查询使用单字词项，更长的查询使用其中所有的二元组，包含这些二元组是包含该短语的必要条件。
+
+    Args:
+        phrase: 规范化后的查询短语
+
+    Returns:
+        词项列表
+    """
+    if len(phrase) == 1:
+        return [phrase]
+    return sorted(set(map(add, phrase, phrase[1:])))
+
+
+def _encode_chapters(indices: List[int], chapter_count: int) -> bytes:
+    """
+    编码一个词项出现的章节集合
+
+    Args:
+        indices: 升序的章节下标
+        chapter_count: 小说的章节数
+
+    Returns:
+        编码后的章节集合
+    """
+    typecode = 'H' if chapter_count <= 0x10000 else 'I'
+    bitmap_size = (chapter_count + 7) // 8
+    if len(indices) * (2 if typecode == 'H' else 4) <= bitmap_size:
+        return typecode.encode("ascii") + array(typecode, indices).tobytes()
+    bitmap = bytearray(bitmap_size)
+    for i in indices:
+        bitmap[i >> 3] |= 1 << (i & 7)
+    return _BITMAP + bytes(bitmap)
+
+
+def _decode_chapters(data: bytes) -> int:
+    """
+    把编码后的章节集合解码为整数位图
+
+    Args:
+        data: 编码后的章节集合
+
+    Returns:
+        第i位为1表示下标为i的章节包含该词项
+    """
+    kind, payload = data[:1], data[1:]
+    if kind == _BITMAP:
+        return int.from_bytes(payload, "little")
+    values = array(kind.decode("ascii"))
+    values.frombytes(payload)
+    bitmap = bytearray((values[-1] >> 3) + 1 if values else 0)
+    for i in values:
+        bitmap[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """
+    按从低到高的顺序遍历整数位图中为1的位
+
+    Args:
+        bits: 整数位图
+
+    Returns:
+        为1的位的下标
+    """
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class SearchIndex:
+    """
+    基于SQLite的全文倒排索引
+
+    每个线程使用独立的数据库连接，数据库以WAL模式打开，建立索引的进程写入时不阻塞查询。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        初始化全文索引
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        获取当前线程的数据库连接，必要时创建数据库结构
+
+        Returns:
+            数据库连接
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self._init_lock:
+            if not self._initialized:
+                # 多个进程可能同时首次打开数据库，在写事务中检查并创建结构
+                conn.execute("BEGIN IMMEDIATE")
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version != SCHEMA_VERSION:
+                    if version:
+                        logging.info("全文索引结构已变化，重建索引: %s", self.db_path)
+                    conn.execute("DROP TABLE IF EXISTS postings")
+                    conn.execute("DROP TABLE IF EXISTS novels")
+                    for statement in _SCHEMA.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                    conn.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+                conn.commit()
+                self._initialized = True
+
+        self._local.conn = conn
+        return conn
+
+    def indexed(self) -> Dict[str, Tuple[int, Tuple[int, int]]]:
+        """
+        获取所有已建立索引的小说
+
+        Returns:
+            源文件路径到(记录ID, (修改时间纳秒数, 文件大小))的映射
+        """
+        try:
+            return {
+                path: (novel_id, (mtime_ns, size))
+                for novel_id, path, mtime_ns, size in self._connect().execute(
+                    "SELECT id, path, mtime_ns, size FROM novels")
+            }
+        except sqlite3.Error as e:
+            logging.error("读取全文索引时出错: %s", str(e))
+            return {}
+
+    def is_fresh(self, file_path: str, identity: Tuple[int, int]) -> bool:
+        """
+        判断小说的索引是否与源文件当前状态一致
+
+        Args:
+            file_path: 源文件路径
+            identity: 源文件的(修改时间纳秒数, 文件大小)
+
+        Returns:
+            索引有效时返回True
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT mtime_ns, size FROM novels WHERE path = ?", (file_path,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error("读取全文索引时出错: %s", str(e))
+            return False
+        return row is not None and (row[0], row[1]) == tuple(identity)
+
+    def add(self, file_path: str, identity: Tuple[int, int], chapters: ChapterIndex) -> int:
+        """
+        为一本小说建立索引，替换该小说已有的索引
+
+        章节标题和正文一起索引。所有词项写入后才提交，中途出错时保留旧索引。
+
+        Args:
+            file_path: 源文件路径
+            identity: 读取章节前获取的源文件(修改时间纳秒数, 文件大小)
+            chapters: 章节序列
+
+        Returns:
+            写入的词项数，出错时返回0
+        """
+        started = time.perf_counter()
+        chapter_count = len(chapters)
+        postings = defaultdict(list)
+        titles = chapters.titles
+        for index in range(chapter_count):
+            text = normalize_text(titles[index] + "\n" + chapters.paragraph_text(index))
+            for term in text_terms(text):
+                postings[term].append(index)
+
+        try:
+            conn = self._connect()
+            with conn:
+                self._delete(conn, file_path)
+                novel_id = conn.execute(
+                    "INSERT INTO novels (path, mtime_ns, size, chapter_count, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                    (file_path, identity[0], identity[1], chapter_count, time.time())
+                ).lastrowid
+                # 按词项顺序插入，写入位置在B树中连续
+                conn.executemany(
+                    "INSERT INTO postings (novel_id, term, chapters) VALUES (?, ?, ?)",
+                    ((novel_id, term, _encode_chapters(postings[term], chapter_count)) for term in sorted(postings))
+                )
+        except sqlite3.Error as e:
+            logging.error("写入全文索引时出错: %s, %s", file_path, str(e))
+            return 0
+
+        logging.info("已为%s个章节建立全文索引，共%s个词项，用时%.2f秒: %s",
+                     chapter_count, len(postings), time.perf_counter() - started, file_path)
+        return len(postings)
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, file_path: str):
+        """
+        在当前事务中删除一本小说的索引
+
+        Args:
+            conn: 数据库连接
+            file_path: 源文件路径
+        """
+        row = conn.execute("SELECT id FROM novels WHERE path = ?", (file_path,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM postings WHERE novel_id = ?", (row[0],))
+            conn.execute("DELETE FROM novels WHERE id = ?", (row[0],))
+
+    def remove(self, file_paths: Iterable[str]):
+        """
+        删除小说的索引
+
+        Args:
+            file_paths: 源文件路径
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                for file_path in file_paths:
+                    self._delete(conn, file_path)
+                    logging.info("已删除全文索引: %s", file_path)
+        except sqlite3.Error as e:
+            logging.error("删除全文索引时出错: %s", str(e))
+
+    def candidates(self, phrases: List[str], novel_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        查找可能同时包含所有查询短语的章节
+
+        Args:
+            phrases: 规范化后的查询短语
+            novel_ids: 参与查找的小说记录ID
+
+        Returns:
+            小说记录ID到候选章节位图的映射，只包含有候选章节的小说
+        """
+        terms = sorted({term for phrase in phrases for term in query_terms(phrase)})
+        novel_ids = [int(novel_id) for novel_id in novel_ids]
+        if not terms or not novel_ids:
+            return {}
+
+        # 记录ID均为整数，直接写入语句，避免超出SQLite的参数个数限制
+        sql = "SELECT novel_id, term, chapters FROM postings WHERE novel_id IN ({0}) AND term IN ({1})".format(
+            ",".join(map(str, novel_ids)), ",".join("?" * len(terms)))
+        found = defaultdict(dict)
+        try:
+            for novel_id, term, data in self._connect().execute(sql, terms):
+                found[novel_id][term] = data
+        except sqlite3.Error as e:
+            logging.error("查询全文索引时出错: %s", str(e))
+            return {}
+
+        result = {}
+        for novel_id, postings in found.items():
+            if len(postings) < len(terms):
+                # 缺少任一词项的小说不可能包含查询内容
+                continue
+            # 从最短的章节集合开始求交集，结果为空时提前结束
+            bits = -1
+            for data in sorted(postings.values(), key=len):
+                bits &= _decode_chapters(data)
+                if not bits:
+                    break
+            if bits > 0:
+                result[novel_id] = bits
+        return result
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """
+    获取全局全文索引实例
+
+    Returns:
+        全文索引实例，如果配置中关闭了全文搜索则返回None
+    """
+    global _index
+    if not SEARCH_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex(os.path.join(CACHE_DIR, SEARCH_INDEX_FILE))
+    return _index
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+缓存模块
+
+该模块提供按字节数限制容量的线程安全LRU缓存，用于缓存渲染结果等体积差异较大的数据，
+以及在其基础上按文件身份缓存解析结果的文件缓存。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class ByteLRUCache:
+    """
+    按近似字节数限制容量的LRU缓存
+
+    每个条目写入时记录其大小，总大小超过上限时淘汰最久未使用的条目。
+    单个条目超过上限时不会被缓存。
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 缓存的最大字节数
+            sizeof: 未指定条目大小时用于计算大小的函数
+        """
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        读取缓存条目
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的值，不存在时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None):
+        """
+        写入缓存条目
+
+        Args:
+            key: 缓存键
+            value: 缓存的值
+            size: 条目的字节数，为None时使用sizeof计算
+        """
+        if size is None:
+            size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def contains(self, key: Hashable) -> bool:
+        """
+        判断缓存中是否有该条目，不影响命中统计和淘汰顺序
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            存在时返回True
+        """
+        with self._lock:
+            return key in self._entries
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        删除满足条件的缓存条目
+
+        Args:
+            predicate: 接收缓存键，返回True表示删除该条目
+
+        Returns:
+            删除的条目数
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)[1]
+            return len(keys)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def keys(self) -> List[Hashable]:
+        """
+        获取所有缓存键
+
+        Returns:
+            按最久未使用到最近使用排列的缓存键
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含命中、未命中、淘汰次数以及当前条目数和字节数的字典
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _PendingLoad:
+    """
+    正在执行中的加载，供等待同一结果的线程共享
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class FileCache:
+    """
+    按文件身份缓存由文件计算出的结果，例如小说的解析结果
+
+    缓存键为(路径, 修改时间, 大小)，文件被替换后下一次访问即按新内容重新加载，
+    同一路径的旧结果随即删除。容量按结果的近似字节数限制，超出时淘汰最久未使用的结果。
+    同一文件的并发加载只执行一次（single-flight），其余线程等待并共享该次加载的结果。
+    """
+
+    def __init__(self, load: Callable[[str], Any], max_bytes: int, sizeof: Callable[[Any], int]):
+        """
+        初始化缓存
+
+        Args:
+            load: 以文件路径为参数加载结果的函数
+            max_bytes: 缓存的最大字节数
+            sizeof: 计算结果近似字节数的函数
+        """
+        self._load = load
+        self._sizeof = sizeof
+        self._cache = ByteLRUCache(max_bytes)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _identity(path: str, identity: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """
+        获取文件身份，未指定时读取文件状态
+
+        Args:
+            path: 文件路径
+            identity: 调用方已知的(修改时间纳秒数, 文件大小)
+
+        Returns:
+            文件身份，文件无法访问时返回None
+        """
+        if identity is not None:
+            return identity
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path: str, identity: Optional[Tuple[int, int]] = None) -> Any:
+        """
+        获取文件对应的结果，未缓存时加载
+
+        Args:
+            path: 文件路径
+            identity: 文件身份(修改时间纳秒数, 文件大小)，为None时读取文件状态
+
+        Returns:
+            加载结果
+
+        Raises:
+            Exception: 加载函数抛出的异常
+        """
+        identity = self._identity(path, identity)
+        key = (path,) + identity if identity is not None else None
+        if key is not None:
+            value = self._cache.get(key)
+            if value is not None:
+                return value
+
+        # 无法读取文件状态时也按路径合并并发加载
+        pending_key = key or (path,)
+        with self._lock:
+            call = self._pending.get(pending_key)
+            is_leader = call is None
+            if is_leader:
+                call = _PendingLoad()
+                self._pending[pending_key] = call
+
+        if not is_leader:
+            # 等待正在执行的同一文件的加载完成
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._load(path)
+            with self._lock:
+                self.loads += 1
+            if key is not None:
+                self.put(path, identity, call.result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(pending_key, None)
+            call.event.set()
+        return call.result
+
+    def put(self, path: str, identity: Optional[Tuple[int, int]], value: Any):
+        """
+        写入结果，例如后台预热得到的结果，同时删除该路径下旧版本文件的结果
+
+        Args:
+            path: 文件路径
+            identity: 文件身份，为None时读取文件状态
+            value: 结果
+        """
+        identity = self._identity(path, identity)
+        if identity is None:
+            return
+        key = (path,) + identity
+        self._cache.invalidate(lambda cached: cached[0] == path and cached != key)
+        self._cache.put(key, value, self._sizeof(value))
+
+    def contains(self, path: str, identity: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        判断文件当前版本的结果是否已缓存，不影响命中统计
+
+        Args:
+            path: 文件路径
+            identity: 文件身份，为None时读取文件状态
+
+        Returns:
+            已缓存时返回True
+        """
+        identity = self._identity(path, identity)
+        return identity is not None and self._cache.contains((path,) + identity)
+
+    def loading(self) -> int:
+        """
+        获取正在加载的文件数
+
+        Returns:
+            正在执行的加载数，同一文件的并发加载只计一次
+        """
+        return len(self._pending)
+
+    def identities(self) -> List[Tuple[str, Tuple[int, int]]]:
+        """
+        获取已缓存结果对应的文件
+
+        Returns:
+            (路径, 文件身份)列表
+        """
+        return [(key[0], key[1:]) for key in self._cache.keys()]
+
+    def invalidate(self, paths: Optional[Iterable[str]] = None) -> int:
+        """
+        删除指定文件的所有结果
+
+        Args:
+            paths: 文件路径，None表示清空缓存
+
+        Returns:
+            删除的条目数
+        """
+        if paths is None:
+            removed = len(self._cache)
+            self._cache.clear()
+        else:
+            paths = set(paths)
+            removed = self._cache.invalidate(lambda key: key[0] in paths)
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            ByteLRUCache的统计信息，另含加载次数和显式删除的条目数
+        """
+        stats = self._cache.stats()
+        with self._lock:
+            stats["loads"] = self.loads
+            stats["invalidations"] = self.invalidations
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._cache)
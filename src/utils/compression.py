@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+响应压缩模块
+
+该模块负责根据Accept-Encoding请求头协商内容编码，并提供gzip和deflate（zlib格式）压缩。
+"""
+
+import zlib
+from typing import Dict, Optional
+
+from src.config import COMPRESSION_ENABLED, COMPRESSION_LEVEL, COMPRESSION_MIN_SIZE
+
+# 支持的内容编码，按优先级排列
+SUPPORTED_ENCODINGS = ("gzip", "deflate")
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    解析Accept-Encoding请求头
+
+    Args:
+        header: Accept-Encoding请求头的值
+
+    Returns:
+        编码名称到q值的映射
+    """
+    result = {}
+    if not header:
+        return result
+    for item in header.split(","):
+        parts = item.strip().split(";")
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        result[coding] = quality
+    return result
+
+
+def choose_encoding(header: Optional[str], size: int = COMPRESSION_MIN_SIZE) -> Optional[str]:
+    """
+    为响应选择内容编码
+
+    Args:
+        header: Accept-Encoding请求头的值
+        size: 未压缩内容的字节数，过小的内容不压缩
+
+    Returns:
+        选中的编码名称，不压缩时返回None
+    """
+    if not COMPRESSION_ENABLED or size < COMPRESSION_MIN_SIZE:
+        return None
+    accepted = parse_accept_encoding(header)
+    best = None
+    best_quality = 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    按指定编码压缩数据
+
+    gzip头中的时间戳固定为0，相同内容的压缩结果相同。
+
+    Args:
+        data: 原始数据
+        encoding: 内容编码，"gzip"或"deflate"
+
+    Returns:
+        压缩后的数据
+
+    Raises:
+        ValueError: 如果编码不受支持
+    """
+    if encoding == "gzip":
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == "deflate":
+        return zlib.compress(data, COMPRESSION_LEVEL)
+    raise ValueError("不支持的内容编码: {0}".format(encoding))
@@ -17,13 +17,29 @@
 """
 工具函数模块
 
-该模块提供了各种辅助函数，包括路径安全处理、输入验证、缓存装饰器和文件编码检测等。
+该模块提供了各种辅助函数，包括路径安全处理、输入验证、Range请求头解析、文件身份和文件编码检测等。
 """
 
 import os
 import logging
-from functools import lru_cache
-from typing import Optional
+from typing import Optional, Tuple
+
+
+def file_identity(file_path: str) -> Tuple[int, int]:
+    """
+    获取文件的身份信息
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        (修改时间纳秒数, 文件大小)
+
+    Raises:
+        OSError: 如果文件不存在或无法访问
+    """
+    st = os.stat(file_path)
+    return st.st_mtime_ns, st.st_size
 
 
 def safe_join(base: str, *paths: str) -> Optional[str]:
@@ -108,40 +124,55 @@ def validate_novel_name(name: str) -> bool:
     return True
 
 
-# 缓存装饰器，用于缓存函数结果
-def cached_function(maxsize: int = 128):
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
     """
-    创建一个缓存装饰器
-    
+    解析Range请求头，只支持单个字节范围
+
     Args:
-        maxsize: 缓存大小
-        
+        header: Range请求头的值
+        size: 资源的总字节数
+
     Returns:
-        缓存装饰器
+        (起始位置, 结束位置)，结束位置包含在范围内；请求头缺失、格式无法识别或包含多个范围时
+        返回None，表示应当发送完整内容
+
+    Raises:
+        ValueError: 如果范围无法满足（起始位置超出资源大小，或对空资源请求后缀范围）
     """
-    def decorator(func):
-        cached_func = lru_cache(maxsize=maxsize)(func)
-        
-        def wrapper(*args, **kwargs):
-            try:
-                return cached_func(*args, **kwargs)
-            except Exception as e:
-                logging.error("缓存函数执行时出错: %s", str(e))
-                # 出错时直接执行原函数，不使用缓存
-                return func(*args, **kwargs)
-        
-        # 保留原函数的元数据
-        wrapper.__name__ = func.__name__
-        wrapper.__doc__ = func.__doc__
-        
-        return wrapper
-    
-    return decorator
+    if not header:
+        return None
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+
+    start_text, sep, end_text = ranges.strip().partition('-')
+    if not sep:
+        return None
+    start_text, end_text = start_text.strip(), end_text.strip()
+    if not (start_text or end_text):
+        return None
+    if (start_text and not start_text.isdigit()) or (end_text and not end_text.isdigit()):
+        return None
+
+    if not start_text:
+        # 后缀范围，例如bytes=-500表示最后500字节
+        length = int(end_text)
+        if length == 0 or size == 0:
+            raise ValueError("无法满足的范围: {0}".format(header))
+        return max(0, size - length), size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if end_text and end < start:
+        return None
+    if start >= size:
+        raise ValueError("无法满足的范围: {0}".format(header))
+    return start, min(end, size - 1)
 
 
 def get_file_encoding(file_path: str) -> Optional[str]:
     """
-    检测文件编码
+    检测文件编码，只读取文件开头的样本，结果按文件身份缓存
     
     Args:
         file_path: 文件路径
@@ -149,17 +180,10 @@ def get_file_encoding(file_path: str) -> Optional[str]:
     Returns:
         文件编码，如果无法检测则返回None
     """
-    encodings = ['utf-8', 'gbk', 'utf-16', 'iso-8859-1']
-    
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(1024)  # 读取一小部分进行测试
-            return encoding
-        except UnicodeDecodeError:
-            continue
-        except Exception as e:
-            logging.error("检测文件编码时出错: %s", str(e))
-            continue
-    
-    return None
+    # 编码检测模块依赖本模块的file_identity，在函数内导入以避免循环导入
+    from src.parsers.encoding import detect_file_encoding
+    try:
+        return detect_file_encoding(file_path)
+    except OSError as e:
+        logging.error("检测文件编码时出错: %s", str(e))
+        return None
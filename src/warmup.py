@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+后台预热模块
+
+该模块在后台进程池中预先解析小说库中的小说，把结果写入章节存储（关闭章节存储时交给解析缓存），
+读者第一次打开小说时无需等待解压和分章。解析在独立进程中进行，不会与请求处理线程争抢GIL。
+
+预热顺序由优先级队列决定：最近读过的小说最先预热，其次是新放入的小说（按修改时间从新到旧），
+最后是其余小说。
+"""
+
+import os
+import heapq
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from src.config import WARMUP_PROCESSES, WARMUP_NICE
+from src.parsers.novel_loader import load_novel
+from src.parsers.novel_parser import ChapterIndex
+from src.parsers.sources import ChapterSource, source_for
+from src.storage.chapter_store import get_chapter_store
+
+# 预热优先级，数值越小越先预热
+PRIORITY_RECENT = 0  # 最近读过的小说
+PRIORITY_NEW = 1  # 新放入或发生变化的小说
+PRIORITY_NORMAL = 2  # 其余小说
+
+
+def _init_worker(nice: int):
+    """
+    后台进程的初始化函数，降低进程优先级以免影响请求处理
+
+    Args:
+        nice: 进程优先级增量
+    """
+    if nice and hasattr(os, "nice"):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+
+def create_background_executor(processes: int, nice: int) -> ProcessPoolExecutor:
+    """
+    创建执行后台计算任务的低优先级进程池
+
+    子进程以spawn方式启动而不是fork：服务进程中有多个线程，fork时其他线程持有的锁
+    （例如日志输出流的锁）会以锁定状态复制到子进程中，子进程再次获取时会永久阻塞。
+
+    Args:
+        processes: 进程数
+        nice: 进程的优先级增量
+
+    Returns:
+        进程池
+    """
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(nice,))
+
+
+def _warm_novel(path: str) -> Optional[ChapterIndex]:
+    """
+    在预热进程中解析一本小说
+
+    Args:
+        path: 小说源文件路径
+
+    Returns:
+        启用章节存储时结果已写入存储，返回None；否则返回章节索引
+    """
+    chapters = load_novel(path, touch=False)
+    if get_chapter_store() is not None:
+        return None
+    return chapters
+
+
+class NovelWarmer:
+    """
+    后台预热调度器
+
+    调度线程按优先级从队列中取出小说交给进程池，同时在途的任务数不超过进程数，
+    保证后加入的高优先级任务不会排在大量已提交的任务之后。
+    """
+
+    def __init__(self, on_ready: Callable[[str, Optional[ChapterIndex]], None],
+                 processes: int = WARMUP_PROCESSES, nice: int = WARMUP_NICE):
+        """
+        初始化预热调度器
+
+        Args:
+            on_ready: 一本小说预热完成后调用，参数为源文件路径和章节索引（已写入章节存储时为None）
+            processes: 预热进程数
+            nice: 预热进程的优先级增量
+        """
+        self.on_ready = on_ready
+        self.processes = max(1, processes)
+        self.nice = nice
+        self._heap = []
+        self._queued = {}
+        self._last_read = {}
+        self._counter = 0
+        self._condition = threading.Condition()
+        self._slots = threading.BoundedSemaphore(self.processes)
+        self._stopped = False
+        self._executor = None
+        self._thread = None
+
+    def touch(self, path: str):
+        """
+        记录小说被阅读，之后该小说变化时优先预热
+
+        Args:
+            path: 小说源文件路径
+        """
+        self._last_read[path] = time.time()
+
+    def schedule(self, entries: Iterable, changed: bool = False):
+        """
+        把目录条目加入预热队列，章节存储中已是最新的小说会被跳过
+
+        启用章节存储时也跳过自带章节结构的小说（EPUB）：它们不写入章节存储，预热进程的结果会被丢弃，
+        而请求时读取目录的开销很小，无需预热。
+
+        Args:
+            entries: 小说目录条目
+            changed: 条目是否为刚刚新增或发生变化的小说
+        """
+        store = get_chapter_store()
+        if store is not None:
+            store.flush_touches()
+        items = []
+        for entry in entries:
+            last_read = self._last_read.get(entry.path)
+            is_changed = changed
+            if store is not None:
+                if isinstance(source_for(entry.path), ChapterSource):
+                    continue
+                fresh, accessed_at = store.status(entry.path)
+                if fresh:
+                    continue
+                last_read = max(last_read or 0, accessed_at or 0)
+                # 章节存储中没有最新记录，说明是上次运行之后新增或变化的小说
+                is_changed = True
+
+            if last_read:
+                items.append(((PRIORITY_RECENT, -last_read), entry.path))
+            elif is_changed:
+                items.append(((PRIORITY_NEW, -entry.mtime_ns), entry.path))
+            else:
+                items.append(((PRIORITY_NORMAL, -entry.mtime_ns), entry.path))
+
+        with self._condition:
+            for key, path in items:
+                queued = self._queued.get(path)
+                if queued is not None and queued <= key:
+                    continue
+                self._queued[path] = key
+                self._counter += 1
+                heapq.heappush(self._heap, (key, self._counter, path))
+            self._condition.notify()
+
+    def start(self):
+        """
+        启动进程池和调度线程
+        """
+        if self._thread is not None:
+            return
+        self._executor = create_background_executor(self.processes, self.nice)
+        self._thread = threading.Thread(target=self._run, name="novel-warmer", daemon=True)
+        self._thread.start()
+        logging.info("后台预热已启动，预热进程%s个", self.processes)
+
+    def stop(self):
+        """
+        停止调度，放弃尚未开始的预热任务
+        """
+        with self._condition:
+            self._stopped = True
+            self._heap.clear()
+            self._queued.clear()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def pending(self) -> int:
+        """
+        获取等待预热的小说数
+
+        Returns:
+            队列中的小说数
+        """
+        return len(self._queued)
+
+    def _run(self):
+        """
+        调度循环
+        """
+        while True:
+            self._slots.acquire()
+            with self._condition:
+                while not self._heap and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    self._slots.release()
+                    return
+                key, _, path = heapq.heappop(self._heap)
+                if self._queued.get(path) != key:
+                    # 已被更高优先级的同一任务取代
+                    self._slots.release()
+                    continue
+                del self._queued[path]
+
+            try:
+                future = self._executor.submit(_warm_novel, path)
+            except RuntimeError:
+                self._slots.release()
+                return
+            future.add_done_callback(lambda f, p=path: self._on_done(p, f))
+
+    def _on_done(self, path: str, future):
+        """
+        预热任务完成后的回调
+
+        Args:
+            path: 小说源文件路径
+            future: 预热任务
+        """
+        self._slots.release()
+        try:
+            chapters = future.result()
+        except Exception as e:
+            logging.error("预热小说时出错: %s, %s", path, str(e))
+            return
+
+        logging.info("已预热小说: %s", path)
+        try:
+            self.on_ready(path, chapters)
+        except Exception as e:
+            logging.error("处理预热结果时出错: %s", str(e))
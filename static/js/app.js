@@ -10,8 +10,17 @@ window.addEventListener('DOMContentLoaded', function() {
     
     // 绑定事件监听器
     bindEventListeners();
+    
+    // 章节列表滚动到底部时加载后续章节
+    initChapterList();
+    
+    // 章节页面启用阅读模式
+    initReader();
 });
 
+// 阅读模式在后台预取的后续章节数
+const PREFETCH_COUNT = 2;
+
 /**
  * 初始化页面状态
  * 从本地存储中恢复用户设置
@@ -67,6 +76,221 @@ function bindEventListeners() {
     }
 }
 
+/**
+ * 初始化章节列表的增量加载
+ * 服务器每页只返回一段章节，滚动接近列表底部时通过章节索引接口加载下一段，
+ * 不支持IntersectionObserver的浏览器继续使用分页链接
+ */
+function initChapterList() {
+    const list = document.querySelector('ul.chapter-list[data-api]');
+    if (!list || !('IntersectionObserver' in window) || !window.fetch) {
+        return;
+    }
+    
+    const total = parseInt(list.dataset.total, 10);
+    const limit = parseInt(list.dataset.limit, 10);
+    let next = parseInt(list.dataset.end, 10);
+    if (!(next < total)) {
+        return;
+    }
+    
+    // 列表末尾的占位项进入可视区域时加载下一段
+    const sentinel = document.createElement('li');
+    sentinel.className = 'chapter-list-sentinel';
+    sentinel.textContent = '加载中...';
+    list.appendChild(sentinel);
+    
+    let loading = false;
+    const observer = new IntersectionObserver(function(entries) {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadMore();
+        }
+    }, { root: list, rootMargin: '0px 0px 300px 0px' });
+    observer.observe(sentinel);
+    
+    function finish() {
+        observer.disconnect();
+        sentinel.remove();
+    }
+    
+    function loadMore() {
+        if (loading) {
+            return;
+        }
+        loading = true;
+        
+        fetch(`${list.dataset.api}?offset=${next}&limit=${limit}`)
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(function(data) {
+                const fragment = document.createDocumentFragment();
+                data.chapters.forEach(function(chapter) {
+                    const item = document.createElement('li');
+                    const link = document.createElement('a');
+                    link.href = `${list.dataset.base}/${encodeURIComponent(chapter.key)}`;
+                    link.textContent = chapter.title;
+                    item.appendChild(link);
+                    fragment.appendChild(item);
+                });
+                list.insertBefore(fragment, sentinel);
+                
+                next = data.offset + data.chapters.length;
+                loading = false;
+                if (!data.chapters.length || next >= data.total) {
+                    finish();
+                } else {
+                    // 占位项仍在可视区域内时不会再次触发回调，重新观察以立即检查
+                    observer.unobserve(sentinel);
+                    observer.observe(sentinel);
+                }
+            })
+            .catch(function(e) {
+                console.error('加载章节列表失败:', e);
+                finish();
+            });
+    }
+}
+
+/**
+ * 初始化阅读模式
+ * 点击上一章/下一章时通过章节接口获取内容并在当前页面中替换，不重新加载整个页面；
+ * 同时在后台预取后续章节，切换到已预取的章节无需等待
+ */
+function initReader() {
+    const section = document.querySelector('section.chapter-content[data-api]');
+    if (!section || !window.fetch || !window.history || !window.history.pushState) {
+        return;
+    }
+    
+    const api = section.dataset.api;
+    const base = section.dataset.base;
+    const total = parseInt(section.dataset.total, 10);
+    let current = parseInt(section.dataset.index, 10);
+    
+    // 章节下标 -> 获取章节内容的Promise
+    const chapters = new Map();
+    
+    function chapterUrl(key) {
+        return `${base}/${encodeURIComponent(key)}`;
+    }
+    
+    function fetchChapter(index) {
+        if (index < 0 || index >= total) {
+            return null;
+        }
+        if (!chapters.has(index)) {
+            const request = fetch(`${api}/${index}`).then(function(response) {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            });
+            // 失败的请求不保留，下次重新获取
+            request.catch(function() {
+                chapters.delete(index);
+            });
+            chapters.set(index, request);
+        }
+        return chapters.get(index);
+    }
+    
+    function prefetch(index) {
+        // 只保留当前章节附近的内容
+        chapters.forEach(function(_, cached) {
+            if (cached < index - 1 || cached > index + PREFETCH_COUNT) {
+                chapters.delete(cached);
+            }
+        });
+        for (let i = 1; i <= PREFETCH_COUNT; i++) {
+            const request = fetchChapter(index + i);
+            if (request) {
+                request.catch(function() {});
+            }
+        }
+    }
+    
+    function navLink(href, className, text) {
+        const link = document.createElement('a');
+        link.href = href;
+        link.className = className;
+        link.textContent = text;
+        return link;
+    }
+    
+    function render(chapter) {
+        section.querySelector('h2').textContent = chapter.title;
+        
+        const content = section.querySelector('.content');
+        const fragment = document.createDocumentFragment();
+        chapter.paragraphs.forEach(function(paragraph) {
+            const p = document.createElement('p');
+            p.textContent = paragraph;
+            fragment.appendChild(p);
+        });
+        content.textContent = '';
+        content.appendChild(fragment);
+        
+        // 按服务器端相同的顺序重建章节导航
+        const navigation = section.querySelector('.chapter-navigation');
+        if (navigation) {
+            navigation.textContent = '';
+            navigation.appendChild(navLink('/', 'home-link', '返回首页'));
+            if (chapter.prev !== null) {
+                navigation.appendChild(navLink(chapterUrl(chapter.prev), 'prev-chapter', '上一章'));
+            }
+            const tocUrl = chapter.toc_page > 1 ? `${base}?page=${chapter.toc_page}` : base;
+            navigation.appendChild(navLink(tocUrl, 'toc-link', '返回目录'));
+            if (chapter.next !== null) {
+                navigation.appendChild(navLink(chapterUrl(chapter.next), 'next-chapter', '下一章'));
+            }
+        }
+        
+        current = chapter.index;
+        section.dataset.index = current;
+    }
+    
+    function navigate(index, fallbackUrl, push) {
+        const request = fetchChapter(index);
+        if (!request) {
+            return;
+        }
+        request.then(function(chapter) {
+            render(chapter);
+            if (push) {
+                history.pushState({ chapterIndex: chapter.index }, '', chapterUrl(chapter.key));
+            }
+            window.scrollTo(0, 0);
+            prefetch(chapter.index);
+        }).catch(function(e) {
+            console.error('加载章节失败:', e);
+            // 接口不可用时退回普通的页面跳转
+            window.location.href = fallbackUrl;
+        });
+    }
+    
+    section.addEventListener('click', function(event) {
+        const link = event.target.closest('.prev-chapter, .next-chapter');
+        if (!link || event.button !== 0 || event.ctrlKey || event.metaKey || event.shiftKey || event.altKey) {
+            return;
+        }
+        event.preventDefault();
+        navigate(current + (link.classList.contains('next-chapter') ? 1 : -1), link.href, true);
+    });
+    
+    window.addEventListener('popstate', function(event) {
+        if (event.state && typeof event.state.chapterIndex === 'number') {
+            navigate(event.state.chapterIndex, window.location.href, false);
+        }
+    });
+    
+    history.replaceState({ chapterIndex: current }, '', window.location.href);
+    prefetch(current);
+}
+
 /**
  * 切换深色模式
  */
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Range请求头解析和静态文件范围响应的测试
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.app import Request, _static_response
+from src.utils.helpers import parse_byte_range
+
+
+class ParseByteRangeTest(unittest.TestCase):
+    """
+    parse_byte_range的测试
+    """
+
+    def test_missing_or_unsupported_header_sends_full_content(self):
+        for header in (None, "", "items=0-1", "bytes=0-1,4-5", "bytes=abc", "bytes=-", "bytes=5-2"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_byte_range(header, 10))
+
+    def test_closed_range(self):
+        self.assertEqual(parse_byte_range("bytes=2-5", 10), (2, 5))
+        self.assertEqual(parse_byte_range(" BYTES = 2 - 5 ", 10), (2, 5))
+
+    def test_end_is_clamped_to_size(self):
+        self.assertEqual(parse_byte_range("bytes=8-100", 10), (8, 9))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_byte_range("bytes=7-", 10), (7, 9))
+        self.assertEqual(parse_byte_range("bytes=0-", 10), (0, 9))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_byte_range("bytes=-3", 10), (7, 9))
+        # 后缀长度超过资源大小时发送全部内容
+        self.assertEqual(parse_byte_range("bytes=-100", 10), (0, 9))
+
+    def test_unsatisfiable_ranges(self):
+        for header, size in (("bytes=10-", 10), ("bytes=10-20", 10), ("bytes=-0", 10),
+                             ("bytes=0-", 0), ("bytes=-5", 0)):
+            with self.subTest(header=header, size=size):
+                with self.assertRaises(ValueError):
+                    parse_byte_range(header, size)
+
+
+class StaticRangeResponseTest(unittest.TestCase):
+    """
+    _static_response处理Range和If-Range的测试
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "data.txt")
+        self.data = b"0123456789"
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _get(self, headers):
+        response = _static_response(Request("GET", "/static/data.txt", headers), self.path, "text/plain", None)
+        return response, dict(response.headers)
+
+    @staticmethod
+    def _body(response) -> bytes:
+        if response.file is not None:
+            path, start, length = response.file
+            with open(path, "rb") as f:
+                f.seek(start)
+                return f.read(length)
+        return bytes(response.body)
+
+    def test_full_content_without_range(self):
+        response, headers = self._get({})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(headers["Content-Length"], "10")
+        self.assertEqual(self._body(response), self.data)
+
+    def test_partial_content(self):
+        for header, expected, content_range in (("bytes=2-4", b"234", "bytes 2-4/10"),
+                                                ("bytes=7-", b"789", "bytes 7-9/10"),
+                                                ("bytes=-2", b"89", "bytes 8-9/10")):
+            with self.subTest(header=header):
+                response, headers = self._get({"Range": header})
+                self.assertEqual(response.status, 206)
+                self.assertEqual(headers["Content-Range"], content_range)
+                self.assertEqual(headers["Content-Length"], str(len(expected)))
+                self.assertEqual(self._body(response), expected)
+
+    def test_unsatisfiable_range_returns_416(self):
+        response, headers = self._get({"Range": "bytes=10-"})
+        self.assertEqual(response.status, 416)
+        self.assertEqual(headers["Content-Range"], "bytes */10")
+
+    def test_stale_if_range_sends_full_content(self):
+        response, _ = self._get({"Range": "bytes=2-4", "If-Range": '"stale"'})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(self._body(response), self.data)
+
+    def test_matching_if_range_honours_range(self):
+        etag = dict(self._get({})[0].headers)["ETag"]
+        response, _ = self._get({"Range": "bytes=2-4", "If-Range": etag})
+        self.assertEqual(response.status, 206)
+        self.assertEqual(self._body(response), b"234")
+
+
+if __name__ == "__main__":
+    unittest.main()
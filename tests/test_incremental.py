@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2025 taboo-hacker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+增量分章的测试：续接点、文本开头校验，以及源文件变化后增量分章与完整分章的结果一致
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src.parsers import novel_loader
+from src.parsers.novel_parser import ResumePoint, TrackedChapters, iter_chapters, skip_prefix
+from src.parsers.rules import rules_for
+from src.storage.chapter_store import ChapterStore
+
+
+def make_text(first: int, last: int, filler: str = "正文内容") -> str:
+    """
+    生成第first章到第last章的小说文本
+    """
+    return "".join("第{0}章 标题{0}\n{1}\n".format(i, filler * 50) for i in range(first, last + 1))
+
+
+def chunked(text: str, size: int = 1000):
+    """
+    把文本拆分为固定长度的文本块
+    """
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def snapshot(chapters):
+    """
+    取出章节序列中所有章节的标题和段落，用于比较
+    """
+    return [(chapters[i]["title"], chapters[i]["content"]) for i in range(len(chapters))]
+
+
+class ResumePointTest(unittest.TestCase):
+    """
+    TrackedChapters记录的续接点和skip_prefix的测试
+    """
+
+    def setUp(self):
+        self.rules = rules_for("book.txt")
+        self.text = make_text(1, 30)
+        self.tracked = TrackedChapters(chunked(self.text), self.rules)
+        self.chapters = list(self.tracked)
+
+    def test_resume_point_keeps_all_but_last_chapter(self):
+        resume = self.tracked.resume_point
+        self.assertIsInstance(resume, ResumePoint)
+        self.assertEqual(len(self.chapters), 30)
+        self.assertEqual(resume.chapters, 29)
+        self.assertTrue(self.text[resume.offset:].startswith("第30章"))
+
+    def test_appended_text_resumes_with_same_result(self):
+        resume = self.tracked.resume_point
+        new_text = self.text + make_text(31, 35)
+        tail = skip_prefix(chunked(new_text, 777), resume)
+        self.assertIsNotNone(tail)
+        rule = [rule for rule in self.rules if rule.name == resume.rule]
+        resumed = self.chapters[:resume.chapters] + list(TrackedChapters(tail, rule, resume))
+        self.assertEqual(resumed, list(iter_chapters(chunked(new_text), self.rules)))
+
+    def test_changed_prefix_is_rejected(self):
+        resume = self.tracked.resume_point
+        changed = self.text.replace("标题3\n", "标题三\n", 1)
+        self.assertIsNone(skip_prefix(chunked(changed), resume))
+
+    def test_shorter_text_is_rejected(self):
+        resume = self.tracked.resume_point
+        self.assertIsNone(skip_prefix(chunked(self.text[:resume.offset - 1]), resume))
+
+
+class IncrementalLoadTest(unittest.TestCase):
+    """
+    load_novel在源文件变化后的增量分章和回退到完整分章的测试
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "book.txt")
+        self.store = ChapterStore(os.path.join(self.directory, "chapters.db"))
+        patcher = mock.patch.object(novel_loader, "get_chapter_store", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, text: str):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # 保证修改时间变化，使存储的记录过期
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    def _expected(self, text: str):
+        return [(chapter["title"], chapter["content"])
+                for chapter in iter_chapters(chunked(text), rules_for(self.path))]
+
+    def _load(self):
+        with mock.patch.object(self.store, "append", wraps=self.store.append) as append:
+            chapters = novel_loader.load_novel(self.path)
+        return snapshot(chapters), append
+
+    def test_append_reuses_stored_chapters(self):
+        text = make_text(1, 40)
+        self._write(text)
+        self.assertEqual(self._load()[0], self._expected(text))
+
+        text += make_text(41, 45)
+        self._write(text)
+        chapters, append = self._load()
+        self.assertTrue(append.called)
+        self.assertEqual(chapters, self._expected(text))
+
+    def test_checksum_mismatch_falls_back_to_full_parse(self):
+        # 足够长且只改动中间的内容，文件首尾和大小检查都会通过，只能由校验值发现
+        text = make_text(1, 400)
+        self._write(text)
+        self._load()
+
+        changed = text.replace("第200章 标题200", "第200章 新题200", 1) + make_text(401, 402)
+        self._write(changed)
+        with mock.patch.object(novel_loader, "skip_prefix", wraps=skip_prefix) as checked:
+            chapters, append = self._load()
+        self.assertTrue(checked.called)
+        self.assertFalse(append.called)
+        self.assertEqual(chapters, self._expected(changed))
+
+    def test_rewritten_file_is_parsed_in_full(self):
+        self._write(make_text(1, 40))
+        self._load()
+
+        text = make_text(1, 20, filler="改写")
+        self._write(text)
+        chapters, append = self._load()
+        self.assertFalse(append.called)
+        self.assertEqual(chapters, self._expected(text))
+
+
+if __name__ == "__main__":
+    unittest.main()